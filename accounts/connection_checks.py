@@ -0,0 +1,149 @@
+"""
+Concurrent connection checks for a user's configured services
+
+Each check runs in its own thread so one unreachable server no longer holds
+up the others. Results are yielded as soon as each check finishes, and any
+check still running at the overall deadline is reported as timed out.
+The last result per endpoint is cached briefly so reloading the settings
+page doesn't hit every server again.
+"""
+import hashlib
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError, as_completed
+
+from django.core.cache import cache
+
+from core import timing
+from integrations.services import instance_key
+
+logger = logging.getLogger(__name__)
+
+CHECK_DEADLINE = 12  # seconds for all checks together
+RESULT_CACHE_TIMEOUT = 30
+
+
+def _result_cache_key(name, client):
+    credential = getattr(client, 'api_key', None) or getattr(client, 'token', None) or ''
+    credential_hash = hashlib.sha256(credential.encode('utf-8')).hexdigest()[:12]
+    return f"connection-check:{name}:{instance_key(client.base_url)}:{credential_hash}"
+
+
+def _check_arr(client):
+    success, message = client.test_connection()
+    return {
+        'status': 'success' if success else 'error',
+        'message': message
+    }
+
+
+def _check_jellyfin(client):
+    try:
+        # Test connection with detailed diagnostics
+        success, message = client.test_connection()
+    except Exception as e:
+        return {'status': 'error', 'message': f'Jellyfin connection error: {str(e)}', 'type': 'jellyfin'}
+
+    if success:
+        return {'status': 'success', 'message': 'Jellyfin connection successful', 'type': 'jellyfin'}
+    return {'status': 'error', 'message': f'Jellyfin connection failed: {message}', 'type': 'jellyfin'}
+
+
+def _check_plex(client):
+    try:
+        # Test by getting library stats
+        stats = client.get_library_stats()
+    except Exception as e:
+        return {'status': 'error', 'message': f'Plex connection error: {str(e)}', 'type': 'plex'}
+
+    if stats:
+        return {'status': 'success', 'message': 'Plex connection successful', 'type': 'plex'}
+    return {'status': 'error', 'message': 'Failed to retrieve Plex library stats', 'type': 'plex'}
+
+
+def _not_configured_results(services):
+    """Results for services that have nothing to check"""
+    user_settings = services.settings
+    results = {}
+    if not services.radarr():
+        results['radarr'] = {'status': 'not_configured', 'message': 'Radarr not configured'}
+    if not services.sonarr():
+        results['sonarr'] = {'status': 'not_configured', 'message': 'Sonarr not configured'}
+    if not services.media_server():
+        if user_settings.server_type:
+            results['media_server'] = {
+                'status': 'not_configured',
+                'message': f'{user_settings.server_type.title()} not fully configured',
+                'type': user_settings.server_type
+            }
+        else:
+            results['media_server'] = {
+                'status': 'not_configured',
+                'message': 'No media server configured',
+                'type': None
+            }
+    return results
+
+
+def _pending_checks(services):
+    checks = {}
+    if services.radarr():
+        checks['radarr'] = (services.radarr(), _check_arr)
+    if services.sonarr():
+        checks['sonarr'] = (services.sonarr(), _check_arr)
+    if services.jellyfin():
+        checks['media_server'] = (services.jellyfin(), _check_jellyfin)
+    elif services.plex():
+        checks['media_server'] = (services.plex(), _check_plex)
+    return checks
+
+
+def run_connection_checks(services, deadline=CHECK_DEADLINE):
+    """
+    Check every configured service concurrently.
+
+    Yields ``(name, result)`` pairs in completion order: unconfigured and
+    cached results first, then live checks as they finish.
+    """
+    for name, result in _not_configured_results(services).items():
+        yield name, result
+
+    checks = {}
+    for name, (client, check) in _pending_checks(services).items():
+        cached = cache.get(_result_cache_key(name, client))
+        if cached is not None:
+            yield name, cached
+        else:
+            checks[name] = (client, check)
+
+    if not checks:
+        return
+
+    started = time.monotonic()
+    executor = ThreadPoolExecutor(max_workers=len(checks))
+    futures = {
+        executor.submit(timing.propagate(check), client): (name, client)
+        for name, (client, check) in checks.items()
+    }
+    try:
+        for future in as_completed(futures, timeout=deadline):
+            name, client = futures.pop(future)
+            try:
+                result = future.result()
+            except Exception as e:
+                logger.error(f"Connection check for {name} failed: {e}")
+                result = {'status': 'error', 'message': f'Connection error: {str(e)}'}
+            if name == 'media_server':
+                result.setdefault('type', services.settings.server_type)
+            cache.set(_result_cache_key(name, client), result, RESULT_CACHE_TIMEOUT)
+            yield name, result
+    except TimeoutError:
+        elapsed = time.monotonic() - started
+        for name, client in futures.values():
+            result = {'status': 'error', 'message': f'No response within {elapsed:.0f} seconds'}
+            if name == 'media_server':
+                result['type'] = services.settings.server_type
+            yield name, result
+    finally:
+        # Don't wait for stragglers; their own request timeouts end them
+        executor.shutdown(wait=False, cancel_futures=True)
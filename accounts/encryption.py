@@ -2,74 +2,158 @@
 Encryption utilities for sensitive data storage
 """
 import base64
-import os
-from cryptography.fernet import Fernet
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+from cryptography.fernet import Fernet, MultiFernet
 from django.conf import settings
+from django.core.signals import setting_changed
 from django.db import models
+from django.dispatch import receiver
+
+# Decrypted API keys are kept in process memory briefly so loading a
+# UserSettings row doesn't pay for three HMAC checks and AES decryptions
+DECRYPTED_CACHE_SIZE = 256
+DECRYPTED_CACHE_TIMEOUT = 300  # seconds
+
+
+@lru_cache(maxsize=4)
+def _build_cipher(key_setting):
+    """
+    Build the cipher for an ENCRYPTION_KEY value.
+
+    The setting may hold several comma-separated keys for rotation: the first
+    key encrypts, every key is tried when decrypting.
+    """
+    keys = [key.strip() for key in key_setting.split(',') if key.strip()]
+    return MultiFernet([Fernet(key.encode()) for key in keys])
+
+
+class DecryptedValueCache:
+    """Small thread-safe LRU of plaintexts keyed by a hash of their ciphertext"""
+
+    def __init__(self, max_size=DECRYPTED_CACHE_SIZE, timeout=DECRYPTED_CACHE_TIMEOUT):
+        self.max_size = max_size
+        self.timeout = timeout
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(encrypted_value):
+        return hashlib.sha256(encrypted_value.encode()).digest()
+
+    def get(self, encrypted_value):
+        key = self._key(encrypted_value)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, encrypted_value, value):
+        key = self._key(encrypted_value)
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.timeout)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+decrypted_values = DecryptedValueCache()
 
 
 class FieldEncryption:
     """Handle field-level encryption for sensitive data"""
-    
+
+    _fallback_key = None
+
     @staticmethod
     def get_key():
         """Get or generate encryption key"""
         key = getattr(settings, 'ENCRYPTION_KEY', None)
-        if not key:
-            # Generate a key if not provided
-            key = Fernet.generate_key().decode()
-            
+        if not key or key == 'your-encryption-key-for-api-keys':
+            # Without a configured key, generate one per process so values
+            # at least round-trip until restart
+            if FieldEncryption._fallback_key is None:
+                FieldEncryption._fallback_key = Fernet.generate_key().decode()
+            key = FieldEncryption._fallback_key
+
         # Ensure key is bytes
         if isinstance(key, str):
-            # If it's a placeholder, generate a real key
-            if key == 'your-encryption-key-for-api-keys':
-                key = Fernet.generate_key().decode()
             key = key.encode()
-        
+
         return key
-    
+
+    @staticmethod
+    def get_cipher():
+        """Process-wide cipher for the current key setting"""
+        return _build_cipher(FieldEncryption.get_key().decode())
+
     @staticmethod
     def encrypt(value):
         """Encrypt a string value"""
         if not value:
             return value
-            
-        key = FieldEncryption.get_key()
-        fernet = Fernet(key)
-        encrypted_value = fernet.encrypt(value.encode())
-        return base64.b64encode(encrypted_value).decode()
-    
+
+        encrypted_value = FieldEncryption.get_cipher().encrypt(value.encode())
+        encrypted_value = base64.b64encode(encrypted_value).decode()
+        decrypted_values.set(encrypted_value, value)
+        return encrypted_value
+
     @staticmethod
     def decrypt(encrypted_value):
         """Decrypt a string value"""
         if not encrypted_value:
             return encrypted_value
-            
+
+        cached = decrypted_values.get(encrypted_value)
+        if cached is not None:
+            return cached
+
         try:
-            key = FieldEncryption.get_key()
-            fernet = Fernet(key)
             decoded_value = base64.b64decode(encrypted_value.encode())
-            decrypted_value = fernet.decrypt(decoded_value)
-            return decrypted_value.decode()
+            decrypted_value = FieldEncryption.get_cipher().decrypt(decoded_value).decode()
         except Exception:
             # If decryption fails, return original value (for migration compatibility)
-            return encrypted_value
+            decrypted_value = encrypted_value
+
+        decrypted_values.set(encrypted_value, decrypted_value)
+        return decrypted_value
+
+
+@receiver(setting_changed)
+def reset_encryption_caches(sender, setting, **kwargs):
+    if setting == 'ENCRYPTION_KEY':
+        _build_cipher.cache_clear()
+        decrypted_values.clear()
 
 
 class EncryptedCharField(models.CharField):
     """CharField that automatically encrypts/decrypts data"""
-    
+
     def from_db_value(self, value, expression, connection):
         if value is None:
             return value
         return FieldEncryption.decrypt(value)
-    
+
     def to_python(self, value):
         if value is None:
             return value
         return FieldEncryption.decrypt(value)
-    
+
     def get_prep_value(self, value):
         if value is None:
             return value
-        return FieldEncryption.encrypt(value)
\ No newline at end of file
+        return FieldEncryption.encrypt(value)
@@ -0,0 +1,72 @@
+import base64
+import time
+
+from cryptography.fernet import Fernet
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.encryption import FieldEncryption, decrypted_values
+from accounts.models import UserSettings
+
+
+class Command(BaseCommand):
+    help = 'Measure UserSettings loads per second with and without the decrypted-value cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=2000,
+            help='Number of settings loads per run',
+        )
+        parser.add_argument(
+            '--username',
+            help='Also time real database loads of this user\'s settings',
+        )
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        if iterations < 1:
+            raise CommandError('--iterations must be positive')
+
+        # The three API keys a UserSettings row carries
+        ciphertexts = [FieldEncryption.encrypt(f'api-key-{i}') for i in range(3)]
+        key = FieldEncryption.get_key()
+
+        def uncached_load():
+            # What every load did before: build a Fernet per field and decrypt
+            for value in ciphertexts:
+                Fernet(key).decrypt(base64.b64decode(value.encode())).decode()
+
+        def cached_load():
+            for value in ciphertexts:
+                FieldEncryption.decrypt(value)
+
+        self._report('uncached decrypt (per-call Fernet)', uncached_load, iterations)
+
+        def cold_load():
+            decrypted_values.clear()
+            cached_load()
+
+        self._report('cached cipher, cold value cache', cold_load, iterations)
+        self._report('cached cipher, warm value cache', cached_load, iterations)
+
+        username = options.get('username')
+        if username:
+            if not UserSettings.objects.filter(user__username=username).exists():
+                raise CommandError(f'No settings found for user {username}')
+
+            def db_load():
+                UserSettings.objects.get(user__username=username)
+
+            self._report('database load', db_load, iterations)
+
+    def _report(self, label, load, iterations):
+        load()  # warm up
+        started = time.perf_counter()
+        for _ in range(iterations):
+            load()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'{label:<40} {iterations / elapsed:>12,.0f} loads/s '
+            f'({elapsed / iterations * 1e6:,.1f} µs/load)'
+        )
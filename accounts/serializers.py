@@ -1,17 +1,32 @@
+from django.urls import reverse
 from rest_framework import serializers
+
+from integrations.webhooks import HANDLERS, webhook_token
 from .models import UserSettings
 
 
 class UserSettingsSerializer(serializers.ModelSerializer):
+    webhook_urls = serializers.SerializerMethodField()
+    
     class Meta:
         model = UserSettings
         fields = [
             'id', 'radarr_url', 'radarr_api_key', 'sonarr_url', 'sonarr_api_key',
             'server_type', 'server_url', 'server_api_key', 'theme', 
-            'created_at', 'updated_at'
+            'webhook_urls', 'created_at', 'updated_at'
         ]
         extra_kwargs = {
             'radarr_api_key': {'write_only': True},
             'sonarr_api_key': {'write_only': True},
             'server_api_key': {'write_only': True},
-        }
\ No newline at end of file
+        }
+    
+    def get_webhook_urls(self, obj):
+        """URLs to paste into each server's webhook/notification settings"""
+        token = webhook_token(obj.user)
+        request = self.context.get('request')
+        urls = {}
+        for service in HANDLERS:
+            path = reverse('integration-webhook', kwargs={'service': service, 'token': token})
+            urls[service] = request.build_absolute_uri(path) if request else path
+        return urls
@@ -243,68 +243,77 @@ window.app = {
             // Show loading state
             showToast('Testing connections...', 'info');
             
-            // Make API call to test connections
+            // Show a row per service straight away, then fill each in as its check finishes
+            let resultsHtml = '<div class="connection-test-results">';
+            [['radarr', 'Radarr'], ['sonarr', 'Sonarr'], ['media_server', 'Media Server']].forEach(([service, label]) => {
+                resultsHtml += `
+                    <div class="test-result pending" data-service="${service}">
+                        <strong>${label}:</strong> 
+                        <span class="status-icon">${this.getStatusIcon('pending')}</span>
+                        Checking...
+                    </div>
+                `;
+            });
+            resultsHtml += '</div>';
+            
+            // Make API call to test connections, asking for results one line per service
             const response = await fetch('/accounts/test_connections/', {
                 method: 'POST',
                 headers: {
                     'X-CSRFToken': getCookie('csrftoken'),
-                    'Content-Type': 'application/json'
+                    'Accept': 'application/x-ndjson'
                 }
             });
             
-            const data = await response.json();
-            
             if (!response.ok) {
+                const data = await response.json();
                 throw new Error(data.error || 'Failed to test connections');
             }
             
-            // Display results
-            let resultsHtml = '<div class="connection-test-results">';
-            
-            // Radarr status
-            const radarrResult = data.results.radarr;
-            resultsHtml += `
-                <div class="test-result ${radarrResult.status}">
-                    <strong>Radarr:</strong> 
-                    <span class="status-icon">${this.getStatusIcon(radarrResult.status)}</span>
-                    ${radarrResult.message}
-                </div>
-            `;
-            
-            // Sonarr status
-            const sonarrResult = data.results.sonarr;
-            resultsHtml += `
-                <div class="test-result ${sonarrResult.status}">
-                    <strong>Sonarr:</strong> 
-                    <span class="status-icon">${this.getStatusIcon(sonarrResult.status)}</span>
-                    ${sonarrResult.message}
-                </div>
-            `;
-            
-            // Media server status
-            const mediaResult = data.results.media_server;
-            const serverName = mediaResult.type ? mediaResult.type.charAt(0).toUpperCase() + mediaResult.type.slice(1) : 'Media Server';
-            resultsHtml += `
-                <div class="test-result ${mediaResult.status}">
-                    <strong>${serverName}:</strong> 
-                    <span class="status-icon">${this.getStatusIcon(mediaResult.status)}</span>
-                    ${mediaResult.message}
-                </div>
-            `;
-            
-            resultsHtml += '</div>';
-            
-            // Show results in a modal
             this.showTestResultsModal('Connection Test Results', resultsHtml);
             
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            while (true) {
+                const { done, value } = await reader.read();
+                if (done) break;
+                
+                buffer += decoder.decode(value, { stream: true });
+                const lines = buffer.split('\n');
+                buffer = lines.pop();
+                lines.filter(line => line.trim()).forEach(line => this.showConnectionResult(JSON.parse(line)));
+            }
+            
         } catch (error) {
             console.error('Error testing connections:', error);
             showToast(`Error testing connections: ${error.message}`, 'error');
         }
     },
     
+    showConnectionResult: function(result) {
+        if (!result.service) return;
+        
+        const row = document.querySelector(`#testResultsModal [data-service="${result.service}"]`);
+        if (!row) return;
+        
+        let label = { radarr: 'Radarr', sonarr: 'Sonarr' }[result.service];
+        if (result.service === 'media_server') {
+            label = result.type ? result.type.charAt(0).toUpperCase() + result.type.slice(1) : 'Media Server';
+        }
+        
+        row.className = `test-result ${result.status}`;
+        row.innerHTML = `
+            <strong>${label}:</strong> 
+            <span class="status-icon">${this.getStatusIcon(result.status)}</span>
+            ${result.message}
+        `;
+    },
+    
     getStatusIcon: function(status) {
         switch(status) {
+            case 'pending':
+                return '<i class="fas fa-spinner fa-spin" style="color: #6b7280;"></i>';
             case 'success':
                 return '<i class="fas fa-check-circle" style="color: #10b981;"></i>';
             case 'error':
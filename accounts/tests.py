@@ -1,3 +1,119 @@
-from django.test import TestCase
+import json
+import time
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from cryptography.fernet import Fernet
+from unittest.mock import MagicMock, patch
+
+from integrations.registry import get_user_services, registry
+from .connection_checks import run_connection_checks
+from .encryption import DecryptedValueCache, FieldEncryption, decrypted_values
+from .models import UserSettings
+
+OLD_KEY = Fernet.generate_key().decode()
+NEW_KEY = Fernet.generate_key().decode()
+
+
+@override_settings(ENCRYPTION_KEY=OLD_KEY)
+class FieldEncryptionTest(TestCase):
+    def setUp(self):
+        decrypted_values.clear()
+
+    def test_round_trip(self):
+        encrypted = FieldEncryption.encrypt('secret-api-key')
+        self.assertNotEqual(encrypted, 'secret-api-key')
+        decrypted_values.clear()
+        self.assertEqual(FieldEncryption.decrypt(encrypted), 'secret-api-key')
+
+    def test_cipher_is_reused(self):
+        self.assertIs(FieldEncryption.get_cipher(), FieldEncryption.get_cipher())
+
+    def test_decrypted_values_are_cached(self):
+        encrypted = FieldEncryption.encrypt('secret-api-key')
+        FieldEncryption.decrypt(encrypted)
+        with patch.object(FieldEncryption, 'get_cipher') as mock_cipher:
+            self.assertEqual(FieldEncryption.decrypt(encrypted), 'secret-api-key')
+            mock_cipher.assert_not_called()
+
+    def test_rotated_keys_still_decrypt(self):
+        encrypted = FieldEncryption.encrypt('secret-api-key')
+        with override_settings(ENCRYPTION_KEY=f'{NEW_KEY},{OLD_KEY}'):
+            self.assertEqual(FieldEncryption.decrypt(encrypted), 'secret-api-key')
+
+    def test_unencrypted_legacy_value_is_returned_as_is(self):
+        self.assertEqual(FieldEncryption.decrypt('plain-value'), 'plain-value')
+
+    def test_cache_is_bounded(self):
+        cache = DecryptedValueCache(max_size=2)
+        for i in range(3):
+            cache.set(f'cipher-{i}', f'value-{i}')
+        self.assertIsNone(cache.get('cipher-0'))
+        self.assertEqual(cache.get('cipher-2'), 'value-2')
+
+
+class ConnectionChecksTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        registry.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        UserSettings.objects.create(
+            user=self.user,
+            radarr_url='http://radarr:7878',
+            radarr_api_key='radarr-key',
+            sonarr_url='http://sonarr:8989',
+            sonarr_api_key='sonarr-key',
+        )
+        self.services = get_user_services(self.user)
+
+    def _slow_check(self, client, seconds, result=(True, 'Connection successful')):
+        def check():
+            time.sleep(seconds)
+            return result
+        client.test_connection = MagicMock(side_effect=check)
+
+    def test_checks_run_concurrently(self):
+        self._slow_check(self.services.radarr(), 0.3)
+        self._slow_check(self.services.sonarr(), 0.3)
+
+        started = time.monotonic()
+        results = dict(run_connection_checks(self.services))
+
+        self.assertLess(time.monotonic() - started, 0.55)
+        self.assertEqual(results['radarr']['status'], 'success')
+        self.assertEqual(results['sonarr']['status'], 'success')
+        self.assertEqual(results['media_server']['status'], 'not_configured')
+
+    def test_slow_service_is_reported_at_the_deadline(self):
+        self._slow_check(self.services.radarr(), 0.5)
+        self._slow_check(self.services.sonarr(), 0)
+
+        names = []
+        results = {}
+        for name, result in run_connection_checks(self.services, deadline=0.1):
+            names.append(name)
+            results[name] = result
+
+        self.assertEqual(names[-2:], ['sonarr', 'radarr'])
+        self.assertEqual(results['radarr']['status'], 'error')
+
+    def test_recent_results_are_reused(self):
+        self._slow_check(self.services.radarr(), 0)
+        self._slow_check(self.services.sonarr(), 0)
+        dict(run_connection_checks(self.services))
+        dict(run_connection_checks(self.services))
+        self.assertEqual(self.services.radarr().test_connection.call_count, 1)
+
+    def test_view_streams_one_line_per_service(self):
+        self._slow_check(self.services.radarr(), 0)
+        self._slow_check(self.services.sonarr(), 0, (False, 'Authentication failed - check API key'))
+        self.client.force_login(self.user)
+
+        response = self.client.post('/accounts/test_connections/', HTTP_ACCEPT='application/x-ndjson')
+        lines = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+
+        self.assertEqual(lines[-1], {'done': True})
+        by_service = {line['service']: line for line in lines[:-1]}
+        self.assertEqual(set(by_service), {'radarr', 'sonarr', 'media_server'})
+        self.assertEqual(by_service['sonarr']['status'], 'error')
@@ -5,15 +5,17 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from .models import UserSettings
 from .serializers import UserSettingsSerializer
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import login, authenticate
 from django.contrib.auth.models import User
 from django.contrib import messages
 from django.views.decorators.csrf import csrf_protect
 from django.conf import settings
-from integrations.services import RadarrService, SonarrService, JellyfinService, PlexService
+from integrations.registry import get_user_services
+from .connection_checks import run_connection_checks
 from django_ratelimit.decorators import ratelimit
+import json
 import logging
 
 logger = logging.getLogger(__name__)
@@ -143,7 +145,7 @@ class UserSettingsViewSet(viewsets.ViewSet):
         """Get current user's settings (for GET /api/settings/)"""
         try:
             settings = UserSettings.objects.get(user=request.user)
-            serializer = UserSettingsSerializer(settings)
+            serializer = UserSettingsSerializer(settings, context={'request': request})
             return Response(serializer.data)
         except UserSettings.DoesNotExist:
             # Return default settings structure if none exist
@@ -159,7 +161,7 @@ class UserSettingsViewSet(viewsets.ViewSet):
         """Get user settings (always gets current user's settings regardless of pk)"""
         try:
             settings = UserSettings.objects.get(user=request.user)
-            serializer = UserSettingsSerializer(settings)
+            serializer = UserSettingsSerializer(settings, context={'request': request})
             return Response(serializer.data)
         except UserSettings.DoesNotExist:
             return Response({'error': 'Settings not found'}, status=status.HTTP_404_NOT_FOUND)
@@ -210,146 +212,37 @@ class UserSettingsViewSet(viewsets.ViewSet):
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 @login_required
 def test_connections(request):
-    """Test connections to all configured services"""
+    """
+    Test connections to all configured services.
+
+    Checks run concurrently. Clients that accept ``application/x-ndjson`` get
+    one JSON line per service as soon as its result is known, followed by a
+    ``{"done": true}`` line; everyone else gets all results in one response.
+    """
     if request.method != 'POST':
         return JsonResponse({'error': 'Method not allowed'}, status=405)
     
     try:
-        # Get user settings
-        user_settings = UserSettings.objects.filter(user=request.user).first()
-        if not user_settings:
+        # Get user settings and their configured clients
+        services = get_user_services(request.user)
+        if not services.settings:
             return JsonResponse({
                 'error': 'No settings configured',
                 'results': {}
             }, status=400)
         
-        results = {}
-        
-        # Test Radarr connection
-        if user_settings.radarr_url and user_settings.radarr_api_key:
-            # Override settings temporarily for this user's configuration
-            settings.RADARR_URL = user_settings.radarr_url
-            settings.RADARR_API_KEY = user_settings.radarr_api_key
-            
-            radarr = RadarrService()
-            success, message = radarr.test_connection()
-            results['radarr'] = {
-                'status': 'success' if success else 'error',
-                'message': message
-            }
-        else:
-            results['radarr'] = {
-                'status': 'not_configured',
-                'message': 'Radarr not configured'
-            }
-        
-        # Test Sonarr connection
-        if user_settings.sonarr_url and user_settings.sonarr_api_key:
-            # Override settings temporarily for this user's configuration
-            settings.SONARR_URL = user_settings.sonarr_url
-            settings.SONARR_API_KEY = user_settings.sonarr_api_key
+        if 'application/x-ndjson' in request.headers.get('Accept', ''):
+            def stream():
+                for name, result in run_connection_checks(services):
+                    yield json.dumps({'service': name, **result}) + '\n'
+                yield json.dumps({'done': True}) + '\n'
             
-            sonarr = SonarrService()
-            # Add test_connection method to Sonarr if it doesn't exist
-            try:
-                test_url = f"{sonarr.base_url}/api/v3/system/status"
-                import requests
-                response = requests.get(test_url, headers=sonarr.headers, timeout=10)
-                
-                if response.status_code == 401:
-                    results['sonarr'] = {
-                        'status': 'error',
-                        'message': 'Authentication failed - check API key'
-                    }
-                elif response.status_code == 200:
-                    results['sonarr'] = {
-                        'status': 'success',
-                        'message': 'Connection successful'
-                    }
-                else:
-                    results['sonarr'] = {
-                        'status': 'error',
-                        'message': f'HTTP {response.status_code}: {response.text}'
-                    }
-            except Exception as e:
-                results['sonarr'] = {
-                    'status': 'error',
-                    'message': f'Connection error: {str(e)}'
-                }
-        else:
-            results['sonarr'] = {
-                'status': 'not_configured',
-                'message': 'Sonarr not configured'
-            }
-        
-        # Test media server connection (Jellyfin or Plex)
-        if user_settings.server_type:
-            if user_settings.server_type == 'jellyfin' and user_settings.server_url and user_settings.server_api_key:
-                jellyfin = JellyfinService()
-                # Configure with user's settings
-                jellyfin.configure(user_settings.server_url, user_settings.server_api_key)
-                
-                try:
-                    # Test connection with detailed diagnostics
-                    success, message = jellyfin.test_connection()
-                    if success:
-                        results['media_server'] = {
-                            'status': 'success',
-                            'message': 'Jellyfin connection successful',
-                            'type': 'jellyfin'
-                        }
-                    else:
-                        results['media_server'] = {
-                            'status': 'error',
-                            'message': f'Jellyfin connection failed: {message}',
-                            'type': 'jellyfin'
-                        }
-                except Exception as e:
-                    results['media_server'] = {
-                        'status': 'error',
-                        'message': f'Jellyfin connection error: {str(e)}',
-                        'type': 'jellyfin'
-                    }
-            elif user_settings.server_type == 'plex' and user_settings.server_url and user_settings.server_api_key:
-                # Override settings temporarily
-                settings.PLEX_URL = user_settings.server_url
-                settings.PLEX_TOKEN = user_settings.server_api_key
-                
-                plex = PlexService()
-                try:
-                    # Test by getting library stats
-                    stats = plex.get_library_stats()
-                    if stats:
-                        results['media_server'] = {
-                            'status': 'success',
-                            'message': 'Plex connection successful',
-                            'type': 'plex'
-                        }
-                    else:
-                        results['media_server'] = {
-                            'status': 'error',
-                            'message': 'Failed to retrieve Plex library stats',
-                            'type': 'plex'
-                        }
-                except Exception as e:
-                    results['media_server'] = {
-                        'status': 'error',
-                        'message': f'Plex connection error: {str(e)}',
-                        'type': 'plex'
-                    }
-            else:
-                results['media_server'] = {
-                    'status': 'not_configured',
-                    'message': f'{user_settings.server_type.title()} not fully configured',
-                    'type': user_settings.server_type
-                }
-        else:
-            results['media_server'] = {
-                'status': 'not_configured',
-                'message': 'No media server configured',
-                'type': None
-            }
+            response = StreamingHttpResponse(stream(), content_type='application/x-ndjson')
+            response['Cache-Control'] = 'no-cache'
+            response['X-Accel-Buffering'] = 'no'  # let nginx pass lines through as they arrive
+            return response
         
+        results = dict(run_connection_checks(services))
         return JsonResponse({
             'success': True,
             'results': results
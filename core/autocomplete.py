@@ -0,0 +1,153 @@
+"""
+Server-side autocomplete protocol for the search box
+
+Every suggestion request carries a client sequence number (``seq``). The
+newest sequence number seen for a browser session wins: older requests are
+answered immediately without touching TMDB, and a request that gets
+superseded while it is running stops before its next upstream call.
+
+Upstream result sets are cached per normalized query and shared between
+users. When a cached prefix of the current query returned its complete
+result set, the current query is answered by filtering that set locally.
+"""
+import hashlib
+import logging
+import re
+
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+MIN_QUERY_LENGTH = 2
+TMDB_PAGE_SIZE = 20
+RESULT_CACHE_TIMEOUT = 300  # 5 minutes
+SEQUENCE_TIMEOUT = 60
+
+
+def normalize_query(query):
+    """Lowercase and collapse whitespace so equivalent keystrokes share cache entries"""
+    return re.sub(r'\s+', ' ', (query or '').strip().lower())
+
+
+def _title_words(item):
+    words = []
+    for field in ('title', 'original_title'):
+        words.extend(normalize_query(item.get(field) or '').split(' '))
+    return words
+
+
+def matches_query(item, query):
+    """Check that every query token is a prefix of a word in the item's titles"""
+    words = _title_words(item)
+    return all(
+        any(word.startswith(token) for word in words)
+        for token in query.split(' ')
+    )
+
+
+class AutocompleteSession:
+    """Track the newest autocomplete sequence number for one browser session"""
+
+    def __init__(self, request, channel):
+        session_id = getattr(request.session, 'session_key', None) or f"user-{request.user.pk}"
+        self.cache_key = f"autocomplete:seq:{channel}:{session_id}"
+        try:
+            self.seq = int(request.GET.get('seq'))
+        except (TypeError, ValueError):
+            # Clients that don't send a sequence number opt out of cancellation
+            self.seq = None
+
+    def begin(self):
+        """Register this request as the latest one; False if a newer one already arrived"""
+        if self.seq is None:
+            return True
+
+        latest = cache.get(self.cache_key)
+        if latest is not None and latest > self.seq:
+            return False
+
+        cache.set(self.cache_key, self.seq, SEQUENCE_TIMEOUT)
+        return True
+
+    def is_current(self):
+        """Check whether a newer request from the same session has started since begin()"""
+        if self.seq is None:
+            return True
+
+        latest = cache.get(self.cache_key)
+        return latest is None or latest <= self.seq
+
+    def stale_response(self):
+        return {'movies': [], 'tv_shows': [], 'seq': self.seq, 'stale': True}
+
+
+class PrefixResultCache:
+    """Cache upstream search results per query and reuse complete prefix result sets"""
+
+    def __init__(self, namespace):
+        self.namespace = namespace
+
+    def _key(self, query):
+        digest = hashlib.md5(query.encode('utf-8')).hexdigest()
+        return f"autocomplete:results:{self.namespace}:{digest}"
+
+    def get(self, query):
+        """Return cached results for the query, or None on a miss"""
+        candidates = [query[:i].rstrip() for i in range(len(query), MIN_QUERY_LENGTH - 1, -1)]
+        candidates = list(dict.fromkeys(c for c in candidates if len(c) >= MIN_QUERY_LENGTH))
+        keys = {self._key(candidate): candidate for candidate in candidates}
+        entries = cache.get_many(list(keys))
+
+        exact = entries.get(self._key(query))
+        if exact is not None:
+            return exact['results']
+
+        # Longest complete prefix first: its result set is the smallest superset
+        for candidate in candidates[1:]:
+            entry = entries.get(self._key(candidate))
+            if entry is not None and entry['complete']:
+                logger.debug(f"Autocomplete '{query}' served from cached prefix '{candidate}'")
+                return [item for item in entry['results'] if matches_query(item, query)]
+
+        return None
+
+    def set(self, query, results, complete):
+        cache.set(self._key(query), {'results': results, 'complete': complete}, RESULT_CACHE_TIMEOUT)
+
+
+def cached_search(namespace, query, fetch):
+    """
+    Search through the prefix cache.
+
+    ``fetch(query)`` performs the upstream call and returns ``(results, total)``;
+    a result set is complete when the first page holds every match.
+    """
+    result_cache = PrefixResultCache(namespace)
+    results = result_cache.get(query)
+    if results is not None:
+        return results
+
+    results, total = fetch(query)
+    if results:
+        # Empty sets are not cached: the TMDB clients also return them on errors
+        complete = total is not None and total <= len(results)
+        result_cache.set(query, results, complete)
+    return results
+
+
+def search_tmdb_movies(tmdb_service, query):
+    """Movie search through the prefix cache"""
+    def fetch(q):
+        data = tmdb_service.search_movies(q, page=1)
+        return data.get('results', []), data.get('total_results')
+    return cached_search('tmdb-movie', query, fetch)
+
+
+def search_tmdb_tv_shows(tmdb_tv_service, query):
+    """TV search through the prefix cache"""
+    def fetch(q):
+        results = tmdb_tv_service.search_tv_shows(q, page=1)
+        # The TV client only exposes the first page; a short page is the full set
+        total = len(results) if len(results) < TMDB_PAGE_SIZE else None
+        return results, total
+    return cached_search('tmdb-tv', query, fetch)
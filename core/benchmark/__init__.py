@@ -0,0 +1 @@
+"""Offline benchmarks of the main endpoints against stub upstream servers"""
@@ -0,0 +1,255 @@
+"""
+Load generation from scripted user sessions
+
+Virtual users share one login and each repeatedly runs one of the session
+scripts below, chosen by weight, with think time in between. A script is a
+list of waves; the requests of a wave are sent concurrently, the way the
+browser fires the fetches behind one page load, and the next wave starts
+when the slowest one finishes.
+
+``run_load`` runs a number of users for a while; over a ramp of rising user
+counts, ``find_saturation`` picks the level past which more users no longer
+buy throughput.
+"""
+import random
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+import requests
+
+from .suite import percentile
+
+# Browsers open at most six connections to one host
+BROWSER_CONNECTIONS = 6
+DASHBOARD_GENRES = (28, 35, 18, 27, 878, 53, 10749, 16)
+DASHBOARD_SHELVES = 'popular,top_rated,tv_popular,tv_top_rated,recently_added'
+SEARCH_QUERIES = ('interstellar', 'the godfather', 'spirited away', 'heat')
+MOODS = ('happy', 'excited', 'thoughtful', 'nostalgic')
+
+
+def _get(name, path, params=None):
+    return {'name': name, 'method': 'GET', 'path': path, 'params': params or {}}
+
+
+def _post(name, path, json):
+    return {'name': name, 'method': 'POST', 'path': path, 'json': json}
+
+
+def dashboard_session(rng):
+    """Dashboard page, the fetches of ``loadInitialData``, then the genre rows"""
+    return [
+        [_get('dashboard_page', '/')],
+        [
+            _get('dashboard_shelves', '/api/dashboard/', {'shelves': DASHBOARD_SHELVES}),
+            _get('genres', '/api/genres/'),
+        ],
+        [_get('movies_by_genre', '/api/movies/by_genre/', {'genre_id': genre}) for genre in DASHBOARD_GENRES],
+    ]
+
+
+def scroll_session(rng):
+    """Infinite scroll along the popular row, one page per wave"""
+    pages = range(2, 2 + rng.randint(2, 5))
+    return [[_get('movies_popular_page', '/api/movies/popular/', {'page': page})] for page in pages]
+
+
+def search_session(rng):
+    """
+    Typing into the search box.
+
+    Suggestions are debounced by 300 ms, so a typist pausing every few
+    characters sends one request per pause rather than per keystroke.
+    """
+    query = rng.choice(SEARCH_QUERIES)
+    stops = sorted({min(len(query), n) for n in range(2, len(query) + 3, 3)})
+    return [
+        [_get('tmdb_search_suggest', '/api/tmdb-search/', {'q': query[:stop], 'seq': seq})]
+        for seq, stop in enumerate(stops, 1)
+    ] + [[_get('movies_search', '/api/movies/search/', {'q': query})]]
+
+
+def chat_session(rng):
+    return [
+        [_post('chat_message', '/recommendations/api/chat/message/', {'message': 'Recommend a tense thriller'})],
+        [_post('chat_message', '/recommendations/api/chat/message/', {'message': 'Something lighter, maybe a comedy?'})],
+    ]
+
+
+def recommendations_session(rng):
+    """AI recommendations page: movie and TV mood picks plus personalized picks"""
+    mood = rng.choice(MOODS)
+    return [
+        [_get('recommendations_page', '/recommendations/ai/')],
+        [
+            _get('movies_mood', '/api/movies/mood_recommendations/', {'mood': mood}),
+            _get('movies_ai', '/api/movies/ai_recommendations/'),
+            _get('tv_mood', '/api/tv-shows/mood_recommendations/', {'mood': mood}),
+            _get('tv_ai', '/api/tv-shows/ai_recommendations/'),
+        ],
+    ]
+
+
+# name -> (script, weight)
+SESSIONS = {
+    'dashboard': (dashboard_session, 40),
+    'scroll': (scroll_session, 20),
+    'search': (search_session, 20),
+    'recommendations': (recommendations_session, 10),
+    'chat': (chat_session, 10),
+}
+
+
+class LoadStats:
+    """Request samples and completed sessions, shared by every virtual user"""
+
+    def __init__(self):
+        self.samples = []
+        self.sessions = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def record(self, name, duration, status):
+        with self._lock:
+            self.samples.append((name, duration, status))
+
+    def record_session(self, name, duration):
+        with self._lock:
+            self.sessions[name].append(duration)
+
+    def summary(self, elapsed):
+        durations = sorted(duration * 1000 for _, duration, _ in self.samples)
+        errors = sum(1 for _, _, status in self.samples if status == 0 or status >= 400)
+        return {
+            'requests': len(durations),
+            'throughput_rps': round(len(durations) / elapsed, 2) if elapsed else 0.0,
+            'error_rate': round(errors / len(durations), 4) if durations else 0.0,
+            'p50_ms': round(percentile(durations, 50), 1),
+            'p95_ms': round(percentile(durations, 95), 1),
+            'p99_ms': round(percentile(durations, 99), 1),
+            'sessions_p95_ms': {
+                name: round(percentile(sorted(t * 1000 for t in times), 95), 1)
+                for name, times in sorted(self.sessions.items())
+            },
+        }
+
+
+def login(base_url, username, password):
+    """
+    Session cookies of a login through the login form.
+
+    Login is rate limited per IP, so one login is shared by every virtual
+    user rather than each logging in.
+    """
+    http = requests.Session()
+    login_url = f"{base_url.rstrip('/')}/accounts/login/"
+    http.get(login_url, timeout=30)
+    response = http.post(login_url, data={
+        'username': username,
+        'password': password,
+        'csrfmiddlewaretoken': http.cookies.get('csrftoken', ''),
+    }, headers={'Referer': login_url}, timeout=30)
+    if 'sessionid' not in http.cookies:
+        raise RuntimeError(f'Login as {username} failed with status {response.status_code}')
+    return http.cookies.get_dict()
+
+
+class VirtualUser:
+    """One browser: a ``requests.Session`` with the login cookies, running session scripts"""
+
+    def __init__(self, base_url, cookies, stats, rng, think_time=1.0):
+        self.base_url = base_url.rstrip('/')
+        self.stats = stats
+        self.rng = rng
+        self.think_time = think_time
+        self.http = requests.Session()
+        self.http.cookies.update(cookies)
+        self.headers = {'X-CSRFToken': cookies.get('csrftoken', ''), 'Referer': self.base_url}
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=BROWSER_CONNECTIONS)
+        self.http.mount('http://', adapter)
+        self.http.mount('https://', adapter)
+        self.executor = ThreadPoolExecutor(max_workers=BROWSER_CONNECTIONS)
+
+    def send(self, request):
+        url = f"{self.base_url}{request['path']}"
+        if request.get('params'):
+            url = f"{url}?{urlencode(request['params'])}"
+        started = time.perf_counter()
+        try:
+            response = self.http.request(
+                request['method'], url, json=request.get('json'), headers=self.headers, timeout=120
+            )
+            status = response.status_code
+        except requests.exceptions.RequestException:
+            status = 0
+        self.stats.record(request['name'], time.perf_counter() - started, status)
+
+    def run_session(self, name):
+        script, _ = SESSIONS[name]
+        started = time.perf_counter()
+        for wave in script(self.rng):
+            list(self.executor.map(self.send, wave))
+        self.stats.record_session(name, time.perf_counter() - started)
+
+    def run(self, stop, sessions):
+        names = list(sessions)
+        weights = [SESSIONS[name][1] for name in names]
+        while not stop.is_set():
+            self.run_session(self.rng.choices(names, weights)[0])
+            stop.wait(self.rng.uniform(0.5, 1.5) * self.think_time)
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+        self.http.close()
+
+
+def run_load(base_url, cookies, users, duration, sessions=None, think_time=1.0, seed=0):
+    """Run ``users`` virtual users for ``duration`` seconds; returns the summary"""
+    stats = LoadStats()
+    stop = threading.Event()
+    virtual_users = [
+        VirtualUser(base_url, cookies, stats, random.Random(seed + n), think_time)
+        for n in range(users)
+    ]
+
+    threads = [
+        threading.Thread(target=user.run, args=(stop, sessions or SESSIONS), daemon=True)
+        for user in virtual_users
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    for user in virtual_users:
+        user.close()
+    return dict(stats.summary(elapsed), users=users)
+
+
+def find_saturation(steps, min_gain=0.1, max_error_rate=0.01, latency_slo_ms=None):
+    """
+    The last step worth its users, and why the next one wasn't.
+
+    A step saturates when throughput grows by less than ``min_gain`` over
+    the previous step, errors exceed ``max_error_rate`` or p95 latency
+    breaks ``latency_slo_ms``. Returns ``(step, reason)``; ``reason`` is
+    None when no step saturated.
+    """
+    best = None
+    for step in steps:
+        if step['error_rate'] > max_error_rate:
+            return best, f"error rate {step['error_rate']:.1%} at {step['users']} users"
+        if latency_slo_ms is not None and step['p95_ms'] > latency_slo_ms:
+            return best, f"p95 {step['p95_ms']} ms over {latency_slo_ms} ms at {step['users']} users"
+        if best is not None and step['throughput_rps'] < best['throughput_rps'] * (1 + min_gain):
+            return best, (
+                f"throughput {best['throughput_rps']} -> {step['throughput_rps']} req/s "
+                f"from {best['users']} to {step['users']} users"
+            )
+        best = step
+    return best, None
@@ -0,0 +1,273 @@
+"""
+In-process stub servers for TMDB, Gemini, Radarr, Sonarr, Jellyfin and Plex
+
+Each upstream gets a local HTTP server answering the endpoints the app calls
+with generated, deterministic data. Latency (per upstream) and payload sizes
+are configurable, so a benchmark can model anything from a fast LAN to a slow
+Gemini without network access.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+UPSTREAMS = ('tmdb', 'gemini', 'radarr', 'sonarr', 'jellyfin', 'plex')
+GENRE_IDS = (28, 12, 16, 35, 80, 18, 14, 27, 10749, 878, 53)
+GENRE_NAMES = {
+    28: 'Action', 12: 'Adventure', 16: 'Animation', 35: 'Comedy', 80: 'Crime', 18: 'Drama',
+    14: 'Fantasy', 27: 'Horror', 10749: 'Romance', 878: 'Science Fiction', 53: 'Thriller',
+}
+
+
+def stub_movie(i):
+    """TMDB-style movie result number ``i``"""
+    return {
+        'id': 1000 + i,
+        'title': f'Stub Movie {i}',
+        'original_title': f'Stub Movie {i}',
+        'overview': f'Generated overview for stub movie {i}. ' * 3,
+        'release_date': f'{1990 + i % 35}-0{1 + i % 9}-15',
+        'poster_path': f'/poster{i}.jpg',
+        'backdrop_path': f'/backdrop{i}.jpg',
+        'vote_average': round(5 + (i * 37 % 50) / 10, 1),
+        'vote_count': 100 + i * 13 % 5000,
+        'popularity': 1000 - i % 1000,
+        'genre_ids': [GENRE_IDS[i % len(GENRE_IDS)], GENRE_IDS[(i * 3) % len(GENRE_IDS)]],
+        'adult': False,
+    }
+
+
+def parse_latencies(values):
+    """``{upstream: seconds}`` from ``UPSTREAM=MS`` strings"""
+    latencies = {}
+    for value in values:
+        upstream, _, ms = value.partition('=')
+        if upstream not in UPSTREAMS:
+            raise ValueError(f"Unknown upstream {upstream!r}; choose from {', '.join(UPSTREAMS)}")
+        try:
+            latencies[upstream] = float(ms) / 1000
+        except ValueError:
+            raise ValueError(f'Invalid latency {value!r}, expected UPSTREAM=MS')
+    return latencies
+
+
+class StubServer:
+    """One threaded HTTP server answering through ``respond(method, path, query, body)``"""
+
+    def __init__(self, name, respond, latency=0.0):
+        self.name = name
+        self.respond = respond
+        self.latency = latency
+        self.requests = 0
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), _StubHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.stub = self
+        # A short poll interval keeps shutdown, and so every test using the stubs, fast
+        self._thread = threading.Thread(
+            target=self.httpd.serve_forever, kwargs={'poll_interval': 0.05}, name=f'stub-{name}', daemon=True
+        )
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def handle(self, method, raw_path, body):
+        with self._lock:
+            self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+        parts = urlsplit(raw_path)
+        query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+        return self.respond(method, parts.path.rstrip('/'), query, body)
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately; without this, delayed ACKs
+    # add ~40 ms to every keep-alive response
+    disable_nagle_algorithm = True
+
+    def _serve(self, method):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        status, payload = self.server.stub.handle(method, self.path, body)
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self._serve('GET')
+
+    def do_POST(self):
+        self._serve('POST')
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubUpstreams:
+    """
+    Context manager running a stub server for every upstream.
+
+    ``latency`` is the default response delay in seconds and ``latencies``
+    overrides it per upstream. TMDB listings return ``page_size`` results per
+    page; the media servers, Radarr and Sonarr hold ``library_size`` titles.
+    """
+
+    def __init__(self, latency=0.0, latencies=None, page_size=20, library_size=500):
+        self.latency = latency
+        self.latencies = latencies or {}
+        self.page_size = page_size
+        self.library_size = library_size
+        self.servers = {}
+
+    def __enter__(self):
+        for name in UPSTREAMS:
+            server = StubServer(name, getattr(self, f'_{name}'), self.latencies.get(name, self.latency))
+            server.start()
+            self.servers[name] = server
+        return self
+
+    def __exit__(self, *exc_info):
+        for server in self.servers.values():
+            server.stop()
+
+    def url(self, name):
+        return self.servers[name].url
+
+    def request_counts(self):
+        return {name: server.requests for name, server in self.servers.items()}
+
+    def settings(self):
+        """Settings overrides that send TMDB and Gemini calls to the stubs"""
+        return {
+            'TMDB_API_KEY': 'stub',
+            'TMDB_API_URL': f"{self.url('tmdb')}/3",
+            'GOOGLE_GEMINI_API_KEY': 'stub',
+            'GEMINI_API_URL': f"{self.url('gemini')}/v1beta/models/stub:generateContent",
+        }
+
+    def _page(self, query):
+        page = int(query.get('page', 1))
+        start = (page - 1) * self.page_size
+        return {
+            'page': page,
+            'results': [stub_movie(i) for i in range(start, start + self.page_size)],
+            'total_pages': 50,
+            'total_results': 50 * self.page_size,
+        }
+
+    def _tmdb(self, method, path, query, body):
+        if path == '/3/genre/movie/list' or path == '/3/genre/tv/list':
+            return 200, {'genres': [{'id': genre_id, 'name': name} for genre_id, name in GENRE_NAMES.items()]}
+        segments = path.split('/')
+        if len(segments) == 4 and segments[2] == 'movie' and segments[3].isdigit():
+            movie = stub_movie(int(segments[3]) - 1000)
+            genres = [{'id': genre_id, 'name': GENRE_NAMES[genre_id]} for genre_id in movie['genre_ids']]
+            return 200, dict(movie, runtime=120, genres=genres)
+        return 200, self._page(query)
+
+    def _gemini(self, method, path, query, body):
+        prompt = json.loads(body or b'{}').get('contents', [{}])[0].get('parts', [{}])[0].get('text', '')
+        picks = [stub_movie(i) for i in range(10)]
+        if 'JSON format' in prompt:
+            text = json.dumps({'recommendations': [
+                {'title': movie['title'], 'year': int(movie['release_date'][:4]), 'reason': 'Stub pick'}
+                for movie in picks
+            ]})
+        else:
+            text = 'Here are a few picks:\n' + '\n'.join(
+                f'{i}. "{movie["title"]}" ({movie["release_date"][:4]})' for i, movie in enumerate(picks[:5], 1)
+            )
+        return 200, {'candidates': [{'content': {'parts': [{'text': text}]}}]}
+
+    def _radarr(self, method, path, query, body):
+        if path == '/api/v3/movie':
+            return 200, [
+                {
+                    'id': i + 1, 'tmdbId': 1000 + i * 2, 'title': f'Stub Movie {i * 2}',
+                    'year': 1990 + i * 2 % 35, 'monitored': True, 'hasFile': i % 3 == 0,
+                }
+                for i in range(self.library_size)
+            ]
+        if path == '/api/v3/qualityprofile':
+            return 200, [{'id': 1, 'name': 'HD-1080p'}, {'id': 2, 'name': 'Ultra-HD'}]
+        if path == '/api/v3/rootfolder':
+            return 200, [{'id': 1, 'path': '/movies', 'freeSpace': 10 ** 12}]
+        if path == '/api/v3/system/status':
+            return 200, {'version': '5.0.0'}
+        return 404, {'message': 'Not stubbed'}
+
+    def _sonarr(self, method, path, query, body):
+        if path == '/api/v3/series':
+            return 200, [
+                {'id': i + 1, 'tvdbId': 5000 + i, 'title': f'Stub Show {i}', 'monitored': True}
+                for i in range(self.library_size)
+            ]
+        if path == '/api/v3/qualityprofile':
+            return 200, [{'id': 1, 'name': 'HD-1080p'}]
+        if path == '/api/v3/system/status':
+            return 200, {'version': '4.0.0'}
+        return 404, {'message': 'Not stubbed'}
+
+    def _jellyfin(self, method, path, query, body):
+        if path == '/System/Info/Public':
+            return 200, {'ServerName': 'stub', 'Version': '10.9.0'}
+        if path == '/Items/Counts':
+            return 200, {'MovieCount': self.library_size, 'SeriesCount': 0}
+        if path == '/Items':
+            start = int(query.get('StartIndex', 0))
+            limit = int(query.get('Limit', self.library_size))
+            items = []
+            for i in range(start, min(start + limit, self.library_size)):
+                movie = stub_movie(i)
+                items.append({
+                    'Id': f'{i:032x}',
+                    'Name': movie['title'],
+                    'ProductionYear': int(movie['release_date'][:4]),
+                    'ProviderIds': {'Tmdb': str(movie['id']), 'Imdb': f'tt{movie["id"]:07d}'},
+                    'Genres': [GENRE_NAMES[genre_id] for genre_id in movie['genre_ids']],
+                    'Overview': movie['overview'],
+                    'CommunityRating': movie['vote_average'],
+                    'DateCreated': f'2024-01-{1 + i % 28:02d}T00:00:00Z',
+                })
+            return 200, {'Items': items, 'TotalRecordCount': self.library_size}
+        return 404, {'message': 'Not stubbed'}
+
+    def _plex(self, method, path, query, body):
+        if path == '/library/sections':
+            return 200, {'MediaContainer': {'Directory': [
+                {'key': '1', 'type': 'movie', 'title': 'Movies', 'totalSize': self.library_size}
+            ]}}
+        if path == '/library/sections/1/all':
+            start = int(query.get('X-Plex-Container-Start', 0))
+            size = int(query.get('X-Plex-Container-Size', self.library_size))
+            metadata = []
+            for i in range(start, min(start + size, self.library_size)):
+                movie = stub_movie(i)
+                metadata.append({
+                    'ratingKey': str(i),
+                    'guid': f'plex://movie/{i:024x}',
+                    'title': movie['title'],
+                    'year': int(movie['release_date'][:4]),
+                    'Guid': [{'id': f'tmdb://{movie["id"]}'}, {'id': f'imdb://tt{movie["id"]:07d}'}],
+                    'Genre': [{'tag': GENRE_NAMES[genre_id]} for genre_id in movie['genre_ids']],
+                    'summary': movie['overview'],
+                    'rating': movie['vote_average'],
+                    'addedAt': 1700000000 - i * 3600,
+                })
+            return 200, {'MediaContainer': {'Metadata': metadata, 'totalSize': self.library_size}}
+        return 404, {'message': 'Not stubbed'}
@@ -0,0 +1,154 @@
+"""
+Endpoint benchmarks against stub upstreams
+
+``run_suite`` drives the main API endpoints through the Django test client
+as a logged-in user whose integrations point at ``StubUpstreams``, and
+reports throughput and latency percentiles per scenario. ``compare`` checks
+results against a stored baseline.
+"""
+import json
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.test import Client
+
+from accounts.models import UserSettings
+
+SEARCH_TERMS = ('stub', 'movie 1', 'movie 42', 'dune', 'the')
+GENRE_SETS = ('action,comedy', 'drama', 'science fiction,thriller', 'romance,comedy')
+DASHBOARD_SHELVES = 'popular,top_rated,tv_popular,tv_top_rated,recently_added'
+CHAT_MESSAGES = (
+    'Something like a heist movie with a twist?',
+    'I want a feel-good comedy for tonight',
+    'Any underrated science fiction from the nineties?',
+)
+
+# name -> (method, path, request data for iteration i)
+SCENARIOS = {
+    'popular': ('GET', '/api/movies/popular/', lambda i: {'page': i % 5 + 1}),
+    'search': ('GET', '/api/movies/search/', lambda i: {'q': SEARCH_TERMS[i % len(SEARCH_TERMS)]}),
+    'ai_recommendations': (
+        'GET', '/api/movies/ai_recommendations/', lambda i: {'genres': GENRE_SETS[i % len(GENRE_SETS)]}
+    ),
+    'recently_added': ('GET', '/api/movies/recently_added/', lambda i: {}),
+    'dashboard': ('GET', '/api/dashboard/', lambda i: {'shelves': DASHBOARD_SHELVES}),
+    'chat': (
+        'POST', '/recommendations/api/chat/message/',
+        lambda i: {'message': CHAT_MESSAGES[i % len(CHAT_MESSAGES)]}
+    ),
+}
+
+# Relative change before a metric counts as a regression
+DEFAULT_TOLERANCE = 0.2
+
+
+def create_benchmark_user(stubs, media_server='jellyfin', username='benchmark'):
+    """User whose Radarr, Sonarr and media server settings point at ``stubs``"""
+    user, _ = User.objects.get_or_create(username=username)
+    UserSettings.objects.update_or_create(user=user, defaults={
+        'radarr_url': stubs.url('radarr'),
+        'radarr_api_key': 'stub',
+        'sonarr_url': stubs.url('sonarr'),
+        'sonarr_api_key': 'stub',
+        'server_type': media_server,
+        'server_url': stubs.url(media_server),
+        'server_api_key': 'stub',
+    })
+    return user
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)
+    return sorted_values[rank]
+
+
+def run_scenario(name, user, iterations=50, concurrency=1, warmup=5):
+    """
+    Time ``iterations`` requests of scenario ``name`` over ``concurrency`` clients.
+
+    Warm-up requests run first and aren't counted, so the numbers describe a
+    warm process rather than the first request's imports and cache misses.
+    """
+    method, path, data_for = SCENARIOS[name]
+
+    # One logged-in client per worker, created up front so logins don't race
+    clients = []
+    for _ in range(concurrency):
+        client = Client()
+        client.force_login(user)
+        clients.append(client)
+
+    def send(client, i):
+        started = time.perf_counter()
+        if method == 'POST':
+            response = client.post(path, json.dumps(data_for(i)), content_type='application/json')
+        else:
+            response = client.get(path, data_for(i))
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return time.perf_counter() - started, response.status_code
+
+    def worker(client, indices):
+        return [send(client, i) for i in indices]
+
+    for i in range(warmup):
+        send(clients[0], i)
+
+    started = time.perf_counter()
+    if concurrency == 1:
+        samples = worker(clients[0], range(iterations))
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = [
+                executor.submit(worker, client, range(n, iterations, concurrency))
+                for n, client in enumerate(clients)
+            ]
+            samples = [sample for future in futures for sample in future.result()]
+    wall = time.perf_counter() - started
+
+    durations = sorted(duration * 1000 for duration, _ in samples)
+    return {
+        'requests': iterations,
+        'errors': sum(1 for _, status in samples if status >= 400),
+        'throughput_rps': round(iterations / wall, 2) if wall else 0.0,
+        'mean_ms': round(sum(durations) / len(durations), 2),
+        'p50_ms': round(percentile(durations, 50), 2),
+        'p95_ms': round(percentile(durations, 95), 2),
+        'p99_ms': round(percentile(durations, 99), 2),
+    }
+
+
+def run_suite(user, scenarios=None, iterations=50, concurrency=1, warmup=5):
+    """Results of every scenario in ``scenarios`` (all by default), keyed by name"""
+    return {
+        name: run_scenario(name, user, iterations, concurrency, warmup)
+        for name in scenarios or SCENARIOS
+    }
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Regressions of ``results`` against ``baseline`` results, as messages.
+
+    Latency percentiles regress when they grow by more than ``tolerance``,
+    throughput when it drops by more than that, and errors whenever any
+    appear that the baseline didn't have.
+    """
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        for metric in ('p50_ms', 'p95_ms', 'p99_ms'):
+            if before[metric] and result[metric] > before[metric] * (1 + tolerance):
+                regressions.append(f"{name}: {metric} {before[metric]} -> {result[metric]}")
+        if before['throughput_rps'] and result['throughput_rps'] < before['throughput_rps'] * (1 - tolerance):
+            regressions.append(f"{name}: throughput_rps {before['throughput_rps']} -> {result['throughput_rps']}")
+        if result['errors'] > before['errors']:
+            regressions.append(f"{name}: errors {before['errors']} -> {result['errors']}")
+    return regressions
@@ -0,0 +1,68 @@
+"""
+Conditional GET for JSON API views
+
+A view decorated with ``conditional_get`` is identified by the versions and
+stamps (see ``core.versions``) of everything its response is built from: the
+cached TMDB page, the user's Radarr catalog and library, the user's feedback.
+They make up its ETag and ``Last-Modified``, and a request whose
+``If-None-Match`` or ``If-Modified-Since`` still matches gets a 304 before
+the view runs, without upstream calls, queries or serialization.
+
+When one of the inputs isn't cached, the view runs as usual; the response
+gets validators if the inputs are cached after it.
+"""
+import hashlib
+from functools import wraps
+
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+
+def _validators(request, stamps):
+    """The ETag and Last-Modified (epoch seconds, or None) of a response built from ``stamps``"""
+    renderer = getattr(request, 'accepted_renderer', None)
+    identity = repr((
+        request.get_full_path(),
+        request.user.pk if request.user.is_authenticated else None,
+        renderer.format if renderer else None,
+        stamps,
+    ))
+    etag = f'W/"{hashlib.sha256(identity.encode("utf-8")).hexdigest()[:32]}"'
+    last_modified = int(max(stamps)) if stamps and max(stamps) else None
+    return etag, last_modified
+
+
+def _set_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    # Responses are per user: the browser may keep them, but must revalidate each time
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def conditional_get(stamps):
+    """
+    Answer conditional GETs of a DRF view method.
+
+    ``stamps(view, request)`` returns the versions and stamps the response
+    depends on, or None if one of them isn't cached.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            current = stamps(view, request)
+            if current is not None:
+                etag, last_modified = _validators(request, current)
+                not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+                if not_modified is not None:
+                    return _set_validators(not_modified, etag, last_modified)
+
+            response = method(view, request, *args, **kwargs)
+            if response.status_code == 200:
+                current = stamps(view, request)
+                if current is not None:
+                    _set_validators(response, *_validators(request, current))
+            return response
+        return wrapper
+    return decorator
@@ -1,10 +1,13 @@
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
 from django.db import connection
 from django.core.cache import cache
 from django.conf import settings
 import redis
 import os
 
+from .metrics import registry as metrics_registry
+from .warmup import warmup_state
+
 
 def health_check(request):
     """
@@ -104,6 +107,15 @@ def ready_check(request):
         with connection.cursor() as cursor:
             cursor.execute("SELECT 1")
         
+        # Not ready while the startup cache warmup runs (see `warm_caches --readiness`)
+        warmup = warmup_state()
+        if warmup is not None:
+            return JsonResponse({
+                'status': 'not_ready',
+                'message': 'Warming caches',
+                'warmup': warmup,
+            }, status=503)
+        
         return JsonResponse({
             'status': 'ready',
             'message': 'Application is ready to serve requests'
@@ -122,4 +134,18 @@ def liveness_check(request):
     return JsonResponse({
         'status': 'alive',
         'message': 'Application is alive'
-    })
\ No newline at end of file
+    })
+
+
+def metrics(request):
+    """
+    Upstream call and cache metrics in the Prometheus text format
+    """
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return HttpResponse('Unauthorized\n', status=401, content_type='text/plain')
+    
+    return HttpResponse(
+        metrics_registry.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
@@ -0,0 +1,254 @@
+"""
+Poster and backdrop image proxy with an on-disk cache
+
+Images are fetched once from TMDB or the user's Jellyfin server, transcoded
+to WebP at the requested width and written under ``IMAGE_CACHE_ROOT`` using
+the same relative path as the proxy URL. Nginx serves cached TMDB files
+directly (``try_files``) and only falls through to Django on a miss. Jellyfin
+artwork is private to the users of that server, so it always goes through
+Django's login check, and is fetched again once it is
+``JELLYFIN_IMAGE_MAX_AGE`` old because it can be replaced on the server.
+
+Entries are keyed by a hash of the image source: TMDB file names are already
+content hashes, Jellyfin items are namespaced by a hash of the server URL.
+The cache is bounded by ``IMAGE_CACHE_MAX_BYTES`` with least-recently-used
+eviction based on file access/modification times.
+"""
+import hashlib
+import io
+import logging
+import os
+import re
+import tempfile
+import time
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+
+from . import timing
+from .metrics import InstrumentedSession, record_cache
+
+logger = logging.getLogger(__name__)
+
+IMAGE_URL_PREFIX = '/images'
+TMDB_IMAGE_BASE_URL = 'https://image.tmdb.org/t/p'
+
+# Widths the proxy will produce; anything else is rejected to keep the cache bounded
+IMAGE_WIDTHS = {
+    'w92': 92,
+    'w185': 185,
+    'w300': 300,
+    'w342': 342,
+    'w500': 500,
+    'w780': 780,
+}
+
+WEBP_QUALITY = 80
+EVICTION_INTERVAL = 300  # seconds between eviction scans (shared by all workers)
+EVICTION_TARGET_RATIO = 0.9
+JELLYFIN_IMAGE_MAX_AGE = 7 * 24 * 60 * 60  # seconds
+
+_SAFE_NAME = re.compile(r'^[A-Za-z0-9_-]+$')
+
+tmdb_image_session = InstrumentedSession('tmdb-images')
+jellyfin_image_session = InstrumentedSession('jellyfin-images')
+
+
+def is_safe_name(value):
+    """Reject anything that could escape the cache directory"""
+    return bool(value) and bool(_SAFE_NAME.match(value))
+
+
+def server_key(server_url):
+    """Short stable key that namespaces a media server's item IDs"""
+    return hashlib.sha256((server_url or '').rstrip('/').encode('utf-8')).hexdigest()[:16]
+
+
+def tmdb_image_url(path, size='w500'):
+    """Public URL for a TMDB image path such as ``/abc123.jpg``"""
+    if not path:
+        return None
+    if path.startswith(('http://', 'https://', IMAGE_URL_PREFIX)):
+        return path
+    if not getattr(settings, 'IMAGE_PROXY_ENABLED', True):
+        return f"{TMDB_IMAGE_BASE_URL}/{size}{path}"
+
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return f"{IMAGE_URL_PREFIX}/tmdb/{size}/{stem}.webp"
+
+
+def jellyfin_image_url(server_url, item_id, size='w500'):
+    """Public URL for a Jellyfin item's primary image"""
+    if not getattr(settings, 'IMAGE_PROXY_ENABLED', True):
+        return f"{server_url}/Items/{item_id}/Images/Primary"
+    return f"{IMAGE_URL_PREFIX}/jellyfin/{server_key(server_url)}/{item_id}/{size}.webp"
+
+
+def transcode_to_webp(data, width):
+    """Downscale to ``width`` (never upscale) and encode as WebP"""
+    from PIL import Image
+
+    with Image.open(io.BytesIO(data)) as image:
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+        if image.width > width:
+            height = round(image.height * width / image.width)
+            image = image.resize((width, height), Image.LANCZOS)
+
+        output = io.BytesIO()
+        image.save(output, format='WEBP', quality=WEBP_QUALITY, method=4)
+        return output.getvalue()
+
+
+class ImageCache:
+    """Size-bounded on-disk image cache laid out to mirror the proxy URLs"""
+
+    def __init__(self, root=None, max_bytes=None):
+        self.root = root or settings.IMAGE_CACHE_ROOT
+        self.max_bytes = max_bytes or getattr(settings, 'IMAGE_CACHE_MAX_BYTES', 1024 * 1024 * 1024)
+
+    def path_for(self, *parts):
+        return os.path.join(self.root, *parts)
+
+    def get(self, path, max_age=None):
+        """
+        Return the cached file path, refreshing its LRU timestamp, or None.
+
+        Entries written more than ``max_age`` seconds ago count as missing.
+        Only the access time is refreshed, so the modification time stays
+        the time the entry was written.
+        """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        if max_age is not None and time.time() - stat.st_mtime > max_age:
+            return None
+        try:
+            os.utime(path, (time.time(), stat.st_mtime))
+        except OSError:
+            pass
+        return path
+
+    def put(self, path, data):
+        """Atomically write an entry so nginx never serves a partial file"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as tmp_file:
+                tmp_file.write(data)
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        self.maybe_evict()
+        return path
+
+    def maybe_evict(self):
+        # cache.add is atomic, so only one worker scans per interval
+        if cache.add('image-cache:eviction-lock', True, EVICTION_INTERVAL):
+            self.evict()
+
+    def evict(self):
+        """Remove least recently used entries until the cache is under its target size"""
+        entries = []
+        total = 0
+        for dirpath, _dirnames, filenames in os.walk(self.root):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                # Hits only update atime; mtime is when the entry was written
+                entries.append((max(stat.st_atime, stat.st_mtime), stat.st_size, path))
+                total += stat.st_size
+
+        if total <= self.max_bytes:
+            return 0
+
+        target = self.max_bytes * EVICTION_TARGET_RATIO
+        removed = 0
+        for _last_used, size, path in sorted(entries):
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                removed += 1
+            except OSError:
+                continue
+
+        logger.info(f"Image cache eviction removed {removed} files")
+        return removed
+
+
+class ImageProxyService:
+    """Fetch, resize and cache poster/backdrop images"""
+
+    def __init__(self, image_cache=None):
+        self.cache = image_cache or ImageCache()
+
+    def get_tmdb_image(self, size, stem):
+        path = self.cache.path_for('tmdb', size, f"{stem}.webp")
+
+        def fetch():
+            # TMDB serves the same pre-sized widths; posters are JPEG, logos PNG
+            for extension in ('jpg', 'png'):
+                data = self._download(f"{TMDB_IMAGE_BASE_URL}/{size}/{stem}.{extension}")
+                if data:
+                    return data
+            return None
+
+        return self._get_or_create(path, IMAGE_WIDTHS[size], fetch)
+
+    def get_jellyfin_image(self, server_url, api_key, item_id, size):
+        path = self.cache.path_for('jellyfin', server_key(server_url), item_id, f"{size}.webp")
+        width = IMAGE_WIDTHS[size]
+
+        def fetch():
+            return self._download(
+                f"{server_url.rstrip('/')}/Items/{item_id}/Images/Primary",
+                params={'maxWidth': width},
+                headers={'X-MediaBrowser-Token': api_key} if api_key else None,
+                session=jellyfin_image_session,
+            )
+
+        return self._get_or_create(path, width, fetch, max_age=JELLYFIN_IMAGE_MAX_AGE)
+
+    def _get_or_create(self, path, width, fetch, max_age=None):
+        with timing.span('cache'):
+            cached = self.cache.get(path, max_age)
+        record_cache('images', bool(cached))
+        if cached:
+            return cached
+
+        data = fetch()
+        if not data:
+            return None
+
+        try:
+            webp = transcode_to_webp(data, width)
+        except Exception as e:
+            logger.error(f"Error transcoding image for {path}: {e}")
+            return None
+
+        return self.cache.put(path, webp)
+
+    def _download(self, url, params=None, headers=None, session=None):
+        started = time.monotonic()
+        try:
+            response = (session or tmdb_image_session).get(url, params=params, headers=headers, timeout=10)
+            if response.status_code != 200:
+                return None
+            if not response.headers.get('Content-Type', '').startswith('image/'):
+                return None
+            logger.debug(f"Fetched image {url} in {time.monotonic() - started:.2f}s")
+            return response.content
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Error fetching image {url}: {e}")
+            return None
@@ -0,0 +1,154 @@
+import json
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import (
+    override_settings, setup_databases, setup_test_environment,
+    teardown_databases, teardown_test_environment,
+)
+
+from core.benchmark.stubs import StubUpstreams, parse_latencies
+from core.benchmark.suite import DEFAULT_TOLERANCE, SCENARIOS, compare, create_benchmark_user, run_suite
+
+DEFAULT_BASELINE = os.path.join(settings.BASE_DIR, 'benchmarks', 'baseline.json')
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the main endpoints against in-process stub upstreams, in a '
+        'throwaway test database, and compare with a stored baseline'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scenario',
+            action='append',
+            choices=sorted(SCENARIOS),
+            help='Scenario to run; repeat for several (default: all)',
+        )
+        parser.add_argument('--iterations', type=int, default=50, help='Measured requests per scenario')
+        parser.add_argument('--warmup', type=int, default=5, help='Uncounted requests before measuring')
+        parser.add_argument('--concurrency', type=int, default=1, help='Concurrent clients')
+        parser.add_argument('--latency-ms', type=float, default=20, help='Stub response delay')
+        parser.add_argument(
+            '--upstream-latency',
+            action='append',
+            default=[],
+            metavar='UPSTREAM=MS',
+            help='Stub delay for one upstream, e.g. gemini=800; repeatable',
+        )
+        parser.add_argument('--page-size', type=int, default=20, help='TMDB results per page')
+        parser.add_argument('--library-size', type=int, default=500, help='Titles on the media server and Radarr')
+        parser.add_argument('--media-server', choices=['jellyfin', 'plex'], default='jellyfin')
+        parser.add_argument(
+            '--save-baseline',
+            nargs='?',
+            const=DEFAULT_BASELINE,
+            help=f'Store the results as the baseline (default path: {DEFAULT_BASELINE})',
+        )
+        parser.add_argument(
+            '--compare',
+            nargs='?',
+            const=DEFAULT_BASELINE,
+            help='Fail if results regress against this baseline',
+        )
+        parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE, help='Allowed relative change')
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1 or options['concurrency'] < 1 or options['warmup'] < 0:
+            raise CommandError('--iterations and --concurrency must be positive, --warmup not negative')
+
+        try:
+            latencies = parse_latencies(options['upstream_latency'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        config = {
+            'iterations': options['iterations'],
+            'concurrency': options['concurrency'],
+            'latency_ms': options['latency_ms'],
+            'upstream_latency_ms': {name: seconds * 1000 for name, seconds in sorted(latencies.items())},
+            'page_size': options['page_size'],
+            'library_size': options['library_size'],
+            'media_server': options['media_server'],
+        }
+
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare']) as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Could not read baseline {options['compare']}: {e}")
+            if baseline.get('config') != config:
+                self.stdout.write(self.style.WARNING('Baseline was recorded with different options'))
+
+        stubs = StubUpstreams(
+            latency=options['latency_ms'] / 1000,
+            latencies=latencies,
+            page_size=options['page_size'],
+            library_size=options['library_size'],
+        )
+        # SQLite's shared in-memory test database fails concurrent writes
+        # instead of waiting for them, so concurrent runs use a file
+        database = connections.databases[DEFAULT_DB_ALIAS]
+        if database['ENGINE'].endswith('sqlite3') and options['concurrency'] > 1:
+            database.setdefault('TEST', {})['NAME'] = os.path.join(tempfile.mkdtemp(), 'benchmark.sqlite3')
+
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            with stubs, override_settings(
+                CACHES={'default': {
+                    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                    'LOCATION': 'benchmark',
+                }},
+                SECURE_SSL_REDIRECT=False,
+                REQUEST_TIMING_SLOW_MS=float('inf'),
+                REQUEST_TIMING_SAMPLE_RATE=0,
+                PROFILE_SAMPLE_RATE=0,
+                **stubs.settings()
+            ):
+                user = create_benchmark_user(stubs, options['media_server'])
+                results = run_suite(
+                    user,
+                    scenarios=options['scenario'],
+                    iterations=options['iterations'],
+                    concurrency=options['concurrency'],
+                    warmup=options['warmup'],
+                )
+                upstream_requests = stubs.request_counts()
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        self._report(results, upstream_requests)
+
+        if options['save_baseline']:
+            os.makedirs(os.path.dirname(os.path.abspath(options['save_baseline'])), exist_ok=True)
+            with open(options['save_baseline'], 'w') as f:
+                json.dump({'config': config, 'results': results}, f, indent=2, sort_keys=True)
+            self.stdout.write(self.style.SUCCESS(f"Baseline saved to {options['save_baseline']}"))
+
+        if baseline is not None:
+            regressions = compare(results, baseline.get('results', {}), options['tolerance'])
+            if regressions:
+                for regression in regressions:
+                    self.stdout.write(self.style.ERROR(f'  {regression}'))
+                raise CommandError(f'{len(regressions)} regression(s) against {options["compare"]}')
+            self.stdout.write(self.style.SUCCESS('No regressions against the baseline'))
+
+    def _report(self, results, upstream_requests):
+        self.stdout.write(
+            f"{'scenario':<20} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}"
+        )
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<20} {result['throughput_rps']:>8} {result['p50_ms']:>9} "
+                f"{result['p95_ms']:>9} {result['p99_ms']:>9} {result['errors']:>7}"
+            )
+        calls = ', '.join(f'{name}={count}' for name, count in upstream_requests.items())
+        self.stdout.write(f'Upstream requests: {calls}')
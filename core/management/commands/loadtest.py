@@ -0,0 +1,223 @@
+import os
+import secrets
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import requests
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmark.loadgen import SESSIONS, find_saturation, login, run_load
+from core.benchmark.stubs import StubUpstreams, parse_latencies
+from core.benchmark.suite import create_benchmark_user
+
+
+def _int_list(value):
+    try:
+        values = [int(part) for part in value.split(',') if part.strip()]
+    except ValueError:
+        raise CommandError(f'Expected comma-separated numbers, got {value!r}')
+    if not values or min(values) < 1:
+        raise CommandError(f'Expected positive numbers, got {value!r}')
+    return values
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _delete_cache_prefix(key_prefix):
+    """Remove what gunicorn stored under ``key_prefix`` in the shared Redis cache"""
+    cache_settings = settings.CACHES['default']
+    if cache_settings['BACKEND'] != 'django.core.cache.backends.redis.RedisCache':
+        return
+    import redis
+    client = redis.Redis.from_url(cache_settings['LOCATION'])
+    keys = list(client.scan_iter(match=f'{key_prefix}:*', count=1000))
+    for start in range(0, len(keys), 1000):
+        client.delete(*keys[start:start + 1000])
+
+
+class Command(BaseCommand):
+    help = (
+        'Replay scripted dashboard, scroll, search, recommendation and chat sessions at rising '
+        'concurrency against gunicorn, for each worker count, with stub upstreams'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', default='1,2,3,4', help='Gunicorn worker counts to compare')
+        parser.add_argument('--users', default='1,2,4,8,16,32', help='Concurrent virtual users per step')
+        parser.add_argument('--step-seconds', type=float, default=20, help='Duration of each step')
+        parser.add_argument('--think-time', type=float, default=1.0, help='Mean pause between sessions (s)')
+        parser.add_argument(
+            '--session',
+            action='append',
+            choices=sorted(SESSIONS),
+            help='Session script to replay; repeat for several (default: all, weighted)',
+        )
+        parser.add_argument('--latency-slo-ms', type=float, help='p95 above this counts as saturated')
+        parser.add_argument('--latency-ms', type=float, default=20, help='Stub response delay')
+        parser.add_argument(
+            '--upstream-latency',
+            action='append',
+            default=[],
+            metavar='UPSTREAM=MS',
+            help='Stub delay for one upstream, e.g. gemini=800; repeatable',
+        )
+        parser.add_argument('--library-size', type=int, default=500, help='Titles on the media server and Radarr')
+        parser.add_argument('--media-server', choices=['jellyfin', 'plex'], default='jellyfin')
+        parser.add_argument(
+            '--target',
+            help='Load an already running server at this URL instead of starting gunicorn',
+        )
+        parser.add_argument('--username', help='Login for --target')
+        parser.add_argument('--password', help='Password for --target')
+
+    def handle(self, *args, **options):
+        levels = _int_list(options['users'])
+        load_options = {
+            'sessions': options['session'],
+            'think_time': options['think_time'],
+        }
+
+        if options['target']:
+            if not options['username'] or not options['password']:
+                raise CommandError('--target needs --username and --password')
+            steps = self._ramp(options['target'], options['username'], options['password'], levels, options, load_options)
+            self._report_saturation('target', steps, options)
+            return
+
+        try:
+            latencies = parse_latencies(options['upstream_latency'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        stubs = StubUpstreams(
+            latency=options['latency_ms'] / 1000,
+            latencies=latencies,
+            library_size=options['library_size'],
+        )
+        # Names unique to this run, so it never touches an existing account or cache entry
+        run_id = secrets.token_hex(4)
+        username = f'loadtest-{run_id}'
+        if User.objects.filter(username=username).exists():
+            raise CommandError(f'User {username} already exists; run the command again')
+        password = secrets.token_urlsafe(16)
+        key_prefix = f'loadtest-{run_id}'
+        metrics_dir = tempfile.mkdtemp(prefix='loadtest-metrics-')
+        summaries = []
+        with stubs:
+            # A throwaway user in the configured database whose integrations point at the stubs
+            user = create_benchmark_user(stubs, options['media_server'], username=username)
+            user.set_password(password)
+            user.save()
+            try:
+                for workers in _int_list(options['workers']):
+                    self.stdout.write(self.style.MIGRATE_HEADING(f'gunicorn --workers {workers}'))
+                    with _Gunicorn(workers, stubs, self.stdout, key_prefix, metrics_dir) as base_url:
+                        steps = self._ramp(base_url, username, password, levels, options, load_options)
+                    summaries.append((workers, self._report_saturation(f'{workers} workers', steps, options)))
+            finally:
+                User.objects.filter(pk=user.pk).delete()
+                _delete_cache_prefix(key_prefix)
+                shutil.rmtree(metrics_dir, ignore_errors=True)
+
+        self.stdout.write(self.style.MIGRATE_HEADING('Saturation by worker count'))
+        for workers, (best, reason) in summaries:
+            if best is None:
+                self.stdout.write(f'  {workers} workers: saturated from the first step ({reason})')
+            else:
+                self.stdout.write(
+                    f"  {workers} workers: {best['users']} users, {best['throughput_rps']} req/s, "
+                    f"p95 {best['p95_ms']} ms" + (f' ({reason})' if reason else ' (not saturated)')
+                )
+
+    def _ramp(self, base_url, username, password, levels, options, load_options):
+        try:
+            cookies = login(base_url, username, password)
+        except (RuntimeError, requests.exceptions.RequestException) as e:
+            raise CommandError(str(e))
+        self.stdout.write(f"{'users':>6} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+        steps = []
+        for users in levels:
+            step = run_load(base_url, cookies, users, options['step_seconds'], **load_options)
+            steps.append(step)
+            self.stdout.write(
+                f"{users:>6} {step['throughput_rps']:>8} {step['p50_ms']:>9} {step['p95_ms']:>9} "
+                f"{step['p99_ms']:>9} {step['error_rate']:>7.1%}"
+            )
+        return steps
+
+    def _report_saturation(self, label, steps, options):
+        best, reason = find_saturation(steps, latency_slo_ms=options['latency_slo_ms'])
+        if reason:
+            self.stdout.write(self.style.WARNING(f'{label}: saturated - {reason}'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'{label}: not saturated up to {steps[-1]["users"]} users'))
+        return best, reason
+
+
+class _Gunicorn:
+    """
+    Gunicorn serving this project on a free local port, with upstream calls
+    sent to the stubs. Its cache entries live under ``key_prefix`` and its
+    metrics in ``metrics_dir``, apart from those of the running application.
+    """
+
+    def __init__(self, workers, stubs, stdout, key_prefix, metrics_dir):
+        self.workers = workers
+        self.stubs = stubs
+        self.stdout = stdout
+        self.key_prefix = key_prefix
+        self.metrics_dir = metrics_dir
+        self.process = None
+
+    def __enter__(self):
+        port = _free_port()
+        env = dict(os.environ, **{name: str(value) for name, value in self.stubs.settings().items()})
+        env['CACHE_KEY_PREFIX'] = self.key_prefix
+        env['METRICS_DIR'] = self.metrics_dir
+        env.setdefault('DJANGO_SETTINGS_MODULE', 'suggesterr.settings')
+        log_path = os.path.join(tempfile.gettempdir(), f'loadtest-gunicorn-{self.workers}.log')
+        self.log = open(log_path, 'w')
+        self.process = subprocess.Popen(
+            [
+                sys.executable, '-m', 'gunicorn',
+                '--bind', f'127.0.0.1:{port}',
+                '--workers', str(self.workers),
+                '--timeout', '120',
+                'suggesterr.wsgi:application',
+            ],
+            cwd=settings.BASE_DIR, env=env, stdout=self.log, stderr=subprocess.STDOUT,
+        )
+        base_url = f'http://127.0.0.1:{port}'
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                self.__exit__()
+                raise CommandError(f'gunicorn exited with status {self.process.returncode}; see {log_path}')
+            try:
+                requests.get(f'{base_url}/health/', timeout=1)
+                self.stdout.write(f'Serving on {base_url}, log in {log_path}')
+                return base_url
+            except requests.exceptions.RequestException:
+                time.sleep(0.2)
+        self.__exit__()
+        raise CommandError(f'gunicorn did not start within 60s; see {log_path}')
+
+    def __exit__(self, *exc_info):
+        if self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        self.log.close()
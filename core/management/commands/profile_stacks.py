@@ -0,0 +1,73 @@
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.profiling import merge_profiles, profile_token
+
+
+class Command(BaseCommand):
+    help = 'Merge sampled request profiles into folded stacks for flame graph tools'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--view',
+            help='Only stacks of this view name (e.g. core:dashboard)',
+        )
+        parser.add_argument(
+            '--hours',
+            type=float,
+            help='Only profiles written in the last N hours',
+        )
+        parser.add_argument(
+            '--output',
+            help='Write the merged stacks to this file instead of stdout',
+        )
+        parser.add_argument(
+            '--summary',
+            action='store_true',
+            help='List sample counts per view instead of the stacks',
+        )
+        parser.add_argument(
+            '--token',
+            action='store_true',
+            help='Print an X-Suggesterr-Profile header value that profiles the request carrying it',
+        )
+        parser.add_argument(
+            '--directory',
+            default=settings.PROFILE_DIR,
+            help='Profile directory (default: PROFILE_DIR)',
+        )
+
+    def handle(self, *args, **options):
+        if options['token']:
+            self.stdout.write(profile_token())
+            return
+
+        since = None
+        if options['hours'] is not None:
+            if options['hours'] <= 0:
+                raise CommandError('--hours must be positive')
+            since = time.time() - options['hours'] * 3600
+
+        stacks = merge_profiles(options['directory'], since=since, view=options['view'])
+        if not stacks:
+            self.stderr.write(f"No profiles found in {options['directory']}")
+            return
+
+        if options['summary']:
+            views = Counter()
+            for stack, count in stacks.items():
+                views[stack.split(';', 1)[0]] += count
+            for view, count in views.most_common():
+                self.stdout.write(f"{count:>8}  {view}")
+            return
+
+        lines = [f"{stack} {count}" for stack, count in sorted(stacks.items())]
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write('\n'.join(lines) + '\n')
+            self.stdout.write(self.style.SUCCESS(f"Wrote {len(lines)} stacks to {options['output']}"))
+        else:
+            self.stdout.write('\n'.join(lines))
@@ -0,0 +1,97 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.warmup import Warmup, mark_pending
+from movies.tmdb_service import MOVIE_LISTS
+
+# by_genre needs a genre, which a warmup has no reason to pick
+WARMABLE_LISTS = [name for name in MOVIE_LISTS if name != 'by_genre']
+
+
+class Command(BaseCommand):
+    help = 'Prefetch TMDB lists and genres, Radarr catalogs and active users\' libraries into the cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lists',
+            help=f"Comma-separated TMDB lists to prefetch, of {', '.join(WARMABLE_LISTS)} (default: WARMUP_TMDB_LISTS)",
+        )
+        parser.add_argument(
+            '--pages',
+            type=int,
+            help='Pages of each TMDB list (default: WARMUP_TMDB_PAGES)',
+        )
+        parser.add_argument(
+            '--active-days',
+            type=int,
+            help='Warm the libraries and catalogs of users who logged in within N days (default: WARMUP_ACTIVE_DAYS)',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=4,
+            help='Fetches running at once (default: 4)',
+        )
+        parser.add_argument(
+            '--per-upstream',
+            type=int,
+            default=2,
+            help='Fetches running at once against one TMDB, Radarr or media server instance (default: 2)',
+        )
+        parser.add_argument(
+            '--readiness',
+            action='store_true',
+            help='Report /ready/ as not ready until the first run finishes',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=0,
+            help='Run again every N seconds, until stopped (default: run once)',
+        )
+
+    def handle(self, *args, **options):
+        lists = None
+        if options['lists']:
+            lists = [name for name in options['lists'].split(',') if name]
+            unknown = sorted(set(lists) - set(WARMABLE_LISTS))
+            if unknown:
+                raise CommandError(f"Unknown TMDB lists: {', '.join(unknown)}")
+        for name in ('pages', 'concurrency', 'per_upstream'):
+            if options[name] is not None and options[name] < 1:
+                raise CommandError(f"--{name.replace('_', '-')} must be at least 1")
+
+        readiness = options['readiness']
+        if readiness:
+            # Not ready from the start, while the users and instances to warm are looked up
+            mark_pending()
+        while True:
+            warmup = Warmup(
+                lists=lists,
+                pages=options['pages'],
+                active_days=options['active_days'],
+                concurrency=options['concurrency'],
+                per_upstream=options['per_upstream'],
+                readiness=readiness,
+                progress=self._progress,
+            )
+            started = time.perf_counter()
+            failed = warmup.run()
+            elapsed = time.perf_counter() - started
+            if failed:
+                self.stdout.write(self.style.WARNING(
+                    f"Warmed caches in {elapsed:.1f}s; {len(failed)} failed: {', '.join(failed)}"
+                ))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"Warmed caches in {elapsed:.1f}s"))
+
+            if options['interval'] <= 0:
+                return
+            # Only the first run holds readiness
+            readiness = False
+            time.sleep(options['interval'])
+
+    def _progress(self, done, total, label, ok, seconds):
+        status = 'ok' if ok else self.style.ERROR('failed')
+        self.stdout.write(f"[{done}/{total}] {label}: {status} ({seconds * 1000:.0f} ms)")
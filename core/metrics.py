@@ -0,0 +1,282 @@
+"""
+Lightweight metrics for upstream calls and caches, in Prometheus text format
+
+Each worker process keeps its counters and histograms in memory and writes
+a snapshot to METRICS_DIR every few seconds. The /metrics endpoint sums the
+snapshots of every worker, so gunicorn workers don't need to share memory
+and recording a sample is only a dict update under a lock. Snapshots are
+named after the worker's PID; those of processes that are no longer running
+are removed when metrics are collected, and start.sh clears the directory.
+"""
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+
+from . import timing
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL = 5  # seconds between snapshot writes
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+METRICS = {
+    'upstream_requests_total': (
+        'counter', 'Calls to upstream services by upstream, endpoint and status'
+    ),
+    'upstream_request_duration_seconds': (
+        'histogram', 'Duration of upstream calls in seconds'
+    ),
+    'upstream_response_bytes_total': (
+        'counter', 'Response body bytes received from upstream services, where announced'
+    ),
+    'upstream_errors_total': (
+        'counter', 'Upstream responses that could not be used, by upstream and reason'
+    ),
+    'cache_requests_total': (
+        'counter', 'Cache lookups by cache and result'
+    ),
+}
+
+_ID_SEGMENT = re.compile(r'^(\d+|[0-9a-fA-F-]{16,})$')
+_FILE_SEGMENT = re.compile(r'\.(jpe?g|png|webp|gif|svg)$', re.IGNORECASE)
+
+
+def endpoint_class(url):
+    """
+    Low-cardinality endpoint label for a URL: IDs and file names become placeholders.
+
+    ``https://api.themoviedb.org/3/movie/550`` becomes ``/3/movie/:id``.
+    """
+    segments = []
+    for segment in urlsplit(url).path.split('/'):
+        if not segment:
+            continue
+        # A leading number is an API version, like TMDB's /3/
+        if segments and _ID_SEGMENT.match(segment):
+            segment = ':id'
+        elif _FILE_SEGMENT.search(segment):
+            segment = ':file'
+        segments.append(segment)
+    return '/' + '/'.join(segments[:5])
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _pid_running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class MetricsRegistry:
+    """Per-process metric values with periodic snapshots for cross-worker aggregation"""
+
+    def __init__(self, directory=None, flush_interval=FLUSH_INTERVAL, worker_id=None):
+        self.directory = directory
+        self.worker_id = worker_id
+        self.flush_interval = flush_interval
+        self._counters = defaultdict(float)
+        self._histograms = {}
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def _get_directory(self):
+        if self.directory is None:
+            self.directory = settings.METRICS_DIR
+        return self.directory
+
+    def inc(self, name, labels, value=1):
+        with self._lock:
+            self._counters[(name, _label_key(labels))] += value
+        self._maybe_flush()
+
+    def observe(self, name, labels, value):
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                # One count per bucket, then sum and count
+                histogram = self._histograms[key] = [0] * len(DURATION_BUCKETS) + [0.0, 0]
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if value <= bound:
+                    histogram[i] += 1
+            histogram[-2] += value
+            histogram[-1] += 1
+        self._maybe_flush()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'counters': [[name, list(labels), value] for (name, labels), value in self._counters.items()],
+                'histograms': [[name, list(labels), values] for (name, labels), values in self._histograms.items()],
+            }
+
+    def _maybe_flush(self):
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Write this process's snapshot where every worker's /metrics can read it"""
+        self._last_flush = time.monotonic()
+        directory = self._get_directory()
+        path = os.path.join(directory, f"{self.worker_id or os.getpid()}.json")
+        try:
+            os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(self.snapshot(), f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write metrics snapshot: {e}")
+
+    def collect(self):
+        """Sum the snapshots of every worker, including a fresh one of this process"""
+        self.flush()
+        counters = defaultdict(float)
+        histograms = {}
+        directory = self._get_directory()
+        try:
+            names = [name for name in os.listdir(directory) if name.endswith('.json')]
+        except OSError:
+            names = []
+
+        for name in names:
+            path = os.path.join(directory, name)
+            if self.worker_id is None and self._prune(path, name):
+                continue
+            try:
+                with open(path) as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue
+            for metric, labels, value in snapshot.get('counters', []):
+                counters[(metric, tuple(map(tuple, labels)))] += value
+            for metric, labels, values in snapshot.get('histograms', []):
+                key = (metric, tuple(map(tuple, labels)))
+                if key in histograms:
+                    histograms[key] = [a + b for a, b in zip(histograms[key], values)]
+                else:
+                    histograms[key] = list(values)
+        return counters, histograms
+
+    def _prune(self, path, name):
+        """Remove the snapshot at ``path`` if the process it is named after has exited"""
+        pid = name[:-len('.json')]
+        if not pid.isdigit() or _pid_running(int(pid)):
+            return False
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        return True
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        counters, histograms = self.collect()
+        lines = []
+        for metric, (metric_type, help_text) in METRICS.items():
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} {metric_type}")
+            for (name, labels), value in sorted(counters.items()):
+                if name == metric:
+                    lines.append(f"{metric}{_format_labels(labels)} {value:g}")
+            for (name, labels), values in sorted(histograms.items()):
+                if name != metric:
+                    continue
+                for bound, count in zip(DURATION_BUCKETS, values):
+                    lines.append(f"{metric}_bucket{_format_labels(labels + (('le', f'{bound:g}'),))} {count}")
+                lines.append(f"{metric}_bucket{_format_labels(labels + (('le', '+Inf'),))} {values[-1]}")
+                lines.append(f"{metric}_sum{_format_labels(labels)} {values[-2]:.6f}")
+                lines.append(f"{metric}_count{_format_labels(labels)} {values[-1]}")
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels) + '}'
+
+
+registry = MetricsRegistry()
+
+
+def record_upstream_call(upstream, endpoint, status, duration, response_bytes=0):
+    timing.add(upstream, duration)
+    labels = {'upstream': upstream, 'endpoint': endpoint}
+    registry.inc('upstream_requests_total', dict(labels, status=status))
+    registry.observe('upstream_request_duration_seconds', labels, duration)
+    if response_bytes:
+        registry.inc('upstream_response_bytes_total', labels, response_bytes)
+
+
+def record_upstream_error(upstream, reason):
+    """Count a response of ``upstream`` that was received but could not be used"""
+    registry.inc('upstream_errors_total', {'upstream': upstream, 'reason': reason})
+
+
+def record_cache(cache_name, hit):
+    registry.inc('cache_requests_total', {'cache': cache_name, 'result': 'hit' if hit else 'miss'})
+
+
+def cache_get(cache_name, key):
+    """``cache.get(key)``, timed for the request and counted as a hit or miss of ``cache_name``"""
+    with timing.span('cache'):
+        value = cache.get(key)
+    record_cache(cache_name, value is not None)
+    return value
+
+
+class InstrumentedSession(requests.Session):
+    """``requests.Session`` that records every call it makes against ``upstream``"""
+
+    def __init__(self, upstream):
+        super().__init__()
+        self.upstream = upstream
+
+    def request(self, method, url, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = super().request(method, url, *args, **kwargs)
+        except requests.exceptions.Timeout:
+            record_upstream_call(self.upstream, endpoint_class(url), 'timeout', time.perf_counter() - started)
+            raise
+        except requests.exceptions.ConnectionError:
+            record_upstream_call(self.upstream, endpoint_class(url), 'connection_error', time.perf_counter() - started)
+            raise
+        except requests.exceptions.RequestException:
+            record_upstream_call(self.upstream, endpoint_class(url), 'error', time.perf_counter() - started)
+            raise
+
+        try:
+            response_bytes = int(response.headers.get('Content-Length') or 0)
+        except ValueError:
+            response_bytes = 0
+        record_upstream_call(
+            self.upstream, endpoint_class(url), str(response.status_code),
+            time.perf_counter() - started, response_bytes
+        )
+        return response
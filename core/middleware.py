@@ -1,8 +1,25 @@
+from contextlib import ExitStack
 from django.http import HttpResponsePermanentRedirect
 from django.conf import settings
+from django.db import connections
+from django.utils.cache import patch_vary_headers
+import gzip
+import json
 import logging
+import random
+import re
+import threading
+import zlib
+
+from . import profiling, timing
+
+try:
+    import brotli
+except ImportError:  # optional: without it responses are gzipped
+    brotli = None
 
 logger = logging.getLogger(__name__)
+timing_logger = logging.getLogger('suggesterr.timing')
 
 
 class SecurityHeadersMiddleware:
@@ -42,7 +59,8 @@ class HTTPSRedirectMiddleware:
         if (settings.DEBUG or 
             request.path.startswith('/health/') or 
             request.path.startswith('/ready/') or 
-            request.path.startswith('/live/')):
+            request.path.startswith('/live/') or 
+            request.path == '/metrics'):
             return self.get_response(request)
         
         # Only redirect if SSL is forced and not already secure
@@ -88,4 +106,149 @@ class ErrorLoggingMiddleware:
             'request_host': request.get_host(),
             'user_agent': request.META.get('HTTP_USER_AGENT', ''),
         })
-        return None
\ No newline at end of file
+        return None
+
+
+class ServerTimingMiddleware:
+    """
+    Break each request's time down into database, upstream, cache and render
+    spans, sent as a Server-Timing header and logged for slow or sampled requests
+    """
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings, token = timing.start()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(self._time_query))
+                response = self.get_response(request)
+        finally:
+            timing.stop(token)
+        
+        if settings.SERVER_TIMING_HEADER:
+            response['Server-Timing'] = timings.server_timing()
+        
+        total_ms = timings.elapsed() * 1000
+        slow = total_ms >= settings.REQUEST_TIMING_SLOW_MS
+        if slow or random.random() < settings.REQUEST_TIMING_SAMPLE_RATE:
+            timing_logger.info(json.dumps({
+                'event': 'request_timing',
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'total_ms': round(total_ms, 1),
+                'slow': slow,
+                'spans': timings.as_dict(),
+            }))
+        
+        return response
+
+    @staticmethod
+    def _time_query(execute, sql, params, many, context):
+        with timing.span('db'):
+            return execute(sql, params, many, context)
+
+    def process_template_response(self, request, response):
+        """Time rendering (DRF serializes to JSON here) without leaving a wrapper on the response"""
+        render = response.render
+        
+        def timed_render():
+            del response.render
+            with timing.span('render'):
+                return render()
+        
+        response.render = timed_render
+        return response
+
+
+class ProfilingMiddleware:
+    """
+    Sample the stacks of profiled requests (see ``core.profiling``) and
+    aggregate them under the view that handled the request
+    """
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not profiling.should_profile(request):
+            return self.get_response(request)
+        
+        thread_id = threading.get_ident()
+        profiling.sampler.start(thread_id)
+        try:
+            return self.get_response(request)
+        finally:
+            samples = profiling.sampler.stop(thread_id)
+            match = getattr(request, 'resolver_match', None)
+            profiling.store.add(match.view_name if match else 'unresolved', samples)
+
+
+class CompressionMiddleware:
+    """
+    Compress JSON API responses of at least COMPRESSION_MIN_BYTES with brotli
+    (if installed and accepted) or gzip.
+    
+    Only JSON is compressed: HTML pages carry the CSRF token, which must not
+    be compressed along with user input (BREACH). Streamed NDJSON is flushed
+    after every chunk, so each line still reaches the client when it is sent.
+    """
+    content_types = ('application/json', 'application/x-ndjson')
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        encoding = self._encoding(request, response)
+        if encoding is None:
+            return response
+        
+        if response.streaming:
+            response.streaming_content = self._compress_stream(response.streaming_content, encoding)
+            del response.headers['Content-Length']
+        else:
+            if len(response.content) < settings.COMPRESSION_MIN_BYTES:
+                return response
+            compressed = brotli.compress(response.content) if encoding == 'br' else gzip.compress(response.content, 6, mtime=0)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+        
+        patch_vary_headers(response, ('Accept-Encoding',))
+        response['Content-Encoding'] = encoding
+        # The compressed body differs byte for byte, which only a weak ETag allows
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = f"W/{etag}"
+        return response
+
+    def _encoding(self, request, response):
+        """``br``, ``gzip``, or None if the response shouldn't be compressed"""
+        if response.status_code != 200 or response.has_header('Content-Encoding'):
+            return None
+        if response.get('Content-Type', '').split(';')[0].strip() not in self.content_types:
+            return None
+        accept_encoding = request.META.get('HTTP_ACCEPT_ENCODING', '')
+        if brotli is not None and re.search(r'\bbr\b', accept_encoding):
+            return 'br'
+        if re.search(r'\bgzip\b', accept_encoding):
+            return 'gzip'
+        return None
+
+    @staticmethod
+    def _compress_stream(chunks, encoding):
+        if encoding == 'br':
+            compressor = brotli.Compressor()
+            for chunk in chunks:
+                yield compressor.process(chunk) + compressor.flush()
+            yield compressor.finish()
+        else:
+            compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)  # gzip container
+            for chunk in chunks:
+                yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            yield compressor.flush()
@@ -0,0 +1,199 @@
+"""
+Sampling profiler for live requests
+
+Profiling is opt-in. PROFILE_SAMPLE_RATE=N profiles one request in N, and a
+request carrying an ``X-Suggesterr-Profile`` header with a token from
+``profile_token()`` is always profiled. While a request is profiled, one
+background thread per process snapshots its stack every PROFILE_INTERVAL_MS;
+the request itself runs uninstrumented. ``ProfilingMiddleware`` decides which
+requests are profiled.
+
+Stacks are aggregated per view in the folded format flame graph tools read
+(``view;frame;frame count``) and written per worker and per hour under
+PROFILE_DIR. Files older than PROFILE_RETENTION_HOURS are removed. The
+``profile_stacks`` command merges them.
+"""
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core import signing
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = 'HTTP_X_SUGGESTERR_PROFILE'
+TOKEN_SALT = 'core.profiling'
+MAX_DEPTH = 128
+
+
+def profile_token():
+    """Token that makes the request carrying it in ``X-Suggesterr-Profile`` profiled"""
+    return signing.TimestampSigner(salt=TOKEN_SALT).sign('profile')
+
+
+def _valid_token(token):
+    try:
+        signing.TimestampSigner(salt=TOKEN_SALT).unsign(token, max_age=settings.PROFILE_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def should_profile(request):
+    token = request.META.get(PROFILE_HEADER)
+    if token:
+        return _valid_token(token)
+    rate = settings.PROFILE_SAMPLE_RATE
+    return rate > 0 and random.randrange(rate) == 0
+
+
+def fold(frame):
+    """``module:function`` frames from the outermost call inwards, joined by ``;``"""
+    frames = []
+    while frame is not None and len(frames) < MAX_DEPTH:
+        code = frame.f_code
+        frames.append(f"{frame.f_globals.get('__name__', '?')}:{code.co_name}")
+        frame = frame.f_back
+    return ';'.join(reversed(frames))
+
+
+class StackSampler:
+    """Samples the stacks of registered threads from a single background thread"""
+
+    def __init__(self, interval=None):
+        self.interval = interval
+        self._targets = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self, thread_id):
+        """Begin sampling ``thread_id``; returns the counter its stacks accumulate in"""
+        samples = Counter()
+        with self._lock:
+            self._targets[thread_id] = samples
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+                self._thread.start()
+        return samples
+
+    def stop(self, thread_id):
+        with self._lock:
+            return self._targets.pop(thread_id, Counter())
+
+    def _run(self):
+        interval = self.interval or settings.PROFILE_INTERVAL_MS / 1000
+        while True:
+            time.sleep(interval)
+            with self._lock:
+                if not self._targets:
+                    self._thread = None
+                    return
+                targets = list(self._targets.items())
+            frames = sys._current_frames()
+            for thread_id, samples in targets:
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    samples[fold(frame)] += 1
+
+
+class ProfileStore:
+    """This worker's folded stacks for the current hour, mirrored to PROFILE_DIR"""
+
+    def __init__(self, directory=None, worker_id=None):
+        self.directory = directory
+        self.worker_id = worker_id
+        self._stacks = defaultdict(Counter)
+        self._hour = None
+        self._lock = threading.Lock()
+
+    def _get_directory(self):
+        if self.directory is None:
+            self.directory = settings.PROFILE_DIR
+        return self.directory
+
+    def add(self, view, samples):
+        if not samples:
+            return
+        hour = time.strftime('%Y%m%d%H', time.gmtime())
+        with self._lock:
+            if hour != self._hour:
+                self._stacks.clear()
+                self._hour = hour
+                self.prune()
+            self._stacks[view].update(samples)
+            lines = [
+                f"{name};{stack} {count}"
+                for name, stacks in self._stacks.items()
+                for stack, count in stacks.items()
+            ]
+        self._write(hour, lines)
+
+    def _write(self, hour, lines):
+        directory = self._get_directory()
+        path = os.path.join(directory, f"{hour}-{self.worker_id or os.getpid()}.folded")
+        try:
+            os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w') as f:
+                f.write('\n'.join(lines) + '\n')
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write profile: {e}")
+
+    def prune(self):
+        """Remove profiles older than PROFILE_RETENTION_HOURS"""
+        cutoff = time.time() - settings.PROFILE_RETENTION_HOURS * 3600
+        directory = self._get_directory()
+        try:
+            names = os.listdir(directory)
+        except OSError:
+            return
+        for name in names:
+            path = os.path.join(directory, name)
+            try:
+                if name.endswith('.folded') and os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+
+
+def merge_profiles(directory, since=None, view=None):
+    """
+    Sum the folded stacks of every profile file in ``directory``.
+
+    ``since`` skips files last written before that timestamp; ``view`` keeps
+    only that view's stacks.
+    """
+    merged = Counter()
+    try:
+        names = sorted(name for name in os.listdir(directory) if name.endswith('.folded'))
+    except OSError:
+        return merged
+
+    for name in names:
+        path = os.path.join(directory, name)
+        try:
+            if since is not None and os.path.getmtime(path) < since:
+                continue
+            with open(path) as f:
+                lines = f.read().splitlines()
+        except OSError:
+            continue
+        for line in lines:
+            stack, _, count = line.rpartition(' ')
+            if not stack or not count.isdigit():
+                continue
+            if view is not None and stack.split(';', 1)[0] != view:
+                continue
+            merged[stack] += int(count)
+    return merged
+
+
+sampler = StackSampler()
+store = ProfileStore()
+
@@ -0,0 +1,105 @@
+"""
+Query and upstream-call budgets for tests
+
+``BudgetTestMixin.assertBudget`` wraps a block of test code and fails when it
+runs more SQL queries or upstream HTTP calls than the budget allows, so an
+N+1 or an extra call to TMDB, Gemini or a media server breaks the build
+instead of slipping in unnoticed. Upstream calls are counted through the
+``upstream_requests_total`` metric every ``InstrumentedSession`` records.
+
+``StubUpstreamTestCase`` runs the tests of a class against ``StubUpstreams``
+as a logged-in user whose integrations point at the stubs.
+"""
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from .benchmark.stubs import StubUpstreams
+from .benchmark.suite import create_benchmark_user
+from .metrics import registry
+
+
+def upstream_calls():
+    """Upstream requests recorded so far in this process, keyed by upstream"""
+    calls = Counter()
+    for name, labels, value in registry.snapshot()['counters']:
+        if name == 'upstream_requests_total':
+            calls[dict(labels)['upstream']] += int(value)
+    return calls
+
+
+class Budget:
+    """What a block spent; filled in when the ``assertBudget`` block exits"""
+
+    def __init__(self):
+        self.queries = []
+        self.upstream = Counter()
+        self.duration_ms = 0.0
+
+
+class BudgetTestMixin:
+    """``TestCase`` mixin adding ``assertBudget``"""
+
+    @contextmanager
+    def assertBudget(self, queries=None, upstream=None, duration_ms=None):
+        """
+        Fail if the block exceeds any of the given budgets.
+
+        ``queries`` caps SQL queries on the default database. ``upstream``
+        maps upstream names to the calls allowed; upstreams it leaves out
+        may not be called at all. ``duration_ms`` caps wall time and is
+        meant for generous bounds only, as CI machines vary.
+        """
+        budget = Budget()
+        before = upstream_calls()
+        started = time.perf_counter()
+        with CaptureQueriesContext(connection) as captured:
+            yield budget
+        budget.duration_ms = (time.perf_counter() - started) * 1000
+        budget.queries = [query['sql'] for query in captured.captured_queries]
+        budget.upstream = upstream_calls() - before
+
+        failures = []
+        if queries is not None and len(budget.queries) > queries:
+            listing = '\n'.join(f"{n}. {sql}" for n, sql in enumerate(budget.queries, 1))
+            failures.append(f"{len(budget.queries)} queries over a budget of {queries}:\n{listing}")
+        if upstream is not None:
+            for name, count in sorted(budget.upstream.items()):
+                allowed = upstream.get(name, 0)
+                if count > allowed:
+                    failures.append(f"{count} {name} calls over a budget of {allowed}")
+        if duration_ms is not None and budget.duration_ms > duration_ms:
+            failures.append(f"{budget.duration_ms:.0f} ms over a budget of {duration_ms} ms")
+        if failures:
+            self.fail('\n'.join(failures))
+
+
+class StubUpstreamTestCase(BudgetTestMixin, TestCase):
+    """
+    Tests against ``StubUpstreams`` as a logged-in user.
+
+    ``media_server`` picks the user's server type. The cache is cleared
+    before each test so every test pays for its own cold requests.
+    """
+    media_server = 'jellyfin'
+    library_size = 30
+
+    @classmethod
+    def setUpClass(cls):
+        cls.stubs = StubUpstreams(library_size=cls.library_size)
+        cls.stubs.__enter__()
+        cls.addClassCleanup(cls.stubs.__exit__, None, None, None)
+        cls.stub_settings = override_settings(**cls.stubs.settings())
+        cls.stub_settings.enable()
+        cls.addClassCleanup(cls.stub_settings.disable)
+        super().setUpClass()
+
+    def setUp(self):
+        cache.clear()
+        self.user = create_benchmark_user(self.stubs, self.media_server)
+        self.client.force_login(self.user)
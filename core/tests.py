@@ -1,3 +1,517 @@
-from django.test import TestCase
+import gzip
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from io import StringIO
+
+import requests
+
+from django.core.management import call_command
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.test import TestCase, RequestFactory, override_settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from unittest.mock import patch, MagicMock
+
+from .autocomplete import AutocompleteSession, cached_search, matches_query
+from .image_cache import ImageCache, is_safe_name, server_key, tmdb_image_url, jellyfin_image_url
+from .metrics import InstrumentedSession, MetricsRegistry, endpoint_class
+from .middleware import CompressionMiddleware
+from . import metrics, profiling, timing
+from .benchmark.loadgen import SESSIONS, find_saturation
+from .benchmark.stubs import StubUpstreams
+from .benchmark.suite import compare, create_benchmark_user, run_suite
+from .testing import BudgetTestMixin, StubUpstreamTestCase
+from .warmup import Warmup, mark_pending, warmup_state
+from recommendations.models import UserNegativeFeedback
+
+
+class AutocompletePrefixCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_exact_query_is_served_from_cache(self):
+        fetch = MagicMock(return_value=([{'id': 1, 'title': 'Star Wars'}], 1))
+        cached_search('test', 'star wars', fetch)
+        results = cached_search('test', 'star wars', fetch)
+        self.assertEqual(fetch.call_count, 1)
+        self.assertEqual(results[0]['id'], 1)
+
+    def test_extended_query_filters_complete_prefix_locally(self):
+        items = [
+            {'id': 1, 'title': 'Star Wars'},
+            {'id': 2, 'title': 'Star Trek'},
+        ]
+        fetch = MagicMock(return_value=(items, 2))
+        cached_search('test', 'star', fetch)
+        results = cached_search('test', 'star w', fetch)
+        self.assertEqual(fetch.call_count, 1)
+        self.assertEqual([r['id'] for r in results], [1])
+
+    def test_incomplete_prefix_is_not_reused(self):
+        fetch = MagicMock(return_value=([{'id': 1, 'title': 'Star Wars'}], 500))
+        cached_search('test', 'star', fetch)
+        cached_search('test', 'star w', fetch)
+        self.assertEqual(fetch.call_count, 2)
+
+    def test_matches_query_uses_word_prefixes(self):
+        item = {'title': 'The Dark Knight', 'original_title': ''}
+        self.assertTrue(matches_query(item, 'dark kn'))
+        self.assertFalse(matches_query(item, 'ark'))
+
+
+class AutocompleteSessionTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+
+    def _session(self, seq):
+        request = self.factory.get('/api/tmdb-search/', {'q': 'star', 'seq': seq})
+        request.user = self.user
+        request.session = MagicMock(session_key='abc')
+        return AutocompleteSession(request, 'tmdb')
+
+    def test_older_request_is_stale(self):
+        self.assertTrue(self._session(2).begin())
+        self.assertFalse(self._session(1).begin())
+
+    def test_running_request_is_superseded(self):
+        first = self._session(1)
+        first.begin()
+        self._session(2).begin()
+        self.assertFalse(first.is_current())
+
+
+class TMDBSearchAPITest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.force_login(self.user)
+
+    @patch('core.views.TMDBTVService')
+    @patch('core.views.TMDBService')
+    def test_stale_request_skips_upstream(self, mock_tmdb, mock_tmdb_tv):
+        mock_tmdb.return_value.search_movies.return_value = {'results': [], 'total_results': 0}
+        mock_tmdb_tv.return_value.search_tv_shows.return_value = []
+
+        self.client.get('/api/tmdb-search/', {'q': 'star w', 'seq': 5})
+        mock_tmdb.return_value.search_movies.reset_mock()
+
+        response = self.client.get('/api/tmdb-search/', {'q': 'star', 'seq': 4})
+        self.assertTrue(response.json()['stale'])
+        mock_tmdb.return_value.search_movies.assert_not_called()
+
+
+class ImageProxyURLTest(TestCase):
+    def test_tmdb_path_maps_to_proxy_url(self):
+        self.assertEqual(tmdb_image_url('/abc123.jpg', 'w300'), '/images/tmdb/w300/abc123.webp')
+
+    def test_absolute_and_proxied_urls_are_unchanged(self):
+        self.assertEqual(tmdb_image_url('https://example.com/a.jpg'), 'https://example.com/a.jpg')
+        self.assertEqual(tmdb_image_url('/images/tmdb/w500/a.webp'), '/images/tmdb/w500/a.webp')
+
+    @override_settings(IMAGE_PROXY_ENABLED=False)
+    def test_proxy_can_be_disabled(self):
+        self.assertEqual(tmdb_image_url('/abc123.jpg'), 'https://image.tmdb.org/t/p/w500/abc123.jpg')
+
+    def test_jellyfin_url_is_namespaced_by_server(self):
+        url = jellyfin_image_url('http://jellyfin:8096', 'item1')
+        self.assertEqual(url, f"/images/jellyfin/{server_key('http://jellyfin:8096')}/item1/w500.webp")
+
+    def test_unsafe_names_are_rejected(self):
+        self.assertFalse(is_safe_name('..'))
+        self.assertFalse(is_safe_name('a/b'))
+        self.assertTrue(is_safe_name('abc_123-X'))
+
+
+class ImageCacheEvictionTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def test_least_recently_used_entries_are_evicted(self):
+        image_cache = ImageCache(root=self.tmpdir.name, max_bytes=250)
+        old = image_cache.path_for('tmdb', 'w92', 'old.webp')
+        new = image_cache.path_for('tmdb', 'w92', 'new.webp')
+        image_cache.put(old, b'x' * 100)
+        os.utime(old, (1, 1))
+        image_cache.put(new, b'x' * 100)
+        image_cache.put(image_cache.path_for('tmdb', 'w92', 'newest.webp'), b'x' * 100)
+
+        image_cache.evict()
+        self.assertFalse(os.path.exists(old))
+        self.assertTrue(os.path.exists(new))
+
+    def test_entries_older_than_max_age_are_misses(self):
+        image_cache = ImageCache(root=self.tmpdir.name, max_bytes=1000)
+        path = image_cache.path_for('jellyfin', 'server', 'item1', 'w300.webp')
+        image_cache.put(path, b'x' * 10)
+        self.assertEqual(image_cache.get(path, max_age=60), path)
+
+        os.utime(path, (time.time(), time.time() - 120))
+        self.assertIsNone(image_cache.get(path, max_age=60))
+        self.assertEqual(image_cache.get(path), path)
+
+
+class ImageProxyViewTest(TestCase):
+    def test_cache_is_not_served_as_media(self):
+        # /media/ has no login check; Jellyfin variants must only be reachable through jellyfin_image
+        from django.conf import settings
+        cache_root = os.path.realpath(ImageCache().root)
+        media_root = os.path.realpath(settings.MEDIA_ROOT)
+        self.assertNotEqual(os.path.commonpath([cache_root, media_root]), media_root)
+
+    def test_unknown_size_is_rejected(self):
+        response = self.client.get('/images/tmdb/w9999/abc.webp')
+        self.assertEqual(response.status_code, 404)
+
+    def test_jellyfin_image_requires_matching_server(self):
+        user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.force_login(user)
+        response = self.client.get('/images/jellyfin/0123456789abcdef/item1/w300.webp')
+        self.assertEqual(response.status_code, 404)
+
+    def test_evicted_file_is_fetched_again(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        path = os.path.join(tmpdir.name, 'abc.webp')
+
+        def get_tmdb_image(size, name):
+            # The first lookup returns a file eviction has already removed
+            if get_tmdb_image.calls:
+                with open(path, 'wb') as f:
+                    f.write(b'webp')
+            get_tmdb_image.calls += 1
+            return path
+        get_tmdb_image.calls = 0
+
+        with patch('core.views.ImageProxyService') as service:
+            service.return_value.get_tmdb_image.side_effect = get_tmdb_image
+            response = self.client.get('/images/tmdb/w92/abc.webp')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'webp')
+        self.assertEqual(get_tmdb_image.calls, 2)
+        self.assertIn('immutable', response['Cache-Control'])
+
+
+class MetricsTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def test_endpoint_class_hides_ids_and_file_names(self):
+        self.assertEqual(endpoint_class('https://api.themoviedb.org/3/movie/550?api_key=x'), '/3/movie/:id')
+        self.assertEqual(
+            endpoint_class('http://jellyfin:8096/Items/0123456789abcdef0123456789abcdef/Images/Primary'),
+            '/Items/:id/Images/Primary'
+        )
+        self.assertEqual(endpoint_class('https://image.tmdb.org/t/p/w500/abc.jpg'), '/t/p/w500/:file')
+
+    def test_workers_are_summed(self):
+        for worker_id in ('1', '2'):
+            worker = MetricsRegistry(self.directory, worker_id=worker_id)
+            worker.inc('upstream_requests_total', {'upstream': 'tmdb', 'endpoint': '/3/movie/:id', 'status': '200'})
+            worker.observe('upstream_request_duration_seconds', {'upstream': 'tmdb', 'endpoint': '/3/movie/:id'}, 0.2)
+            worker.flush()
+
+        output = MetricsRegistry(self.directory, worker_id='3').render()
+
+        self.assertIn('upstream_requests_total{endpoint="/3/movie/:id",status="200",upstream="tmdb"} 2', output)
+        self.assertIn('upstream_request_duration_seconds_bucket{endpoint="/3/movie/:id",upstream="tmdb",le="0.25"} 2', output)
+        self.assertIn('upstream_request_duration_seconds_bucket{endpoint="/3/movie/:id",upstream="tmdb",le="0.1"} 0', output)
+
+    def test_session_records_status_and_errors(self):
+        worker = MetricsRegistry(self.directory, worker_id='1')
+        response = MagicMock(status_code=404, headers={'Content-Length': '12'})
+        session = InstrumentedSession('radarr')
+
+        with patch('core.metrics.registry', worker), \
+                patch('requests.Session.request', side_effect=[response, requests.exceptions.Timeout()]):
+            session.get('http://radarr:7878/api/v3/movie')
+            with self.assertRaises(requests.exceptions.Timeout):
+                session.get('http://radarr:7878/api/v3/movie')
+
+        output = worker.render()
+        self.assertIn('status="404",upstream="radarr"} 1', output)
+        self.assertIn('status="timeout",upstream="radarr"} 1', output)
+        self.assertIn('upstream_response_bytes_total{endpoint="/api/v3/movie",upstream="radarr"} 12', output)
+
+    def test_snapshots_of_exited_workers_are_removed(self):
+        exited = subprocess.Popen([sys.executable, '-c', ''])
+        exited.wait()
+        worker = MetricsRegistry(self.directory, worker_id=str(exited.pid))
+        worker.inc('upstream_requests_total', {'upstream': 'tmdb', 'endpoint': '/3/movie/:id', 'status': '200'})
+        worker.flush()
+
+        output = MetricsRegistry(self.directory).render()
+
+        self.assertNotIn('upstream_requests_total{', output)
+        self.assertEqual(os.listdir(self.directory), [f'{os.getpid()}.json'])
+
+    def test_metrics_endpoint(self):
+        with override_settings(METRICS_DIR=self.directory):
+            self.assertEqual(self.client.get('/metrics').status_code, 200)
+            with override_settings(METRICS_TOKEN='secret'):
+                self.assertEqual(self.client.get('/metrics').status_code, 401)
+                response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret')
+                self.assertIn('# TYPE upstream_requests_total counter', response.content.decode())
+
+
+class ServerTimingTest(TestCase):
+    def test_header_breaks_down_request(self):
+        response = self.client.get('/health/')
+
+        header = response['Server-Timing']
+        self.assertIn('total;dur=', header)
+
+    @patch('movies.views.TMDBService.get_genres', return_value=[])
+    def test_database_queries_and_rendering_are_counted(self, mock_genres):
+        # The session and user lookups are the database queries
+        self.client.force_login(User.objects.create_user(username='timed', password='testpass123'))
+
+        response = self.client.get('/api/genres/')
+
+        self.assertRegex(response['Server-Timing'], r'db;dur=[\d.]+;desc="\d+x"')
+        self.assertIn('render;dur=', response['Server-Timing'])
+
+    def test_spans_recorded_in_threads_with_propagate(self):
+        from concurrent.futures import ThreadPoolExecutor
+
+        timings, token = timing.start()
+        try:
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                list(executor.map(timing.propagate(lambda _: timing.add('tmdb', 0.01)), range(3)))
+                executor.submit(timing.add, 'tmdb', 0.01).result()
+        finally:
+            timing.stop(token)
+
+        self.assertEqual(timings.as_dict()['tmdb']['count'], 3)
+        self.assertIsNone(timing.current())
+
+    @override_settings(REQUEST_TIMING_SLOW_MS=0)
+    def test_slow_requests_are_logged(self):
+        with self.assertLogs('suggesterr.timing', level='INFO') as logs:
+            self.client.get('/health/')
+
+        self.assertIn('"event": "request_timing"', logs.output[0])
+
+
+class CompressionTest(TestCase):
+    def _get(self, response):
+        request = RequestFactory().get('/api/movies/popular/', HTTP_ACCEPT_ENCODING='gzip, deflate')
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def test_large_json_is_gzipped(self):
+        payload = {'results': [{'overview': f'A long overview of movie {i}'} for i in range(100)]}
+
+        response = self._get(JsonResponse(payload))
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(response.content), JsonResponse(payload).content)
+
+    def test_small_json_and_html_are_not_compressed(self):
+        self.assertFalse(self._get(JsonResponse({'ok': True})).has_header('Content-Encoding'))
+        self.assertFalse(self._get(HttpResponse('<p>page</p>' * 500)).has_header('Content-Encoding'))
+
+    def test_ndjson_lines_are_flushed_as_they_stream(self):
+        lines = [b'{"shelf": "popular"}\n', b'{"shelf": "top_rated"}\n']
+        response = self._get(StreamingHttpResponse(iter(lines), content_type='application/x-ndjson'))
+
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        chunks = iter(response.streaming_content)
+        for line in lines:
+            self.assertEqual(decompressor.decompress(next(chunks)), line)
+
+
+class ProfilingTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, True)
+
+    def test_sampler_captures_running_stack(self):
+        done = threading.Event()
+
+        def busy_wait():
+            done.wait(1)
+
+        worker = threading.Thread(target=busy_wait)
+        worker.start()
+        sampler = profiling.StackSampler(interval=0.001)
+        sampler.start(worker.ident)
+        time.sleep(0.05)
+        samples = sampler.stop(worker.ident)
+        done.set()
+        worker.join()
+
+        self.assertTrue(samples)
+        self.assertTrue(all('test_sampler_captures_running_stack' not in stack for stack in samples))
+        self.assertTrue(any('core.tests:busy_wait;threading:wait' in stack for stack in samples))
+
+    def test_token_profiles_request_under_view_name(self):
+        store = profiling.ProfileStore(self.directory, worker_id='1')
+        json_response = JsonResponse
+
+        def slow_json_response(data):
+            time.sleep(0.05)
+            return json_response(data)
+
+        with patch('core.profiling.store', store), patch('core.views.JsonResponse', side_effect=slow_json_response):
+            self.client.get('/health/')
+            self.client.get('/health/', HTTP_X_SUGGESTERR_PROFILE='forged')
+            self.assertFalse(os.listdir(self.directory))
+
+            self.client.get('/health/', HTTP_X_SUGGESTERR_PROFILE=profiling.profile_token())
+
+        stacks = profiling.merge_profiles(self.directory)
+        self.assertTrue(stacks)
+        self.assertTrue(all(stack.startswith('core:health_check;') for stack in stacks))
+
+    def test_command_merges_worker_profiles(self):
+        for worker_id in ('1', '2'):
+            with open(os.path.join(self.directory, f'2026101900-{worker_id}.folded'), 'w') as f:
+                f.write('core:dashboard;core.views:dashboard 3\ncore:search;core.views:search 1\n')
+
+        out = StringIO()
+        call_command('profile_stacks', directory=self.directory, view='core:dashboard', stdout=out)
+        self.assertEqual(out.getvalue().strip(), 'core:dashboard;core.views:dashboard 6')
+
+        out = StringIO()
+        call_command('profile_stacks', directory=self.directory, summary=True, stdout=out)
+        self.assertEqual(out.getvalue().split(), ['6', 'core:dashboard', '2', 'core:search'])
+
+
+class BenchmarkSuiteTest(TestCase):
+    def test_suite_runs_against_stub_upstreams(self):
+        with StubUpstreams(library_size=30) as stubs, override_settings(**stubs.settings()):
+            user = create_benchmark_user(stubs, 'plex')
+            results = run_suite(user, scenarios=['search', 'recently_added'], iterations=3, warmup=0)
+
+        self.assertEqual(set(results), {'search', 'recently_added'})
+        for result in results.values():
+            self.assertEqual(result['errors'], 0)
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+        self.assertGreater(stubs.request_counts()['plex'], 0)
+
+    def test_compare_flags_slower_results(self):
+        baseline = {'popular': {'p50_ms': 10, 'p95_ms': 20, 'p99_ms': 30, 'throughput_rps': 100, 'errors': 0}}
+        same = {'popular': dict(baseline['popular'], p50_ms=11)}
+        slower = {'popular': dict(baseline['popular'], p95_ms=40, throughput_rps=50)}
+
+        self.assertEqual(compare(same, baseline), [])
+        self.assertEqual(compare(slower, baseline), [
+            'popular: p95_ms 20 -> 40',
+            'popular: throughput_rps 100 -> 50',
+        ])
+
+
+class LoadGenerationTest(TestCase):
+    def _step(self, users, throughput, p95=100, error_rate=0.0):
+        return {'users': users, 'throughput_rps': throughput, 'p95_ms': p95, 'error_rate': error_rate}
+
+    def test_saturation_is_where_throughput_stops_growing(self):
+        steps = [self._step(1, 10), self._step(2, 19), self._step(4, 20), self._step(8, 21)]
+
+        best, reason = find_saturation(steps)
+
+        self.assertEqual(best['users'], 2)
+        self.assertIn('19 -> 20', reason)
+
+    def test_errors_and_latency_slo_saturate(self):
+        steps = [self._step(1, 10), self._step(2, 20, p95=900), self._step(4, 40, error_rate=0.05)]
+
+        self.assertEqual(find_saturation(steps)[0]['users'], 2)
+        self.assertEqual(find_saturation(steps, latency_slo_ms=500)[0]['users'], 1)
+        self.assertEqual(find_saturation(steps[:2]), (steps[1], None))
+
+    def test_search_session_sends_debounced_prefixes(self):
+        for seed in range(5):
+            waves = SESSIONS['search'][0](random.Random(seed))
+            queries = [wave[0]['params']['q'] for wave in waves]
+            self.assertTrue(all(len(query) >= 2 for query in queries))
+            self.assertEqual(queries[-1], queries[-2])
+            self.assertEqual(waves[-1][0]['path'], '/api/movies/search/')
+
+
+class BudgetAssertionTest(BudgetTestMixin, TestCase):
+    def test_over_budget_lists_queries_and_calls(self):
+        with self.assertRaises(AssertionError) as raised:
+            with self.assertBudget(queries=1, upstream={}):
+                list(User.objects.all())
+                list(User.objects.all())
+                metrics.record_upstream_call('tmdb', '/3/movie/popular', '200', 0.01)
+
+        message = str(raised.exception)
+        self.assertIn('2 queries over a budget of 1', message)
+        self.assertIn('auth_user', message)
+        self.assertIn('1 tmdb calls over a budget of 0', message)
+
+    def test_within_budget_reports_spend(self):
+        with self.assertBudget(queries=1, upstream={'tmdb': 1}) as budget:
+            list(User.objects.all())
+            metrics.record_upstream_call('tmdb', '/3/movie/popular', '200', 0.01)
+
+        self.assertEqual(len(budget.queries), 1)
+        self.assertEqual(budget.upstream, {'tmdb': 1})
+
+
+class SearchBudgetTest(StubUpstreamTestCase):
+    def test_search(self):
+        UserNegativeFeedback.objects.create(user=self.user, tmdb_id=1000, content_type='movie')
+        UserNegativeFeedback.objects.create(user=self.user, tmdb_id=1001, content_type='tv')
+
+        with self.assertBudget(queries=3, upstream={'tmdb': 2}):
+            response = self.client.get('/search/', {'q': 'stub'})
+
+        movie_ids = [movie['tmdb_id'] for movie in response.context['movies']]
+        self.assertEqual(len(movie_ids), 19)
+        self.assertNotIn(1000, movie_ids)
+        self.assertIn(1001, movie_ids)
+
+
+class WarmupTest(StubUpstreamTestCase):
+    def test_warm_caches_serve_the_first_request(self):
+        out = StringIO()
+        call_command('warm_caches', '--lists', 'popular', '--pages', '1', stdout=out)
+
+        self.assertIn('[6/6]', out.getvalue())
+        self.assertIn('Warmed caches', out.getvalue())
+        with self.assertBudget(upstream={}):
+            self.client.get('/api/genres/')
+            self.client.get('/api/movies/popular/')
+            self.client.get('/api/movies/recently_added/')
+
+    def test_inactive_users_are_not_warmed(self):
+        User.objects.filter(pk=self.user.pk).update(last_login=None)
+
+        labels = [task.label for task in Warmup(lists=[], active_days=14).tasks()]
+
+        self.assertEqual(labels, ['tmdb genres'])
+
+    def test_readiness_is_held_by_the_warmup_process_itself(self):
+        states = []
+        with patch('core.management.commands.warm_caches.Warmup') as warmup:
+            warmup.return_value.run.side_effect = lambda: states.append(warmup_state()) or []
+            call_command('warm_caches', '--readiness', stdout=StringIO())
+
+        self.assertEqual(states, [{'status': 'pending'}])
+
+    def test_not_ready_until_warmup_finishes(self):
+        mark_pending()
+        response = self.client.get('/ready/')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()['warmup'], {'status': 'pending'})
+
+        Warmup(lists=[], readiness=True).run()
+
+        self.assertIsNone(warmup_state())
+        self.assertEqual(self.client.get('/ready/').status_code, 200)
 
-# Create your tests here.
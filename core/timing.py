@@ -0,0 +1,91 @@
+"""
+Per-request time breakdown
+
+``ServerTimingMiddleware`` starts a ``RequestTimings`` for each request and
+code records spans against it: ``span('cache')`` around a block, or ``add``
+with a measured duration. Database queries, upstream HTTP calls and response
+rendering are recorded automatically. Work handed to threads is only counted
+when submitted through ``propagate``.
+"""
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+_current = contextvars.ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    """Total duration and count per span name for one request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = {}
+        self._lock = threading.Lock()
+
+    def add(self, name, duration):
+        with self._lock:
+            total, count = self.spans.get(name, (0.0, 0))
+            self.spans[name] = (total + duration, count + 1)
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self):
+        """``Server-Timing`` header value, durations in milliseconds"""
+        entries = []
+        for name, (total, count) in sorted(self.spans.items()):
+            entries.append(f'{name};dur={total * 1000:.1f};desc="{count}x"')
+        entries.append(f'total;dur={self.elapsed() * 1000:.1f}')
+        return ', '.join(entries)
+
+    def as_dict(self):
+        return {
+            name: {'ms': round(total * 1000, 1), 'count': count}
+            for name, (total, count) in sorted(self.spans.items())
+        }
+
+
+def start():
+    """Begin collecting spans for the current request; returns the reset token"""
+    timings = RequestTimings()
+    return timings, _current.set(timings)
+
+
+def stop(token):
+    _current.reset(token)
+
+
+def current():
+    return _current.get()
+
+
+def add(name, duration):
+    """Record ``duration`` seconds against ``name`` for the current request, if any"""
+    timings = _current.get()
+    if timings is not None:
+        timings.add(name, duration)
+
+
+@contextmanager
+def span(name):
+    """Time the enclosed block as ``name``"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        add(name, time.perf_counter() - started)
+
+
+def propagate(fn):
+    """Wrap ``fn`` so spans it records in another thread count towards this request"""
+    timings = _current.get()
+
+    def run(*args, **kwargs):
+        token = _current.set(timings)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _current.reset(token)
+
+    return run
@@ -10,4 +10,9 @@ urlpatterns = [
     path('api/search/', views.search_api, name='search_api'),
     path('api/tmdb-search/', views.tmdb_search_api, name='tmdb_search_api'),
     path('health/', views.health_check, name='health_check'),
+    path('ready/', health_views.ready_check, name='ready_check'),
+    path('live/', health_views.liveness_check, name='liveness_check'),
+    path('metrics', health_views.metrics, name='metrics'),
+    path('images/tmdb/<str:size>/<str:name>.webp', views.tmdb_image, name='tmdb_image'),
+    path('images/jellyfin/<str:server>/<str:item_id>/<str:size>.webp', views.jellyfin_image, name='jellyfin_image'),
 ]
\ No newline at end of file
@@ -0,0 +1,91 @@
+"""
+Per-user state versions and a response cache keyed on them
+
+Personalized responses depend on a small set of user state: ratings,
+negative feedback, the personality profile, integration settings, stored
+recommendations, and the library and Radarr catalog of the user's servers.
+Each input has a version (see ``core.versions``) that signal receivers bump
+when it changes; together they form the user's version vector.
+
+``cached_response`` caches a view's response under that vector, so it is
+reused until one of the inputs actually changes, with no invalidation at the
+call sites. Entries also expire after RESPONSE_CACHE_SECONDS, which bounds
+how long changes a server doesn't report to us (a library without
+webhooks, say) take to show up.
+"""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+
+from .metrics import cache_get
+from .versions import bump_version, get_version
+
+# Inputs versioned per user; the library and Radarr catalog are versioned per instance
+USER_INPUTS = ('ratings', 'feedback', 'profile', 'settings', 'recommendations')
+
+
+def _user_version_key(user_id, name):
+    return f"user-state:{user_id}:{name}"
+
+
+def user_version(user_id, name):
+    """When input ``name`` of the user's state last changed"""
+    return get_version(_user_version_key(user_id, name))
+
+
+def bump_user_version(user_id, name):
+    """Record that input ``name`` of the user's state changed"""
+    bump_version(_user_version_key(user_id, name))
+
+
+def user_version_vector(user):
+    """The versions of every input of ``user``'s state, in a fixed order"""
+    from integrations.registry import get_radarr_service, get_user_services
+    from integrations.services import library_version
+
+    keys = [_user_version_key(user.pk, name) for name in USER_INPUTS]
+    stored = cache.get_many(keys)
+    vector = [stored[key] if key in stored else get_version(key) for key in keys]
+
+    media_server = get_user_services(user).media_server()
+    vector.append(library_version(media_server.base_url) if media_server else 0)
+    vector.append(get_radarr_service(user).catalog_version())
+    return vector
+
+
+def _response_cache_key(request, vector):
+    renderer = getattr(request, 'accepted_renderer', None)
+    identity = repr((request.get_full_path(), renderer.format if renderer else None, vector))
+    return f"response:{request.user.pk}:{hashlib.sha256(identity.encode('utf-8')).hexdigest()[:32]}"
+
+
+def cached_response(headers=(), cacheable=None):
+    """
+    Cache successful responses of a DRF view method per user and version vector.
+
+    ``headers`` are the response headers kept with the data. Responses for
+    which ``cacheable(response)`` is false, like a fallback served because
+    an upstream was slow, aren't cached. Anonymous requests aren't cached.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            if not request.user.is_authenticated:
+                return method(view, request, *args, **kwargs)
+
+            cache_key = _response_cache_key(request, user_version_vector(request.user))
+            cached = cache_get('response', cache_key)
+            if cached is not None:
+                data, cached_headers = cached
+                return Response(data, headers=cached_headers)
+
+            response = method(view, request, *args, **kwargs)
+            if response.status_code == 200 and (cacheable is None or cacheable(response)):
+                kept = {name: response[name] for name in headers if response.has_header(name)}
+                cache.set(cache_key, (response.data, kept), settings.RESPONSE_CACHE_SECONDS)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,51 @@
+"""
+Versions and stamps of shared data, for validators like ETags
+
+A version is the time a user's or an instance's data last changed, kept in
+the shared cache without expiry and bumped when the data changes. A stamp is
+the time a cache entry was stored, kept next to the entry and expiring with
+it. Both are plain timestamps, so a response built from cached data can be
+identified by the versions and stamps of everything it was built from.
+"""
+import math
+import time
+
+from django.core.cache import cache
+
+
+def get_version(key):
+    """The current version of ``key``, starting one now if there is none"""
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time(), None)
+        version = cache.get(key)
+    return version if version is not None else time.time()
+
+
+def bump_version(key):
+    """
+    Record that the data behind ``key`` changed.
+
+    Successive versions are at least a second apart, so ``Last-Modified``
+    (which has second precision) moves with every bump.
+    """
+    previous = cache.get(key) or 0
+    cache.set(key, max(time.time(), math.floor(previous) + 1), None)
+
+
+def _stamp_key(key):
+    return f"{key}:stamp"
+
+
+def set_stamped(key, value, timeout):
+    """``cache.set`` that also records when ``value`` was stored"""
+    cache.set_many({key: value, _stamp_key(key): time.time()}, timeout)
+
+
+def get_stamp(key):
+    """When the entry at ``key`` was stored by ``set_stamped``, or None if it isn't cached"""
+    return cache.get(_stamp_key(key))
+
+
+def delete_stamped(key):
+    cache.delete_many([key, _stamp_key(key)])
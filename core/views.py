@@ -1,26 +1,31 @@
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse
+from django.http import JsonResponse, FileResponse, Http404
 from django.conf import settings
 from django.db.models import Q
 from integrations.services import RadarrService, SonarrService, JellyfinService, PlexService
+from integrations.registry import get_user_services
 from accounts.models import UserSettings
 from movies.models import Movie
 from tv_shows.models import TVShow
 from recommendations.models import UserNegativeFeedback
 from movies.tmdb_service import TMDBService
 from movies.tmdb_tv_service import TMDBTVService
+from .image_cache import (
+    ImageProxyService, IMAGE_WIDTHS, JELLYFIN_IMAGE_MAX_AGE, is_safe_name, server_key, tmdb_image_url
+)
+from .autocomplete import (
+    AutocompleteSession, MIN_QUERY_LENGTH, normalize_query,
+    search_tmdb_movies, search_tmdb_tv_shows
+)
 import logging
 
 def get_poster_url(poster_path, size='w300'):
-    """Get TMDB poster URL following the same logic as JavaScript"""
+    """Get poster URL (served through the local image proxy)"""
     if not poster_path:
         return 'https://via.placeholder.com/300x450?text=No+Poster'
     
-    if poster_path.startswith('https://'):
-        return poster_path
-    else:
-        return f'https://image.tmdb.org/t/p/{size}{poster_path}'
+    return tmdb_image_url(poster_path, size)
 
 logger = logging.getLogger(__name__)
 
@@ -35,6 +40,67 @@ def health_check(request):
     """Simple health check endpoint"""
     return JsonResponse({'status': 'healthy'})
 
+def _image_response(get_path, max_age, cache_control='public'):
+    """
+    Serve the cached WebP variant ``get_path()`` returns, with long-lived cache headers.
+    
+    Eviction can remove the file between the lookup and opening it; it is
+    then fetched once more.
+    """
+    for _attempt in range(2):
+        path = get_path()
+        if not path:
+            raise Http404('Image not available')
+        try:
+            image = open(path, 'rb')
+        except FileNotFoundError:
+            continue
+        response = FileResponse(image, content_type='image/webp')
+        response['Cache-Control'] = f'{cache_control}, max-age={max_age}'
+        return response
+    raise Http404('Image not available')
+
+def tmdb_image(request, size, name):
+    """Proxy a TMDB poster/backdrop through the local image cache"""
+    if size not in IMAGE_WIDTHS or not is_safe_name(name):
+        raise Http404('Unknown image')
+    
+    # TMDB file names are content hashes, so variants never change
+    return _image_response(
+        lambda: ImageProxyService().get_tmdb_image(size, name), 31536000, 'public, immutable'
+    )
+
+@login_required
+def jellyfin_image(request, server, item_id, size):
+    """Proxy an image from the user's Jellyfin server through the local image cache"""
+    if size not in IMAGE_WIDTHS or not is_safe_name(item_id):
+        raise Http404('Unknown image')
+    
+    user_settings = get_user_services(request.user).settings
+    if (not user_settings or user_settings.server_type != 'jellyfin'
+            or not user_settings.server_url or server_key(user_settings.server_url) != server):
+        raise Http404('Unknown media server')
+    
+    # Library artwork is private and can be replaced, so only the user's
+    # browser keeps it, for as long as the cached variant lives
+    return _image_response(
+        lambda: ImageProxyService().get_jellyfin_image(
+            user_settings.server_url, user_settings.server_api_key, item_id, size
+        ),
+        JELLYFIN_IMAGE_MAX_AGE, 'private'
+    )
+
+def _negative_feedback_ids(user):
+    """TMDB IDs of the movies and of the TV shows the user marked not interested, in one query"""
+    movie_ids, tv_ids = set(), set()
+    if user.is_authenticated:
+        negative_feedback = UserNegativeFeedback.objects.filter(
+            user=user, content_type__in=['movie', 'tv']
+        ).values_list('content_type', 'tmdb_id')
+        for content_type, tmdb_id in negative_feedback:
+            (movie_ids if content_type == 'movie' else tv_ids).add(tmdb_id)
+    return movie_ids, tv_ids
+
 @login_required
 def search(request):
     """Unified search view for movies and TV shows"""
@@ -49,13 +115,7 @@ def search(request):
         })
     
     # Get user's negative feedback TMDB IDs
-    negative_movie_tmdb_ids = []
-    negative_tv_tmdb_ids = []
-    
-    if request.user.is_authenticated:
-        negative_feedback = UserNegativeFeedback.objects.filter(user=request.user)
-        negative_movie_tmdb_ids = list(negative_feedback.filter(content_type='movie').values_list('tmdb_id', flat=True))
-        negative_tv_tmdb_ids = list(negative_feedback.filter(content_type='tv').values_list('tmdb_id', flat=True))
+    negative_movie_tmdb_ids, negative_tv_tmdb_ids = _negative_feedback_ids(request.user)
     
     # Initialize TMDB services
     tmdb_movie_service = TMDBService()
@@ -109,28 +169,27 @@ def search_api(request):
     """AJAX API endpoint for real-time search suggestions"""
     query = request.GET.get('q', '').strip()
     
-    if not query or len(query) < 2:
+    if not query or len(query) < MIN_QUERY_LENGTH:
         return JsonResponse({'movies': [], 'tv_shows': []})
     
-    # Get user's negative feedback TMDB IDs
-    negative_movie_tmdb_ids = []
-    negative_tv_tmdb_ids = []
+    # Latest query wins: drop requests superseded by a newer keystroke
+    session = AutocompleteSession(request, 'search')
+    if not session.begin():
+        return JsonResponse(session.stale_response())
     
-    if request.user.is_authenticated:
-        negative_feedback = UserNegativeFeedback.objects.filter(user=request.user)
-        negative_movie_tmdb_ids = list(negative_feedback.filter(content_type='movie').values_list('tmdb_id', flat=True))
-        negative_tv_tmdb_ids = list(negative_feedback.filter(content_type='tv').values_list('tmdb_id', flat=True))
+    # Get user's negative feedback TMDB IDs
+    negative_movie_tmdb_ids, negative_tv_tmdb_ids = _negative_feedback_ids(request.user)
     
     # Search movies using TMDB instead of database
     from movies.tmdb_service import TMDBService
     tmdb_service = TMDBService()
     
-    # Search movies via TMDB API
-    movie_search_results = tmdb_service.search_movies(query, page=1)
+    # Search movies via TMDB API (through the shared prefix cache)
+    movie_search_results = search_tmdb_movies(tmdb_service, normalize_query(query))
     movies_data = []
     
-    if movie_search_results and movie_search_results.get('results'):
-        movies_results = movie_search_results['results'][:5]  # Limit to 5 results
+    if movie_search_results:
+        movies_results = movie_search_results[:5]  # Limit to 5 results
         # Filter out negative feedback items
         for movie_result in movies_results:
             tmdb_id = movie_result.get('id')
@@ -145,6 +204,9 @@ def search_api(request):
     
     movies = movies_data
     
+    if not session.is_current():
+        return JsonResponse(session.stale_response())
+    
     tv_filter = Q(title__icontains=query) | Q(original_title__icontains=query)
     if negative_tv_tmdb_ids:
         tv_filter = tv_filter & ~Q(tmdb_id__in=negative_tv_tmdb_ids)
@@ -164,7 +226,8 @@ def search_api(request):
     
     return JsonResponse({
         'movies': movies_data,
-        'tv_shows': tv_shows_data
+        'tv_shows': tv_shows_data,
+        'seq': session.seq
     })
 
 @login_required
@@ -172,27 +235,28 @@ def tmdb_search_api(request):
     """TMDB API endpoint for real-time search using TMDB database"""
     query = request.GET.get('q', '').strip()
     
-    if not query or len(query) < 2:
+    if not query or len(query) < MIN_QUERY_LENGTH:
         return JsonResponse({'movies': [], 'tv_shows': []})
     
-    # Get user's negative feedback TMDB IDs for filtering
-    negative_movie_tmdb_ids = []
-    negative_tv_tmdb_ids = []
+    # Latest query wins: drop requests superseded by a newer keystroke
+    session = AutocompleteSession(request, 'tmdb')
+    if not session.begin():
+        return JsonResponse(session.stale_response())
     
-    if request.user.is_authenticated:
-        negative_feedback = UserNegativeFeedback.objects.filter(user=request.user)
-        negative_movie_tmdb_ids = list(negative_feedback.filter(content_type='movie').values_list('tmdb_id', flat=True))
-        negative_tv_tmdb_ids = list(negative_feedback.filter(content_type='tv').values_list('tmdb_id', flat=True))
+    normalized_query = normalize_query(query)
+    
+    # Get user's negative feedback TMDB IDs for filtering
+    negative_movie_tmdb_ids, negative_tv_tmdb_ids = _negative_feedback_ids(request.user)
     
     # Initialize TMDB services
     tmdb_movie_service = TMDBService()
     tmdb_tv_service = TMDBTVService()
     
-    # Search movies via TMDB API
-    movie_results = tmdb_movie_service.search_movies(query, page=1)
+    # Search movies via TMDB API (through the shared prefix cache)
+    movie_results = search_tmdb_movies(tmdb_movie_service, normalized_query)
     movies_data = []
     
-    for movie in movie_results.get('results', [])[:5]:  # Limit to 5 results
+    for movie in movie_results[:5]:  # Limit to 5 results
         if movie.get('id') not in negative_movie_tmdb_ids:
             movies_data.append({
                 'id': movie.get('id'),
@@ -202,8 +266,12 @@ def tmdb_search_api(request):
                 'vote_average': movie.get('vote_average', 0)
             })
     
-    # Search TV shows via TMDB API
-    tv_results = tmdb_tv_service.search_tv_shows(query, page=1)
+    # Skip the TV lookup if the user has typed past this query in the meantime
+    if not session.is_current():
+        return JsonResponse(session.stale_response())
+    
+    # Search TV shows via TMDB API (through the shared prefix cache)
+    tv_results = search_tmdb_tv_shows(tmdb_tv_service, normalized_query)
     tv_shows_data = []
     
     for tv_show in tv_results[:5]:  # Limit to 5 results
@@ -218,5 +286,6 @@ def tmdb_search_api(request):
     
     return JsonResponse({
         'movies': movies_data,
-        'tv_shows': tv_shows_data
+        'tv_shows': tv_shows_data,
+        'seq': session.seq
     })
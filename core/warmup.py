@@ -0,0 +1,172 @@
+"""
+Cache warming for hot catalog data
+
+After a restart the first users would pay for cold caches: the TMDB lists
+and genres every dashboard shows, the Radarr catalogs behind every
+"requested" badge and the library listings and indexes behind "in library".
+``Warmup`` fetches them ahead of time, a few at a time, refreshing entries
+that are still cached so a scheduled run keeps them from going cold.
+
+While a warmup started with ``readiness`` runs, ``warmup_state`` returns its
+progress and ``/ready/`` answers 503. The state expires after
+WARMUP_READY_TIMEOUT without progress, so a warmup that dies never keeps the
+application unready.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.utils import timezone
+
+from integrations.registry import get_radarr_service, get_user_services
+from integrations.services import cached_library_index, cached_library_movies, instance_key
+from movies.tmdb_service import TMDBService
+from movies.views import LIBRARY_CONTEXT_LIMIT, RECENTLY_ADDED_LIMIT
+
+logger = logging.getLogger(__name__)
+
+WARMUP_STATE_KEY = 'warmup:state'
+
+
+def warmup_state():
+    """Progress of a warmup the application waits for, or None if there is none"""
+    return cache.get(WARMUP_STATE_KEY)
+
+
+def mark_pending():
+    """Hold readiness until the warmup about to start with ``readiness`` finishes"""
+    cache.set(WARMUP_STATE_KEY, {'status': 'pending'}, settings.WARMUP_READY_TIMEOUT)
+
+
+class Task:
+    """
+    One cache to fill; ``fetch`` returns whether it succeeded. Tasks of the
+    same ``upstream`` share its concurrency limit.
+    """
+
+    def __init__(self, label, upstream, fetch):
+        self.label = label
+        self.upstream = upstream
+        self.fetch = fetch
+
+
+class Warmup:
+    """
+    Fill the hot caches: ``pages`` pages of each TMDB list in ``lists``, the
+    genres, and the Radarr catalog and library of every user who logged in
+    within ``active_days``.
+
+    Up to ``concurrency`` tasks run at once, at most ``per_upstream`` of them
+    against the same TMDB, Radarr or media server instance.
+    """
+
+    def __init__(self, lists=None, pages=None, active_days=None, concurrency=4, per_upstream=2,
+                 readiness=False, progress=None):
+        self.lists = lists if lists is not None else settings.WARMUP_TMDB_LISTS
+        self.pages = pages if pages is not None else settings.WARMUP_TMDB_PAGES
+        self.active_days = active_days if active_days is not None else settings.WARMUP_ACTIVE_DAYS
+        self.concurrency = concurrency
+        self.per_upstream = per_upstream
+        self.readiness = readiness
+        self.progress = progress
+
+    def active_users(self):
+        since = timezone.now() - timedelta(days=self.active_days)
+        return User.objects.filter(is_active=True, last_login__gte=since)
+
+    def tasks(self):
+        """Every cache to fill, built on the calling thread so only upstream work runs in the pool"""
+        tasks = []
+        if settings.TMDB_API_KEY:
+            tmdb = TMDBService()
+            tasks.append(Task('tmdb genres', 'tmdb', lambda: bool(tmdb.get_genres(refresh=True))))
+            for name in self.lists:
+                for page in range(1, self.pages + 1):
+                    tasks.append(Task(
+                        f"tmdb {name} page {page}", 'tmdb',
+                        lambda name=name, page=page: bool(tmdb.get_movie_list(name, page, refresh=True)['results'])
+                    ))
+
+        radarr_instances = {}
+        libraries = {}
+        for user in [None, *self.active_users()]:
+            radarr = get_radarr_service(user)
+            if radarr.base_url and radarr.api_key:
+                radarr_instances.setdefault(instance_key(radarr.base_url), radarr)
+            if user is None:
+                continue
+            user_services = get_user_services(user)
+            media_server = user_services.media_server()
+            if media_server:
+                # Listings are cached per instance and credential
+                credential = getattr(media_server, 'api_key', None) or getattr(media_server, 'token', None)
+                libraries.setdefault(
+                    (instance_key(media_server.base_url), credential),
+                    (media_server, user_services.settings.server_type)
+                )
+
+        for key, radarr in radarr_instances.items():
+            tasks.append(Task(
+                f"radarr catalog {key}", key, lambda radarr=radarr: radarr.get_catalog(refresh=True) is not None
+            ))
+        for (key, _), (media_server, server_type) in libraries.items():
+            for limit in (LIBRARY_CONTEXT_LIMIT, RECENTLY_ADDED_LIMIT):
+                tasks.append(Task(
+                    f"{server_type} library {key} ({limit} newest)", key,
+                    lambda media_server=media_server, server_type=server_type, limit=limit: cached_library_movies(
+                        media_server, server_type, limit=limit, refresh=True
+                    ) is not None
+                ))
+            tasks.append(Task(
+                f"{server_type} library index {key}", key,
+                lambda media_server=media_server, server_type=server_type: cached_library_index(
+                    media_server, server_type, refresh=True
+                ) is not None
+            ))
+        return tasks
+
+    def run(self):
+        """Run every task; returns the labels of the ones that failed"""
+        tasks = self.tasks()
+        limits = {task.upstream: threading.Semaphore(self.per_upstream) for task in tasks}
+        lock = threading.Lock()
+        done = 0
+        failed = []
+        self._report_state(done, len(tasks))
+
+        def run_task(task):
+            nonlocal done
+            started = time.perf_counter()
+            with limits[task.upstream]:
+                try:
+                    ok = task.fetch()
+                except Exception as e:
+                    logger.warning(f"Warming {task.label} failed: {e}")
+                    ok = False
+            with lock:
+                done += 1
+                if not ok:
+                    failed.append(task.label)
+                self._report_state(done, len(tasks))
+                if self.progress:
+                    self.progress(done, len(tasks), task.label, ok, time.perf_counter() - started)
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='warmup') as executor:
+                list(executor.map(run_task, tasks))
+        finally:
+            if self.readiness:
+                cache.delete(WARMUP_STATE_KEY)
+        return failed
+
+    def _report_state(self, done, total):
+        if self.readiness:
+            cache.set(
+                WARMUP_STATE_KEY, {'status': 'warming', 'done': done, 'total': total},
+                settings.WARMUP_READY_TIMEOUT
+            )
@@ -10,7 +10,7 @@ NC='\033[0m' # No Color
 echo -e "${GREEN}🎬 Starting Suggesterr...${NC}"
 
 # Create config directory if it doesn't exist
-mkdir -p /config/{database,logs,media,static}
+mkdir -p /config/{database,logs,media,static,cache}
 chown -R suggesterr:suggesterr /config
 chmod -R 755 /config
 
@@ -24,6 +24,12 @@ export DB_HOST=${DB_HOST:-localhost}
 export DB_PORT=${DB_PORT:-5432}
 export REDIS_URL=${REDIS_URL:-redis://localhost:6379/0}
 
+# Metrics snapshots of the previous run's workers would be summed into /metrics
+export METRICS_DIR=${METRICS_DIR:-/tmp/suggesterr-metrics}
+rm -rf "$METRICS_DIR"
+mkdir -p "$METRICS_DIR"
+chown suggesterr:suggesterr "$METRICS_DIR"
+
 # Generate encryption key if not provided
 if [ -z "$ENCRYPTION_KEY" ]; then
     export ENCRYPTION_KEY=$(python -c "from cryptography.fernet import Fernet; print(Fernet.generate_key().decode())")
@@ -88,6 +94,11 @@ if [ ! -z "$TMDB_API_KEY" ]; then
     python manage.py sync_movies --popular-pages=2 || echo "Movie sync completed with warnings"
 fi
 
+# Warm caches in the background (supervisord program "warmup"); /ready/
+# answers 503 until the first run is done. WARM_CACHES_INTERVAL > 0 repeats it
+export WARM_CACHES_ON_START=${WARM_CACHES_ON_START:-true}
+export WARM_CACHES_INTERVAL=${WARM_CACHES_INTERVAL:-0}
+
 # Start Nginx
 echo -e "${GREEN}🌐 Starting Nginx...${NC}"
 nginx
@@ -0,0 +1,94 @@
+"""
+In-memory index of the movies on a media server
+
+Built from one bulk library fetch, it answers "is this movie on the server?"
+by TMDB ID, IMDb ID or normalized title and year, so checking a whole page
+of cards costs no requests at all.
+"""
+import re
+import unicodedata
+
+
+def normalize_title(title):
+    """Lowercase, accent- and punctuation-free title for loose matching"""
+    title = unicodedata.normalize('NFKD', title or '')
+    title = ''.join(char for char in title if not unicodedata.combining(char)).casefold()
+    title = title.replace('&', ' and ')
+    return ' '.join(re.sub(r'[^\w\s]', ' ', title).split())
+
+
+def _year(value):
+    """Year from an int, a date or a 'YYYY[-MM-DD]' string"""
+    if value is None:
+        return None
+    if hasattr(value, 'year'):
+        return value.year
+    try:
+        return int(str(value)[:4])
+    except ValueError:
+        return None
+
+
+class LibraryIndex:
+    """Set of lookup keys for every movie on one media server"""
+
+    def __init__(self, keys=frozenset()):
+        self.keys = frozenset(keys)
+
+    def __len__(self):
+        return len(self.keys)
+
+    @classmethod
+    def from_items(cls, items):
+        """
+        Build the index from library items.
+
+        Each item is a dict with ``title``, ``year``, ``tmdb_id`` and ``imdb_id``,
+        any of which may be missing.
+        """
+        keys = set()
+        for item in items:
+            if item.get('tmdb_id'):
+                keys.add(f"tmdb:{item['tmdb_id']}")
+            if item.get('imdb_id'):
+                keys.add(f"imdb:{item['imdb_id']}")
+            title = normalize_title(item.get('title'))
+            if title:
+                keys.add(f"title:{title}")
+                year = _year(item.get('year'))
+                keys.add(f"title:{title}:{year}" if year else f"title:{title}:unknown")
+        return cls(keys)
+
+    def contains(self, movie):
+        """
+        Whether ``movie`` is in the library.
+
+        ``movie`` may be a ``Movie`` instance or a TMDB result dict. Titles
+        only match when the years agree, unless either side has no year.
+        """
+        if isinstance(movie, dict):
+            tmdb_id = movie.get('tmdb_id') or movie.get('id')
+            imdb_id = movie.get('imdb_id')
+            title = movie.get('title')
+            year = _year(movie.get('release_date'))
+        else:
+            tmdb_id = movie.tmdb_id
+            imdb_id = movie.imdb_id
+            title = movie.title
+            year = _year(movie.release_date)
+
+        if tmdb_id and f"tmdb:{tmdb_id}" in self.keys:
+            return True
+        if imdb_id and f"imdb:{imdb_id}" in self.keys:
+            return True
+
+        title = normalize_title(title)
+        if not title:
+            return False
+        if not year:
+            return f"title:{title}" in self.keys
+        return f"title:{title}:{year}" in self.keys or f"title:{title}:unknown" in self.keys
+
+    def available(self, movies):
+        """Availability of each movie in ``movies``, in order"""
+        return [self.contains(movie) for movie in movies]
@@ -0,0 +1,167 @@
+"""
+Per-user registry of configured integration clients
+
+Loading a user's ``UserSettings`` decrypts three API keys and building a
+client opens new upstream connections, so both are done once per user and
+kept in process memory. Each entry remembers the settings version it was
+built from; saving or deleting the settings bumps that version in the shared
+cache, so every worker rebuilds its entry on the next lookup.
+"""
+import logging
+import threading
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .services import JellyfinService, PlexService, RadarrService, SonarrService
+
+logger = logging.getLogger(__name__)
+
+MAX_CACHED_USERS = 256
+
+
+def _version_key(user_id):
+    return f"integrations:settings-version:{user_id}"
+
+
+class UserServices:
+    """Lazily built, configured clients for one user's integration settings"""
+
+    def __init__(self, user_settings):
+        self.settings = user_settings
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def _client(self, name, build):
+        with self._lock:
+            if name not in self._clients:
+                self._clients[name] = build()
+            return self._clients[name]
+
+    def jellyfin(self):
+        if not self.settings or self.settings.server_type != 'jellyfin':
+            return None
+        if not self.settings.server_url or not self.settings.server_api_key:
+            return None
+        return self._client('jellyfin', lambda: JellyfinService(
+            self.settings.server_url, self.settings.server_api_key
+        ))
+
+    def plex(self):
+        if not self.settings or self.settings.server_type != 'plex':
+            return None
+        if not self.settings.server_url or not self.settings.server_api_key:
+            return None
+        return self._client('plex', lambda: PlexService(
+            self.settings.server_url, self.settings.server_api_key
+        ))
+
+    def media_server(self):
+        """The user's Jellyfin or Plex client, whichever is configured"""
+        return self.jellyfin() or self.plex()
+
+    def radarr(self):
+        if not self.settings or not self.settings.radarr_url or not self.settings.radarr_api_key:
+            return None
+        return self._client('radarr', lambda: RadarrService(
+            self.settings.radarr_url, self.settings.radarr_api_key
+        ))
+
+    def sonarr(self):
+        if not self.settings or not self.settings.sonarr_url or not self.settings.sonarr_api_key:
+            return None
+        return self._client('sonarr', lambda: SonarrService(
+            self.settings.sonarr_url, self.settings.sonarr_api_key
+        ))
+
+    def close(self):
+        with self._lock:
+            for client in self._clients.values():
+                client.session.close()
+            self._clients.clear()
+
+
+class ServiceRegistry:
+    """Process-wide LRU of ``UserServices`` keyed by user id"""
+
+    def __init__(self, max_users=MAX_CACHED_USERS):
+        self.max_users = max_users
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user):
+        from accounts.models import UserSettings
+
+        version = cache.get(_version_key(user.pk))
+        with self._lock:
+            entry = self._entries.get(user.pk)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(user.pk)
+                return entry[1]
+
+        user_services = UserServices(UserSettings.objects.filter(user_id=user.pk).first())
+        with self._lock:
+            stale = self._entries.pop(user.pk, None)
+            self._entries[user.pk] = (version, user_services)
+            while len(self._entries) > self.max_users:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                evicted.close()
+        if stale is not None:
+            stale[1].close()
+        return user_services
+
+    def invalidate(self, user_id):
+        """Drop this process's entry and make every other worker rebuild theirs"""
+        cache.set(_version_key(user_id), uuid.uuid4().hex, None)
+        with self._lock:
+            entry = self._entries.pop(user_id, None)
+        if entry is not None:
+            entry[1].close()
+        logger.debug(f"Invalidated integration clients for user {user_id}")
+
+    def clear(self):
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+        for _, user_services in entries:
+            user_services.close()
+
+
+registry = ServiceRegistry()
+
+_default_clients = {}
+_default_clients_lock = threading.Lock()
+
+
+def get_user_services(user):
+    """Configured integration clients for ``user``, loaded once and reused"""
+    return registry.get(user)
+
+
+def _default_client(service_class, url_setting, key_setting):
+    """Server-wide client built from environment settings, reused while they don't change"""
+    key = (service_class, getattr(settings, url_setting, None), getattr(settings, key_setting, None))
+    with _default_clients_lock:
+        if key not in _default_clients:
+            _default_clients[key] = service_class()
+        return _default_clients[key]
+
+
+def get_radarr_service(user):
+    """
+    Radarr client for the user's own instance.
+
+    Users without their own Radarr settings use the server-wide RADARR_URL,
+    which keeps single-household installs configured through the
+    environment working.
+    """
+    radarr = get_user_services(user).radarr() if user and user.is_authenticated else None
+    return radarr or _default_client(RadarrService, 'RADARR_URL', 'RADARR_API_KEY')
+
+
+def get_sonarr_service(user):
+    """Sonarr client for the user's own instance, see ``get_radarr_service``"""
+    sonarr = get_user_services(user).sonarr() if user and user.is_authenticated else None
+    return sonarr or _default_client(SonarrService, 'SONARR_URL', 'SONARR_API_KEY')
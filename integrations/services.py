@@ -1,14 +1,141 @@
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 import requests
+from requests.adapters import HTTPAdapter
 from django.conf import settings
+from django.core.cache import cache
 import logging
+from core.image_cache import jellyfin_image_url
+from core import timing
+from core.metrics import InstrumentedSession, cache_get
+from core.versions import bump_version, delete_stamped, get_stamp, get_version, set_stamped
+from .library_index import LibraryIndex
 
 logger = logging.getLogger(__name__)
 
+CATALOG_CACHE_TIMEOUT = 120  # seconds
+LIBRARY_CACHE_TIMEOUT = 300
+
+# Library listings are read in pages so large libraries never sit in memory whole
+LIBRARY_PAGE_SIZE = 500
+LIBRARY_CONTEXT_FIELDS = (
+    'Genres', 'ProductionYear', 'Overview', 'CommunityRating', 'OfficialRating',
+    'DateCreated', 'ProviderIds', 'Images'
+)
+PLEX_SECTION_WORKERS = 4  # movie sections of one Plex server fetched in parallel
+
+# Instances that push webhooks are polled this many times less often
+PUSH_POLL_FACTOR = 10
+PUSH_ACTIVE_TIMEOUT = 24 * 60 * 60
+
+
+def instance_key(base_url):
+    """Stable key for an upstream instance, shared by every user pointing at the same URL"""
+    return hashlib.sha256((base_url or '').rstrip('/').lower().encode('utf-8')).hexdigest()[:16]
+
+
+def _push_active_key(service_name, base_url):
+    return f"push-active:{service_name}:{instance_key(base_url)}"
+
+
+def mark_push_active(service_name, base_url):
+    """Record that this instance delivers webhooks, so its caches can live longer"""
+    cache.set(_push_active_key(service_name, base_url), True, PUSH_ACTIVE_TIMEOUT)
+
+
+def cache_timeout_for(service_name, base_url, timeout):
+    """Cache lifetime for data from an instance, stretched while it pushes changes to us"""
+    if cache.get(_push_active_key(service_name, base_url)):
+        return timeout * PUSH_POLL_FACTOR
+    return timeout
+
+
+def _library_version_key(base_url):
+    return f"library:{instance_key(base_url)}:version"
+
+
+def _library_cache_key(media_server, name):
+    """
+    Cache key for data from a media server, per credential.
+    
+    Keys carry the server's library version, so ``invalidate_library`` drops
+    every cached entry for that server at once.
+    """
+    credential = getattr(media_server, 'api_key', None) or getattr(media_server, 'token', None) or ''
+    credential_hash = hashlib.sha256(credential.encode('utf-8')).hexdigest()[:12]
+    version = library_version(media_server.base_url)
+    return f"library:{instance_key(media_server.base_url)}:{credential_hash}:{version}:{name}"
+
+
+def cached_library_movies(media_server, service_name, limit=None, refresh=False):
+    """``media_server.get_library_movies`` cached per server, credential and limit; ``refresh`` skips the cache"""
+    cache_key = _library_cache_key(media_server, f"movies:{limit}")
+    library_movies = None if refresh else cache_get('library', cache_key)
+    if library_movies is not None:
+        return library_movies
+    
+    library_movies = media_server.get_library_movies(limit=limit)
+    if library_movies:
+        timeout = cache_timeout_for(service_name, media_server.base_url, LIBRARY_CACHE_TIMEOUT)
+        set_stamped(cache_key, library_movies, timeout)
+    return library_movies
+
+
+def library_movies_stamp(media_server, limit=None):
+    """When the listing ``cached_library_movies`` returns was read, or None if it isn't cached"""
+    return get_stamp(_library_cache_key(media_server, f"movies:{limit}"))
+
+
+def cached_library_index(media_server, service_name, refresh=False):
+    """
+    ``LibraryIndex`` of a media server, built in one paged pass over its library and cached.
+    
+    Returns None if the library can't be read. ``refresh`` rebuilds a cached index.
+    """
+    cache_key = _library_cache_key(media_server, 'index')
+    keys = None if refresh else cache_get('library_index', cache_key)
+    if keys is not None:
+        return LibraryIndex(keys)
+    
+    index = media_server.build_library_index()
+    if index is None:
+        return None
+    
+    timeout = cache_timeout_for(service_name, media_server.base_url, LIBRARY_CACHE_TIMEOUT)
+    set_stamped(cache_key, index.keys, timeout)
+    return index
+
+
+def library_index_stamp(media_server):
+    """When the index ``cached_library_index`` returns was built, or None if it isn't cached"""
+    return get_stamp(_library_cache_key(media_server, 'index'))
+
+
+def library_version(base_url):
+    """When the library of a media server was last reported changed"""
+    return get_version(_library_version_key(base_url))
+
+
+def invalidate_library(base_url):
+    """Drop every cached library listing for a media server"""
+    bump_version(_library_version_key(base_url))
+
+
+def build_session(upstream):
+    """HTTP session that keeps connections to the upstream server alive between calls"""
+    session = InstrumentedSession(upstream)
+    adapter = HTTPAdapter(pool_connections=2, pool_maxsize=10)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
 
 class JellyfinService:
-    def __init__(self):
-        self.base_url = settings.JELLYFIN_URL
-        self.api_key = settings.JELLYFIN_API_KEY
+    def __init__(self, base_url=None, api_key=None):
+        self.base_url = base_url if base_url is not None else settings.JELLYFIN_URL
+        self.api_key = api_key if api_key is not None else settings.JELLYFIN_API_KEY
+        self.session = build_session('jellyfin')
         self._update_headers()
     
     def _update_headers(self):
@@ -26,44 +153,67 @@ class JellyfinService:
         logger.info(f"Jellyfin service configured with URL: {base_url}")
     
     def is_movie_available(self, movie):
+        """Whether ``movie`` is in the Jellyfin library, answered from the cached library index"""
         if not self.base_url or not self.api_key:
             return False
         
+        index = self.get_library_index()
+        return bool(index and index.contains(movie))
+    
+    def get_library_index(self):
+        return cached_library_index(self, 'jellyfin')
+    
+    def build_library_index(self):
+        """Index of every movie in the library, read page by page with IDs only, or None on error"""
         try:
-            # Search for movie in Jellyfin library
-            search_url = f"{self.base_url}/Items"
+            return LibraryIndex.from_items(
+                {
+                    'title': item.get('Name'),
+                    'year': item.get('ProductionYear'),
+                    'tmdb_id': (item.get('ProviderIds') or {}).get('Tmdb'),
+                    'imdb_id': (item.get('ProviderIds') or {}).get('Imdb'),
+                }
+                for item in self.iter_library_items(fields=('ProductionYear', 'ProviderIds'))
+            )
+        except Exception as e:
+            logger.error(f"Error building Jellyfin library index: {e}")
+            return None
+    
+    def iter_library_items(self, fields=LIBRARY_CONTEXT_FIELDS, page_size=LIBRARY_PAGE_SIZE, sort_by=None):
+        """
+        Yield raw library movie items, one page request at a time.
+        
+        Only ``fields`` are requested, and a consumer that stops early never
+        fetches the remaining pages. Request errors propagate to the caller.
+        """
+        url = f"{self.base_url}/Items"
+        start_index = 0
+        while True:
             params = {
-                'searchTerm': movie.title,
                 'IncludeItemTypes': 'Movie',
-                'Recursive': 'true'
+                'Recursive': 'true',
+                'Fields': ','.join(fields),
+                'EnableImages': 'true' if 'Images' in fields else 'false',
+                'EnableUserData': 'false',
+                'StartIndex': start_index,
+                'Limit': page_size
             }
+            if sort_by:
+                params['SortBy'] = sort_by
+                params['SortOrder'] = 'Descending'
             
-            response = requests.get(search_url, headers=self.headers, params=params, timeout=10)
+            response = self.session.get(url, headers=self.headers, params=params, timeout=30)
             response.raise_for_status()
             
             data = response.json()
             items = data.get('Items', [])
+            yield from items
             
-            # Check if any item matches our movie
-            for item in items:
-                if self._movie_matches(item, movie):
-                    return True
-            
-            return False
-        except Exception as e:
-            logger.error(f"Error checking Jellyfin availability for {movie.title}: {e}")
-            return False
-    
-    def _movie_matches(self, jellyfin_item, movie):
-        # Basic matching logic - can be improved
-        title_match = jellyfin_item.get('Name', '').lower() == movie.title.lower()
-        
-        # Check year if available
-        if movie.release_date and jellyfin_item.get('ProductionYear'):
-            year_match = jellyfin_item['ProductionYear'] == movie.release_date.year
-            return title_match and year_match
-        
-        return title_match
+            start_index += len(items)
+            # Some servers leave out TotalRecordCount, so a short page is the end
+            total = data.get('TotalRecordCount')
+            if len(items) < page_size or (total is not None and start_index >= total):
+                return
     
     def test_connection(self):
         """Test the connection to Jellyfin server"""
@@ -73,13 +223,13 @@ class JellyfinService:
         try:
             # Test basic connectivity
             url = f"{self.base_url}/System/Info/Public"
-            response = requests.get(url, timeout=10)
+            response = self.session.get(url, timeout=10)
             if response.status_code != 200:
                 return False, f"Server not reachable: HTTP {response.status_code}"
             
             # Test authentication
             url = f"{self.base_url}/Items/Counts"
-            response = requests.get(url, headers=self.headers, timeout=10)
+            response = self.session.get(url, headers=self.headers, timeout=10)
             response.raise_for_status()
             return True, "Connection successful"
         except requests.exceptions.ConnectionError as e:
@@ -94,7 +244,7 @@ class JellyfinService:
     def get_library_stats(self):
         try:
             url = f"{self.base_url}/Items/Counts"
-            response = requests.get(url, headers=self.headers, timeout=10)
+            response = self.session.get(url, headers=self.headers, timeout=10)
             response.raise_for_status()
             return response.json()
         except Exception as e:
@@ -108,144 +258,204 @@ class JellyfinService:
             return []
         
         try:
-            url = f"{self.base_url}/Items"
-            params = {
-                'IncludeItemTypes': 'Movie',
-                'Recursive': 'true',
-                'Fields': 'Genres,ProductionYear,Overview,CommunityRating,OfficialRating,DateCreated,ProviderIds,Images',
-                'SortBy': 'DateAdded,SortName',
-                'SortOrder': 'Descending'
-            }
-            
-            if limit:
-                params['Limit'] = limit
-            
-            logger.info(f"Requesting Jellyfin library from: {url}")
-            logger.debug(f"Request params: {params}")
-            
-            response = requests.get(url, headers=self.headers, params=params, timeout=30)
-            logger.info(f"Jellyfin response status: {response.status_code}")
-            
-            response.raise_for_status()
-            
-            data = response.json()
-            items = data.get('Items', [])
-            logger.info(f"Jellyfin returned {len(items)} items")
+            page_size = min(limit, LIBRARY_PAGE_SIZE) if limit else LIBRARY_PAGE_SIZE
+            items = self.iter_library_items(page_size=page_size, sort_by='DateAdded,SortName')
             
             # Format movie data for AI context
-            library_movies = []
-            for item in items:
-                # Handle genres - Jellyfin returns them as a list of strings
-                genres = item.get('Genres', [])
-                if isinstance(genres, list):
-                    # If it's already a list of strings, use directly
-                    if genres and isinstance(genres[0], str):
-                        genre_list = genres
-                    # If it's a list of dictionaries, extract names
-                    elif genres and isinstance(genres[0], dict):
-                        genre_list = [genre.get('Name', '') for genre in genres]
-                    else:
-                        genre_list = []
-                else:
-                    genre_list = []
-                
-                # Get TMDB ID from provider IDs
-                provider_ids = item.get('ProviderIds', {})
-                tmdb_id = provider_ids.get('Tmdb')
-                if tmdb_id:
-                    try:
-                        tmdb_id = int(tmdb_id)
-                    except:
-                        tmdb_id = None
-
-                # Get poster path from Jellyfin
-                poster_path = None
-                if 'Images' in item and 'Primary' in item['Images']:
-                    poster_path = f"{self.base_url}/Items/{item['Id']}/Images/Primary"
-
-                movie_info = {
-                    'title': item.get('Name', ''),
-                    'year': item.get('ProductionYear'),
-                    'genres': genre_list,
-                    'overview': item.get('Overview', ''),
-                    'rating': item.get('CommunityRating'),
-                    'content_rating': item.get('OfficialRating'),
-                    'tmdb_id': tmdb_id,
-                    'date_added': item.get('DateCreated'),
-                    'server_type': 'jellyfin',
-                    'poster_path': poster_path,
-                    'vote_average': item.get('CommunityRating', 0),
-                    'release_date': str(item.get('ProductionYear', '')) if item.get('ProductionYear') else None
-                }
-                library_movies.append(movie_info)
+            library_movies = [self._library_movie(item) for item in islice(items, limit)]
             
             logger.info(f"Retrieved {len(library_movies)} movies from Jellyfin library")
             return library_movies
             
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Network error fetching Jellyfin library movies: {e}")
-            return []
         except requests.exceptions.HTTPError as e:
             logger.error(f"HTTP error fetching Jellyfin library movies: {e.response.status_code} - {e.response.text}")
             return []
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Network error fetching Jellyfin library movies: {e}")
+            return []
         except Exception as e:
             logger.error(f"Unexpected error fetching Jellyfin library movies: {e}")
             return []
+    
+    def _library_movie(self, item):
+        # Handle genres - Jellyfin returns them as a list of strings
+        genres = item.get('Genres', [])
+        if isinstance(genres, list):
+            # If it's already a list of strings, use directly
+            if genres and isinstance(genres[0], str):
+                genre_list = genres
+            # If it's a list of dictionaries, extract names
+            elif genres and isinstance(genres[0], dict):
+                genre_list = [genre.get('Name', '') for genre in genres]
+            else:
+                genre_list = []
+        else:
+            genre_list = []
+        
+        # Get TMDB ID from provider IDs
+        provider_ids = item.get('ProviderIds', {})
+        tmdb_id = provider_ids.get('Tmdb')
+        if tmdb_id:
+            try:
+                tmdb_id = int(tmdb_id)
+            except:
+                tmdb_id = None
+        
+        # Get poster path from Jellyfin
+        poster_path = None
+        if 'Images' in item and 'Primary' in item['Images']:
+            poster_path = jellyfin_image_url(self.base_url, item['Id'])
+        
+        return {
+            'title': item.get('Name', ''),
+            'year': item.get('ProductionYear'),
+            'genres': genre_list,
+            'overview': item.get('Overview', ''),
+            'rating': item.get('CommunityRating'),
+            'content_rating': item.get('OfficialRating'),
+            'tmdb_id': tmdb_id,
+            'date_added': item.get('DateCreated'),
+            'server_type': 'jellyfin',
+            'poster_path': poster_path,
+            'vote_average': item.get('CommunityRating', 0),
+            'release_date': str(item.get('ProductionYear', '')) if item.get('ProductionYear') else None
+        }
 
 
 class PlexService:
-    def __init__(self):
-        self.base_url = settings.PLEX_URL
-        self.token = settings.PLEX_TOKEN
+    def __init__(self, base_url=None, token=None):
+        self.base_url = base_url if base_url is not None else settings.PLEX_URL
+        self.token = token if token is not None else settings.PLEX_TOKEN
+        self.session = build_session('plex')
         self.headers = {
             'X-Plex-Token': self.token,
             'Accept': 'application/json'
         }
     
     def is_movie_available(self, movie):
+        """Whether ``movie`` is in the Plex library, answered from the cached library index"""
         if not self.base_url or not self.token:
             return False
         
+        index = self.get_library_index()
+        return bool(index and index.contains(movie))
+    
+    def get_library_index(self):
+        return cached_library_index(self, 'plex')
+    
+    def build_library_index(self):
+        """Index of every movie in all movie sections, read page by page, or None on error"""
+        def index_items():
+            for item in self.iter_library_items(include_guids=True):
+                external_ids = {}
+                for guid in item.get('Guid', []):
+                    scheme, _, value = guid.get('id', '').partition('://')
+                    external_ids[scheme] = value
+                yield {
+                    'title': item.get('title'),
+                    'year': item.get('year'),
+                    'tmdb_id': external_ids.get('tmdb'),
+                    'imdb_id': external_ids.get('imdb'),
+                }
+        
         try:
-            # Search for movie in Plex library
-            search_url = f"{self.base_url}/search"
-            params = {
-                'query': movie.title,
-                'type': 1  # 1 = Movies
-            }
-            
-            response = requests.get(search_url, headers=self.headers, params=params, timeout=10)
-            response.raise_for_status()
-            
-            data = response.json()
-            media_container = data.get('MediaContainer', {})
-            metadata = media_container.get('Metadata', [])
-            
-            # Check if any item matches our movie
-            for item in metadata:
-                if self._movie_matches(item, movie):
-                    return True
-            
-            return False
+            return LibraryIndex.from_items(index_items())
         except Exception as e:
-            logger.error(f"Error checking Plex availability for {movie.title}: {e}")
-            return False
+            logger.error(f"Error building Plex library index: {e}")
+            return None
     
-    def _movie_matches(self, plex_item, movie):
-        # Basic matching logic
-        title_match = plex_item.get('title', '').lower() == movie.title.lower()
+    def _movie_sections(self):
+        sections_url = f"{self.base_url}/library/sections"
+        response = self.session.get(sections_url, headers=self.headers, timeout=10)
+        response.raise_for_status()
+        
+        sections = response.json().get('MediaContainer', {}).get('Directory', [])
+        return [s for s in sections if s.get('type') == 'movie']
+    
+    def _fetch_section_page(self, cursor, page_size, include_guids, sort):
+        """Fetch the next page of a section and advance its paging cursor"""
+        params = {
+            'type': '1',  # Movies
+            'X-Plex-Container-Start': cursor['start'],
+            'X-Plex-Container-Size': page_size
+        }
+        if include_guids:
+            params['includeGuids'] = '1'
+        if sort:
+            params['sort'] = sort
         
-        # Check year if available
-        if movie.release_date and plex_item.get('year'):
-            year_match = plex_item['year'] == movie.release_date.year
-            return title_match and year_match
+        movies_url = f"{self.base_url}/library/sections/{cursor['key']}/all"
+        response = self.session.get(movies_url, headers=self.headers, params=params, timeout=30)
+        response.raise_for_status()
         
-        return title_match
+        container = response.json().get('MediaContainer', {})
+        metadata = container.get('Metadata', [])
+        cursor['start'] += len(metadata)
+        # As with Jellyfin, a short page is the end when totalSize is left out
+        total = container.get('totalSize')
+        cursor['done'] = len(metadata) < page_size or (total is not None and cursor['start'] >= total)
+        return metadata
+    
+    @staticmethod
+    def _dedup_key(item):
+        """Same movie in several sections (e.g. a 4K and a main library) shares its agent GUID"""
+        for guid in item.get('Guid', []):
+            if guid.get('id', '').startswith('tmdb://'):
+                return guid['id']
+        return item.get('guid') or item.get('ratingKey')
+    
+    def iter_library_items(self, page_size=LIBRARY_PAGE_SIZE, include_guids=False, sort=None, merge_key=None):
+        """
+        Yield raw movie metadata from every movie section, deduplicated across sections.
+        
+        Sections are paged in rounds: each round fetches the next page of every
+        unfinished section concurrently, so a household with several movie
+        libraries waits for the slowest section rather than their sum. Each
+        section's cursor is its paging offset within this pass only; every
+        call reads the sections from the start, so removed movies drop out of
+        the cached listings and index when they are rebuilt. Items of a round
+        are ordered by ``merge_key`` when given. A consumer that stops early
+        never fetches another round. Request errors propagate to the caller.
+        """
+        cursors = [
+            {'key': section.get('key'), 'start': 0, 'done': False}
+            for section in self._movie_sections()
+        ]
+        if not cursors:
+            return
+        
+        seen = set()
+        executor = ThreadPoolExecutor(max_workers=min(len(cursors), PLEX_SECTION_WORKERS))
+        try:
+            while True:
+                active = [cursor for cursor in cursors if not cursor['done']]
+                if not active:
+                    return
+                
+                pages = executor.map(
+                    timing.propagate(
+                        lambda cursor: self._fetch_section_page(cursor, page_size, include_guids, sort)
+                    ),
+                    active
+                )
+                items = [item for page in pages for item in page]
+                if merge_key:
+                    items.sort(key=merge_key)
+                
+                for item in items:
+                    dedup_key = self._dedup_key(item)
+                    if dedup_key:
+                        if dedup_key in seen:
+                            continue
+                        seen.add(dedup_key)
+                    yield item
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
     
     def get_library_stats(self):
         try:
             url = f"{self.base_url}/library/sections"
-            response = requests.get(url, headers=self.headers, timeout=10)
+            response = self.session.get(url, headers=self.headers, timeout=10)
             response.raise_for_status()
             
             data = response.json()
@@ -265,54 +475,26 @@ class PlexService:
             return []
         
         try:
-            # First get all movie library sections
-            sections_url = f"{self.base_url}/library/sections"
-            response = requests.get(sections_url, headers=self.headers, timeout=10)
-            response.raise_for_status()
+            page_size = min(limit, LIBRARY_PAGE_SIZE) if limit else LIBRARY_PAGE_SIZE
+            items = self.iter_library_items(
+                page_size=page_size,
+                sort='addedAt:desc',
+                merge_key=lambda item: -(item.get('addedAt') or 0)
+            )
             
-            data = response.json()
-            sections = data.get('MediaContainer', {}).get('Directory', [])
-            movie_sections = [s for s in sections if s.get('type') == 'movie']
-            
-            if not movie_sections:
-                logger.warning("No movie sections found in Plex library")
-                return []
-            
-            # Fetch movies from all movie sections
-            all_movies = []
-            for section in movie_sections:
-                section_key = section.get('key')
-                movies_url = f"{self.base_url}/library/sections/{section_key}/all"
-                
-                params = {
-                    'type': '1',  # Movies
-                    'sort': 'addedAt:desc'
+            # Format movie data for AI context
+            all_movies = [
+                {
+                    'title': item.get('title', ''),
+                    'year': item.get('year'),
+                    'genres': [genre.get('tag', '') for genre in item.get('Genre', [])],
+                    'overview': item.get('summary', ''),
+                    'rating': item.get('rating'),
+                    'content_rating': item.get('contentRating'),
+                    'studio': item.get('studio')
                 }
-                
-                if limit and len(all_movies) >= limit:
-                    break
-                
-                response = requests.get(movies_url, headers=self.headers, params=params, timeout=30)
-                response.raise_for_status()
-                
-                section_data = response.json()
-                metadata = section_data.get('MediaContainer', {}).get('Metadata', [])
-                
-                # Format movie data for AI context
-                for item in metadata:
-                    if limit and len(all_movies) >= limit:
-                        break
-                        
-                    movie_info = {
-                        'title': item.get('title', ''),
-                        'year': item.get('year'),
-                        'genres': [genre.get('tag', '') for genre in item.get('Genre', [])],
-                        'overview': item.get('summary', ''),
-                        'rating': item.get('rating'),
-                        'content_rating': item.get('contentRating'),
-                        'studio': item.get('studio')
-                    }
-                    all_movies.append(movie_info)
+                for item in islice(items, limit)
+            ]
             
             logger.info(f"Retrieved {len(all_movies)} movies from Plex library")
             return all_movies
@@ -323,9 +505,11 @@ class PlexService:
 
 
 class RadarrService:
-    def __init__(self):
-        self.base_url = settings.RADARR_URL.rstrip('/') if settings.RADARR_URL else None
-        self.api_key = settings.RADARR_API_KEY
+    def __init__(self, base_url=None, api_key=None):
+        base_url = base_url if base_url is not None else settings.RADARR_URL
+        self.base_url = base_url.rstrip('/') if base_url else None
+        self.api_key = api_key if api_key is not None else settings.RADARR_API_KEY
+        self.session = build_session('radarr')
         self.headers = {
             'X-Api-Key': self.api_key,
             'Content-Type': 'application/json',
@@ -360,7 +544,7 @@ class RadarrService:
             logger.info(f"URL: {search_url}")
             logger.info(f"Headers: {dict(self.headers)}")
             
-            response = requests.get(search_url, headers=self.headers, params=params, timeout=10)
+            response = self.session.get(search_url, headers=self.headers, params=params, timeout=10)
             
             # Log the response details for debugging
             logger.info(f"Radarr response status: {response.status_code}")
@@ -397,7 +581,7 @@ class RadarrService:
             logger.info(f"Sending add request to Radarr: {add_url}")
             logger.info(f"Add data: {add_data}")
             
-            response = requests.post(add_url, json=add_data, headers=self.headers, timeout=10)
+            response = self.session.post(add_url, json=add_data, headers=self.headers, timeout=10)
             
             logger.info(f"Add response status: {response.status_code}")
             
@@ -408,6 +592,7 @@ class RadarrService:
                     error = error_data[0]
                     if error.get('errorCode') == 'MovieExistsValidator':
                         logger.info(f"Movie {title} already exists in Radarr")
+                        self.invalidate_catalog()
                         return True  # Return True since the movie is already there
                 
                 logger.error(f"Add response error: {response.text}")
@@ -419,6 +604,7 @@ class RadarrService:
             response.raise_for_status()
             
             logger.info(f"Movie {title} requested successfully on Radarr")
+            self.invalidate_catalog()
             return True
             
         except Exception as e:
@@ -432,7 +618,7 @@ class RadarrService:
         
         try:
             test_url = f"{self.base_url}/api/v3/system/status"
-            response = requests.get(test_url, headers=self.headers, timeout=10)
+            response = self.session.get(test_url, headers=self.headers, timeout=10)
             
             if response.status_code == 401:
                 return False, "Authentication failed - check API key"
@@ -446,7 +632,7 @@ class RadarrService:
     def _get_root_folder(self):
         try:
             url = f"{self.base_url}/api/v3/rootfolder"
-            response = requests.get(url, headers=self.headers, timeout=10)
+            response = self.session.get(url, headers=self.headers, timeout=10)
             response.raise_for_status()
             
             root_folders = response.json()
@@ -460,7 +646,7 @@ class RadarrService:
     def get_queue_status(self):
         try:
             url = f"{self.base_url}/api/v3/queue"
-            response = requests.get(url, headers=self.headers, timeout=10)
+            response = self.session.get(url, headers=self.headers, timeout=10)
             response.raise_for_status()
             
             data = response.json()
@@ -472,49 +658,128 @@ class RadarrService:
             logger.error(f"Error getting Radarr queue status: {e}")
             return {'total': 0, 'items': []}
     
-    def is_movie_in_radarr(self, tmdb_id):
-        """Check if a movie already exists in Radarr"""
-        if not self.base_url or not self.api_key or not tmdb_id:
-            return False
+    def _catalog_cache_key(self):
+        return f"arr:radarr:{instance_key(self.base_url)}:catalog"
+    
+    def _catalog_version_key(self):
+        return f"arr:radarr:{instance_key(self.base_url)}:catalog-version"
+    
+    def get_catalog(self, refresh=False):
+        """
+        Movies on this Radarr instance keyed by TMDB ID, or None if it can't be read.
+        
+        The catalog is cached per instance URL, so users sharing an instance share
+        one copy. ``refresh`` fetches it again even if it is cached.
+        """
+        if not self.base_url or not self.api_key:
+            return None
+        
+        cache_key = self._catalog_cache_key()
+        catalog = None if refresh else cache_get('radarr_catalog', cache_key)
+        if catalog is not None:
+            return catalog
         
         try:
             url = f"{self.base_url}/api/v3/movie"
-            response = requests.get(url, headers=self.headers, timeout=15)
+            response = self.session.get(url, headers=self.headers, timeout=15)
             response.raise_for_status()
             
-            movies = response.json()
-            for movie in movies:
-                if movie.get('tmdbId') == int(tmdb_id):
-                    logger.info(f"Movie with TMDB ID {tmdb_id} found in Radarr")
-                    return True
-            
-            return False
+            catalog = {}
+            for movie in response.json():
+                tmdb_id = movie.get('tmdbId')
+                if tmdb_id:
+                    catalog[tmdb_id] = {
+                        'id': movie.get('id'),
+                        'title': movie.get('title'),
+                        'year': movie.get('year'),
+                        'tmdbId': tmdb_id,
+                        'monitored': movie.get('monitored'),
+                        'hasFile': movie.get('hasFile'),
+                    }
         except Exception as e:
-            logger.error(f"Error checking if movie exists in Radarr: {e}")
+            logger.error(f"Error getting Radarr movies: {e}")
+            return None
+        
+        set_stamped(cache_key, catalog, cache_timeout_for('radarr', self.base_url, CATALOG_CACHE_TIMEOUT))
+        return catalog
+    
+    def catalog_stamp(self):
+        """
+        When the cached catalog last changed, or None if it isn't cached.
+        
+        An instance that isn't configured has no catalog that could change, which is stamp 0.
+        """
+        if not self.base_url or not self.api_key:
+            return 0
+        return get_stamp(self._catalog_cache_key())
+    
+    def catalog_version(self):
+        """When the catalog was last changed through us or a webhook; 0 for an unconfigured instance"""
+        if not self.base_url or not self.api_key:
+            return 0
+        return get_version(self._catalog_version_key())
+    
+    def invalidate_catalog(self):
+        if self.base_url:
+            delete_stamped(self._catalog_cache_key())
+            bump_version(self._catalog_version_key())
+    
+    def apply_catalog_event(self, event_type, movie):
+        """
+        Update the cached catalog from a Radarr webhook event.
+        
+        Only an already cached catalog is patched; if there is none, the next
+        read fetches a fresh one anyway.
+        """
+        tmdb_id = movie.get('tmdbId')
+        if not self.base_url or not tmdb_id:
+            return
+        
+        bump_version(self._catalog_version_key())
+        cache_key = self._catalog_cache_key()
+        catalog = cache.get(cache_key)
+        if catalog is None:
+            return
+        
+        if event_type == 'MovieDelete':
+            catalog.pop(tmdb_id, None)
+        else:
+            entry = catalog.get(tmdb_id) or {
+                'id': movie.get('id'),
+                'title': movie.get('title'),
+                'year': movie.get('year'),
+                'tmdbId': tmdb_id,
+                'monitored': True,
+                'hasFile': False,
+            }
+            if event_type == 'Download':
+                entry['hasFile'] = True
+            catalog[tmdb_id] = entry
+        
+        set_stamped(cache_key, catalog, cache_timeout_for('radarr', self.base_url, CATALOG_CACHE_TIMEOUT))
+    
+    def is_movie_in_radarr(self, tmdb_id):
+        """Check if a movie already exists in Radarr"""
+        if not self.base_url or not self.api_key or not tmdb_id:
             return False
+        
+        catalog = self.get_catalog()
+        if catalog and int(tmdb_id) in catalog:
+            logger.info(f"Movie with TMDB ID {tmdb_id} found in Radarr")
+            return True
+        
+        return False
     
     def get_radarr_movies_by_tmdb_ids(self, tmdb_ids):
         """Get existing movies from Radarr by TMDB IDs"""
         if not self.base_url or not self.api_key or not tmdb_ids:
             return {}
         
-        try:
-            url = f"{self.base_url}/api/v3/movie"
-            response = requests.get(url, headers=self.headers, timeout=15)
-            response.raise_for_status()
-            
-            movies = response.json()
-            existing_movies = {}
-            for movie in movies:
-                tmdb_id = movie.get('tmdbId')
-                if tmdb_id and tmdb_id in tmdb_ids:
-                    existing_movies[tmdb_id] = movie
-            
-            logger.info(f"Found {len(existing_movies)} existing movies in Radarr out of {len(tmdb_ids)} requested")
-            return existing_movies
-        except Exception as e:
-            logger.error(f"Error getting Radarr movies: {e}")
-            return {}
+        catalog = self.get_catalog() or {}
+        existing_movies = {tmdb_id: catalog[tmdb_id] for tmdb_id in tmdb_ids if tmdb_id in catalog}
+        
+        logger.info(f"Found {len(existing_movies)} existing movies in Radarr out of {len(tmdb_ids)} requested")
+        return existing_movies
     
     def get_quality_profiles(self):
         """Get available quality profiles from Radarr"""
@@ -523,7 +788,7 @@ class RadarrService:
         
         try:
             url = f"{self.base_url}/api/v3/qualityprofile"
-            response = requests.get(url, headers=self.headers, timeout=10)
+            response = self.session.get(url, headers=self.headers, timeout=10)
             response.raise_for_status()
             
             profiles = response.json()
@@ -534,9 +799,11 @@ class RadarrService:
 
 
 class SonarrService:
-    def __init__(self):
-        self.base_url = settings.SONARR_URL.rstrip('/') if settings.SONARR_URL else None
-        self.api_key = settings.SONARR_API_KEY
+    def __init__(self, base_url=None, api_key=None):
+        base_url = base_url if base_url is not None else settings.SONARR_URL
+        self.base_url = base_url.rstrip('/') if base_url else None
+        self.api_key = api_key if api_key is not None else settings.SONARR_API_KEY
+        self.session = build_session('sonarr')
         self.headers = {
             'X-Api-Key': self.api_key,
             'Content-Type': 'application/json'
@@ -556,7 +823,7 @@ class SonarrService:
             else:
                 params = {'term': series_title}
             
-            response = requests.get(search_url, headers=self.headers, params=params, timeout=10)
+            response = self.session.get(search_url, headers=self.headers, params=params, timeout=10)
             response.raise_for_status()
             
             search_results = response.json()
@@ -564,7 +831,7 @@ class SonarrService:
                 # If TMDB search failed, try title search as fallback
                 if tmdb_id:
                     params = {'term': series_title}
-                    response = requests.get(search_url, headers=self.headers, params=params, timeout=10)
+                    response = self.session.get(search_url, headers=self.headers, params=params, timeout=10)
                     response.raise_for_status()
                     search_results = response.json()
                     
@@ -599,7 +866,7 @@ class SonarrService:
                 'seasons': seasons
             }
             
-            response = requests.post(add_url, json=add_data, headers=self.headers, timeout=10)
+            response = self.session.post(add_url, json=add_data, headers=self.headers, timeout=10)
             
             # Handle "already exists" error gracefully
             if response.status_code == 400:
@@ -625,10 +892,28 @@ class SonarrService:
             logger.error(f"Error requesting series {series_title} on Sonarr: {e}")
             return False
     
+    def test_connection(self):
+        """Test Sonarr API connection"""
+        if not self.base_url or not self.api_key:
+            return False, "Sonarr not configured"
+        
+        try:
+            test_url = f"{self.base_url}/api/v3/system/status"
+            response = self.session.get(test_url, headers=self.headers, timeout=10)
+            
+            if response.status_code == 401:
+                return False, "Authentication failed - check API key"
+            elif response.status_code == 200:
+                return True, "Connection successful"
+            else:
+                return False, f"HTTP {response.status_code}: {response.text}"
+        except Exception as e:
+            return False, f"Connection error: {e}"
+    
     def _get_root_folder(self):
         try:
             url = f"{self.base_url}/api/v3/rootfolder"
-            response = requests.get(url, headers=self.headers, timeout=10)
+            response = self.session.get(url, headers=self.headers, timeout=10)
             response.raise_for_status()
             
             root_folders = response.json()
@@ -642,7 +927,7 @@ class SonarrService:
     def get_queue_status(self):
         try:
             url = f"{self.base_url}/api/v3/queue"
-            response = requests.get(url, headers=self.headers, timeout=10)
+            response = self.session.get(url, headers=self.headers, timeout=10)
             response.raise_for_status()
             
             data = response.json()
@@ -661,7 +946,7 @@ class SonarrService:
         
         try:
             url = f"{self.base_url}/api/v3/qualityprofile"
-            response = requests.get(url, headers=self.headers, timeout=10)
+            response = self.session.get(url, headers=self.headers, timeout=10)
             response.raise_for_status()
             
             profiles = response.json()
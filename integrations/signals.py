@@ -0,0 +1,14 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from accounts.models import UserSettings
+from core.user_state import bump_user_version
+from .registry import registry
+
+
+@receiver(post_save, sender=UserSettings)
+@receiver(post_delete, sender=UserSettings)
+def invalidate_user_services(sender, instance, **kwargs):
+    """Rebuild the user's integration clients after their settings change"""
+    registry.invalidate(instance.user_id)
+    bump_user_version(instance.user_id, 'settings')
@@ -1,3 +1,305 @@
-from django.test import TestCase
+import json
+import time
+from datetime import date
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from unittest.mock import MagicMock
+
+from accounts.models import UserSettings
+from movies.models import Movie
+from movies.views import get_user_library_context
+from .library_index import LibraryIndex, normalize_title
+from .registry import get_radarr_service, get_user_services, registry
+from .services import (
+    CATALOG_CACHE_TIMEOUT, PUSH_POLL_FACTOR, JellyfinService, PlexService, cache_timeout_for
+)
+from .webhooks import webhook_token
+
+
+class ServiceRegistryTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        registry.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.user_settings = UserSettings.objects.create(
+            user=self.user,
+            radarr_url='http://radarr:7878/',
+            radarr_api_key='radarr-key',
+            server_type='jellyfin',
+            server_url='http://jellyfin:8096',
+            server_api_key='jellyfin-key',
+        )
+
+    def test_clients_are_configured_from_user_settings(self):
+        services = get_user_services(self.user)
+        self.assertEqual(services.radarr().base_url, 'http://radarr:7878')
+        self.assertEqual(services.radarr().api_key, 'radarr-key')
+        self.assertEqual(services.media_server().api_key, 'jellyfin-key')
+        self.assertIsNone(services.plex())
+        self.assertIsNone(services.sonarr())
+
+    def test_settings_and_clients_are_reused(self):
+        services = get_user_services(self.user)
+        radarr = services.radarr()
+        with self.assertNumQueries(0):
+            self.assertIs(get_user_services(self.user).radarr(), radarr)
+
+    def test_saving_settings_rebuilds_clients(self):
+        radarr = get_user_services(self.user).radarr()
+        self.user_settings.radarr_url = 'http://radarr-2:7878'
+        self.user_settings.save()
+
+        services = get_user_services(self.user)
+        self.assertIsNot(services.radarr(), radarr)
+        self.assertEqual(services.radarr().base_url, 'http://radarr-2:7878')
+
+    def test_clients_have_their_own_sessions(self):
+        services = get_user_services(self.user)
+        self.assertIsNot(services.radarr().session, services.jellyfin().session)
+
+
+class TenantRoutingTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        registry.clear()
+        self.alice = User.objects.create_user(username='alice', password='testpass123')
+        self.bob = User.objects.create_user(username='bob', password='testpass123')
+        self.carol = User.objects.create_user(username='carol', password='testpass123')
+        for user, url in ((self.alice, 'http://radarr-a:7878'), (self.bob, 'http://radarr-a:7878/')):
+            UserSettings.objects.create(user=user, radarr_url=url, radarr_api_key=f'{user.username}-key')
+
+    def _mock_catalog(self, radarr, movies):
+        response = MagicMock(status_code=200)
+        response.json.return_value = movies
+        radarr.session.get = MagicMock(return_value=response)
+        return radarr.session.get
+
+    def test_radarr_calls_go_to_the_users_instance(self):
+        radarr = get_radarr_service(self.alice)
+        self.assertEqual(radarr.base_url, 'http://radarr-a:7878')
+        self.assertEqual(radarr.api_key, 'alice-key')
+
+    @override_settings(RADARR_URL='http://radarr-global:7878', RADARR_API_KEY='global-key')
+    def test_users_without_settings_fall_back_to_server_config(self):
+        self.assertEqual(get_radarr_service(self.carol).base_url, 'http://radarr-global:7878')
+
+    def test_catalog_is_shared_by_users_of_the_same_instance(self):
+        alice_get = self._mock_catalog(get_radarr_service(self.alice), [{'id': 1, 'tmdbId': 603}])
+        bob_get = self._mock_catalog(get_radarr_service(self.bob), [])
+
+        self.assertIn(603, get_radarr_service(self.alice).get_catalog())
+        self.assertIn(603, get_radarr_service(self.bob).get_catalog())
+        self.assertEqual(alice_get.call_count, 1)
+        bob_get.assert_not_called()
+
+    def test_catalogs_of_different_instances_are_separate(self):
+        UserSettings.objects.create(user=self.carol, radarr_url='http://radarr-b:7878', radarr_api_key='carol-key')
+        self._mock_catalog(get_radarr_service(self.alice), [{'id': 1, 'tmdbId': 603}])
+        self._mock_catalog(get_radarr_service(self.carol), [{'id': 1, 'tmdbId': 550}])
+
+        self.assertEqual(list(get_radarr_service(self.alice).get_catalog()), [603])
+        self.assertEqual(list(get_radarr_service(self.carol).get_catalog()), [550])
+
+
+class WebhookTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        registry.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        UserSettings.objects.create(
+            user=self.user,
+            radarr_url='http://radarr:7878',
+            radarr_api_key='radarr-key',
+            server_type='jellyfin',
+            server_url='http://jellyfin:8096',
+            server_api_key='jellyfin-key',
+        )
+        self.token = webhook_token(self.user)
+
+    def _post(self, service, payload, token=None):
+        return self.client.post(
+            f'/api/webhooks/{service}/{token or self.token}/',
+            data=json.dumps(payload),
+            content_type='application/json',
+        )
+
+    def test_invalid_token_is_rejected(self):
+        response = self._post('radarr', {'eventType': 'Test'}, token=f'{self.user.pk}:forged')
+        self.assertEqual(response.status_code, 403)
+
+    def test_radarr_event_patches_cached_catalog(self):
+        radarr = get_radarr_service(self.user)
+        response = MagicMock(status_code=200)
+        response.json.return_value = []
+        radarr.session.get = MagicMock(return_value=response)
+        self.assertEqual(radarr.get_catalog(), {})
+        Movie.objects.create(title='Fight Club', tmdb_id=550)
+
+        response = self._post('radarr', {
+            'eventType': 'MovieAdded',
+            'movie': {'id': 7, 'title': 'Fight Club', 'year': 1999, 'tmdbId': 550},
+        })
+
+        self.assertEqual(response.json(), {'status': 'ok'})
+        self.assertIn(550, radarr.get_catalog())
+        self.assertEqual(radarr.session.get.call_count, 1)
+        self.assertTrue(Movie.objects.get(tmdb_id=550).requested_on_radarr)
+        self.assertEqual(
+            cache_timeout_for('radarr', radarr.base_url, CATALOG_CACHE_TIMEOUT),
+            CATALOG_CACHE_TIMEOUT * PUSH_POLL_FACTOR,
+        )
+
+    def test_library_event_invalidates_cached_library(self):
+        jellyfin = get_user_services(self.user).jellyfin()
+        jellyfin.get_library_movies = MagicMock(return_value=[{'title': 'Fight Club'}])
+
+        get_user_library_context(self.user)
+        get_user_library_context(self.user)
+        self.assertEqual(jellyfin.get_library_movies.call_count, 1)
+
+        response = self._post('jellyfin', {'NotificationType': 'ItemAdded', 'ItemType': 'Movie'})
+        self.assertEqual(response.json(), {'status': 'ok'})
+
+        get_user_library_context(self.user)
+        self.assertEqual(jellyfin.get_library_movies.call_count, 2)
+
+    def test_unrelated_events_are_ignored(self):
+        response = self._post('plex', {'event': 'library.new'})
+        self.assertEqual(response.json(), {'status': 'ignored'})
+
+
+class LibraryIndexTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        registry.clear()
+        self.index = LibraryIndex.from_items([
+            {'title': 'Amélie', 'year': 2001, 'tmdb_id': None, 'imdb_id': None},
+            {'title': 'Fight Club', 'year': 1999, 'tmdb_id': '550', 'imdb_id': 'tt0137523'},
+            {'title': 'Primer', 'year': None},
+        ])
+
+    def test_normalize_title(self):
+        self.assertEqual(normalize_title('  Amélie: The Movie! '), 'amelie the movie')
+        self.assertEqual(normalize_title('Fast & Furious'), 'fast and furious')
+
+    def test_matches_by_id_title_and_year(self):
+        self.assertTrue(self.index.contains({'id': 550, 'title': 'Something Else'}))
+        self.assertTrue(self.index.contains({'imdb_id': 'tt0137523'}))
+        self.assertTrue(self.index.contains({'title': 'amelie', 'release_date': '2001-04-25'}))
+        self.assertFalse(self.index.contains({'title': 'Amelie', 'release_date': '1990-01-01'}))
+        self.assertTrue(self.index.contains(Movie(title='Primer', release_date=date(2004, 10, 8))))
+        self.assertFalse(self.index.contains({'id': 13, 'title': 'Forrest Gump'}))
+
+    def test_page_is_answered_from_one_library_fetch(self):
+        user = User.objects.create_user(username='testuser', password='testpass123')
+        UserSettings.objects.create(
+            user=user,
+            server_type='jellyfin',
+            server_url='http://jellyfin:8096',
+            server_api_key='jellyfin-key',
+        )
+        jellyfin = get_user_services(user).jellyfin()
+        response = MagicMock(status_code=200)
+        response.json.return_value = {'Items': [
+            {'Name': 'Fight Club', 'ProductionYear': 1999, 'ProviderIds': {'Tmdb': '550'}},
+        ]}
+        jellyfin.session.get = MagicMock(return_value=response)
+
+        page = [{'id': 550, 'title': 'Fight Club'}, {'id': 13, 'title': 'Forrest Gump'}] * 10
+        self.assertEqual([jellyfin.is_movie_available(movie) for movie in page], [True, False] * 10)
+        self.assertEqual(jellyfin.session.get.call_count, 1)
+
+
+class PagedLibraryFetchTest(TestCase):
+    def _pages(self, pages):
+        responses = []
+        for page in pages:
+            response = MagicMock(status_code=200)
+            response.json.return_value = page
+            responses.append(response)
+        return MagicMock(side_effect=responses)
+
+    def test_jellyfin_stops_fetching_once_limit_is_reached(self):
+        jellyfin = JellyfinService('http://jellyfin:8096', 'jellyfin-key')
+        jellyfin.session.get = self._pages([
+            {'Items': [{'Id': str(i), 'Name': f'Movie {i}'} for i in range(2)], 'TotalRecordCount': 10},
+            {'Items': [{'Id': str(i), 'Name': f'Movie {i}'} for i in range(2, 4)], 'TotalRecordCount': 10},
+        ])
+
+        movies = jellyfin.get_library_movies(limit=2)
+
+        self.assertEqual([movie['title'] for movie in movies], ['Movie 0', 'Movie 1'])
+        self.assertEqual(jellyfin.session.get.call_count, 1)
+        self.assertEqual(jellyfin.session.get.call_args.kwargs['params']['Limit'], 2)
+
+    def test_jellyfin_pages_without_total_record_count(self):
+        jellyfin = JellyfinService('http://jellyfin:8096', 'jellyfin-key')
+        jellyfin.session.get = self._pages([
+            {'Items': [{'Id': str(i)} for i in range(2)]},
+            {'Items': [{'Id': str(i)} for i in range(2, 4)]},
+            {'Items': [{'Id': '4'}]},
+        ])
+
+        items = list(jellyfin.iter_library_items(page_size=2))
+
+        self.assertEqual([item['Id'] for item in items], ['0', '1', '2', '3', '4'])
+        self.assertEqual(jellyfin.session.get.call_count, 3)
+
+    def test_plex_pages_without_total_size(self):
+        plex = PlexService('http://plex:32400', 'plex-token')
+        plex.session.get = self._pages([
+            {'MediaContainer': {'Directory': [{'key': '1', 'type': 'movie'}]}},
+            {'MediaContainer': {'Metadata': [{'title': 'A'}, {'title': 'B'}]}},
+            {'MediaContainer': {'Metadata': [{'title': 'C'}, {'title': 'D'}]}},
+            {'MediaContainer': {'Metadata': []}},
+        ])
+
+        titles = [item['title'] for item in plex.iter_library_items(page_size=2)]
+
+        self.assertEqual(titles, ['A', 'B', 'C', 'D'])
+        self.assertEqual(plex.session.get.call_count, 4)
+
+    def test_plex_pages_through_each_section(self):
+        plex = PlexService('http://plex:32400', 'plex-token')
+        plex.session.get = self._pages([
+            {'MediaContainer': {'Directory': [{'key': '1', 'type': 'movie'}, {'key': '2', 'type': 'show'}]}},
+            {'MediaContainer': {'totalSize': 3, 'Metadata': [{'title': 'A'}, {'title': 'B'}]}},
+            {'MediaContainer': {'totalSize': 3, 'Metadata': [{'title': 'C'}]}},
+        ])
+
+        titles = [item['title'] for item in plex.iter_library_items(page_size=2)]
+
+        self.assertEqual(titles, ['A', 'B', 'C'])
+        self.assertEqual(plex.session.get.call_args.kwargs['params']['X-Plex-Container-Start'], 2)
+
+    def test_plex_sections_are_fetched_concurrently_and_merged(self):
+        plex = PlexService('http://plex:32400', 'plex-token')
+        sections = {
+            '1': [{'title': 'Old', 'guid': 'plex://movie/1', 'addedAt': 100}],
+            '2': [
+                {'title': 'Old', 'guid': 'plex://movie/1', 'addedAt': 300},
+                {'title': 'New', 'guid': 'plex://movie/2', 'addedAt': 200},
+            ],
+        }
+
+        def get(url, **kwargs):
+            response = MagicMock(status_code=200)
+            if url.endswith('/library/sections'):
+                response.json.return_value = {'MediaContainer': {'Directory': [
+                    {'key': '1', 'type': 'movie'}, {'key': '2', 'type': 'movie'},
+                ]}}
+            else:
+                time.sleep(0.2)
+                metadata = sections[url.split('/')[-2]]
+                response.json.return_value = {'MediaContainer': {'totalSize': len(metadata), 'Metadata': metadata}}
+            return response
+
+        plex.session.get = MagicMock(side_effect=get)
+
+        started = time.monotonic()
+        movies = plex.get_library_movies(limit=10)
+
+        self.assertLess(time.monotonic() - started, 0.35)
+        self.assertEqual([movie['title'] for movie in movies], ['Old', 'New'])
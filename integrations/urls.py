@@ -0,0 +1,7 @@
+from django.urls import path
+
+from . import views
+
+urlpatterns = [
+    path('<str:service>/<str:token>/', views.webhook, name='integration-webhook'),
+]
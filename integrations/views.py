@@ -1,3 +1,42 @@
-from django.shortcuts import render
+import json
+import logging
 
-# Create your views here.
+from django.contrib.auth.models import User
+from django.http import Http404, JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+
+from .registry import get_user_services
+from .webhooks import HANDLERS, user_id_from_token
+
+logger = logging.getLogger(__name__)
+
+
+@csrf_exempt
+@require_POST
+def webhook(request, service, token):
+    """Receive a push notification from one of the user's servers"""
+    handler = HANDLERS.get(service)
+    if handler is None:
+        raise Http404
+    
+    user_id = user_id_from_token(token)
+    user = User.objects.filter(pk=user_id, is_active=True).first() if user_id else None
+    if user is None:
+        return JsonResponse({'error': 'Invalid webhook token'}, status=403)
+    
+    try:
+        if 'payload' in request.POST:
+            # Plex posts multipart form data with the event as a JSON field
+            payload = json.loads(request.POST['payload'])
+        else:
+            payload = json.loads(request.body or b'{}')
+    except ValueError:
+        return JsonResponse({'error': 'Invalid JSON payload'}, status=400)
+    
+    if not isinstance(payload, dict):
+        return JsonResponse({'error': 'Invalid JSON payload'}, status=400)
+    
+    handled = handler(get_user_services(user), payload)
+    logger.debug(f"{service} webhook for user {user.pk}: {'handled' if handled else 'ignored'}")
+    return JsonResponse({'status': 'ok' if handled else 'ignored'})
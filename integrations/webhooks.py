@@ -0,0 +1,119 @@
+"""
+Webhook receivers for Radarr, Sonarr, Jellyfin and Plex
+
+Each user gets one signed token to put in the webhook URL of their servers.
+Events patch the cached Radarr catalog, drop cached library listings and
+update the local request/availability flags, so "Available" and "Requested"
+badges are fresh without re-downloading whole catalogs. Instances that push
+events also have their caches kept longer, see ``cache_timeout_for``.
+"""
+import logging
+
+from django.core import signing
+
+from movies.models import Movie
+from tv_shows.models import TVShow
+from .services import invalidate_library, mark_push_active
+
+logger = logging.getLogger(__name__)
+
+TOKEN_SALT = 'integrations.webhooks'
+
+RADARR_EVENTS = {'Grab', 'Download', 'MovieAdded', 'MovieDelete'}
+SONARR_EVENTS = {'Grab', 'Download', 'SeriesAdd'}
+LIBRARY_EVENTS = {'ItemAdded', 'library.new'}
+
+
+def webhook_token(user):
+    """Token identifying ``user`` in their webhook URLs"""
+    return signing.Signer(salt=TOKEN_SALT).sign(str(user.pk))
+
+
+def user_id_from_token(token):
+    """User id a webhook token was issued for, or None if it isn't valid"""
+    try:
+        return int(signing.Signer(salt=TOKEN_SALT).unsign(token))
+    except (signing.BadSignature, ValueError):
+        return None
+
+
+def _tmdb_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def handle_radarr(services, payload):
+    event_type = payload.get('eventType')
+    radarr = services.radarr()
+    if event_type not in RADARR_EVENTS or not radarr:
+        return False
+    
+    movie = payload.get('movie') or {}
+    mark_push_active('radarr', radarr.base_url)
+    radarr.apply_catalog_event(event_type, movie)
+    
+    tmdb_id = _tmdb_id(movie.get('tmdbId'))
+    if tmdb_id and event_type != 'MovieDelete':
+        # The local flag is shared by every household, so deletes don't clear it
+        Movie.objects.filter(tmdb_id=tmdb_id, requested_on_radarr=False).update(requested_on_radarr=True)
+    return True
+
+
+def handle_sonarr(services, payload):
+    event_type = payload.get('eventType')
+    sonarr = services.sonarr()
+    if event_type not in SONARR_EVENTS or not sonarr:
+        return False
+    
+    series = payload.get('series') or {}
+    mark_push_active('sonarr', sonarr.base_url)
+    
+    tmdb_id = _tmdb_id(series.get('tmdbId'))
+    if tmdb_id:
+        TVShow.objects.filter(tmdb_id=tmdb_id, requested_on_sonarr=False).update(requested_on_sonarr=True)
+    elif series.get('imdbId'):
+        TVShow.objects.filter(imdb_id=series['imdbId'], requested_on_sonarr=False).update(requested_on_sonarr=True)
+    return True
+
+
+def handle_jellyfin(services, payload):
+    jellyfin = services.jellyfin()
+    if payload.get('NotificationType') not in LIBRARY_EVENTS or not jellyfin:
+        return False
+    
+    mark_push_active('jellyfin', jellyfin.base_url)
+    invalidate_library(jellyfin.base_url)
+    
+    tmdb_id = _tmdb_id(payload.get('Provider_tmdb'))
+    if tmdb_id and payload.get('ItemType') == 'Series':
+        TVShow.objects.filter(tmdb_id=tmdb_id, available_on_jellyfin=False).update(available_on_jellyfin=True)
+    return True
+
+
+def handle_plex(services, payload):
+    plex = services.plex()
+    if payload.get('event') not in LIBRARY_EVENTS or not plex:
+        return False
+    
+    mark_push_active('plex', plex.base_url)
+    invalidate_library(plex.base_url)
+    
+    metadata = payload.get('Metadata') or {}
+    if metadata.get('type') == 'show':
+        for guid in metadata.get('Guid') or []:
+            guid_id = guid.get('id', '')
+            if guid_id.startswith('tmdb://'):
+                tmdb_id = _tmdb_id(guid_id[len('tmdb://'):])
+                if tmdb_id:
+                    TVShow.objects.filter(tmdb_id=tmdb_id, available_on_plex=False).update(available_on_plex=True)
+    return True
+
+
+HANDLERS = {
+    'radarr': handle_radarr,
+    'sonarr': handle_sonarr,
+    'jellyfin': handle_jellyfin,
+    'plex': handle_plex,
+}
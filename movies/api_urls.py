@@ -2,13 +2,16 @@ from django.urls import path
 from .views import (
     GenreViewSet, MovieViewSet, UserRatingViewSet,
     UserWatchlistViewSet, RecommendationViewSet,
-    auth_login, auth_register, auth_logout, auth_current_user
+    auth_login, auth_register, auth_logout, auth_current_user, dashboard
 )
 from tv_shows.views import TVShowViewSet, TVShowRatingViewSet, TVShowWatchlistViewSet, TVShowRecommendationViewSet
 from accounts.views import UserSettingsViewSet
 from recommendations.views import UserNegativeFeedbackViewSet
 
 urlpatterns = [
+    # Dashboard shelves, streamed in one request
+    path('dashboard/', dashboard, name='dashboard'),
+    
     # Genre endpoints
     path('genres/', GenreViewSet.as_view({'get': 'list'}), name='genre-list'),
     path('genres/<int:pk>/', GenreViewSet.as_view({'get': 'retrieve'}), name='genre-detail'),
@@ -0,0 +1,185 @@
+"""
+Dashboard shelves in one streamed request
+
+``/api/dashboard/`` computes the shelves the dashboard otherwise fetches one
+request at a time. Each of those requests loads the user's settings and
+negative feedback and reads the Radarr catalog and library index again;
+here they are loaded once and shared by every shelf.
+
+Upstream work (TMDB lists, the Radarr catalog, the library listing and
+index, Gemini) runs concurrently on a thread pool. Everything that touches
+the database stays on the request thread: feedback and settings are read up
+front, and each shelf is finished (filtered, marked with local status) and
+written as one NDJSON line as soon as its upstream data arrives.
+"""
+import json
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from core import timing
+from integrations.registry import get_radarr_service, get_user_services
+from integrations.services import cached_library_movies
+from recommendations.models import UserNegativeFeedback
+
+from .gemini_service import GeminiService
+from .local_recommender import LocalRecommender
+from .tmdb_service import TMDBService
+from .tmdb_tv_service import TMDBTVService
+from .views import (
+    LIBRARY_CONTEXT_LIMIT, RECENTLY_ADDED_LIMIT, add_local_status, exclude_tmdb_ids, recently_added_cards
+)
+
+logger = logging.getLogger(__name__)
+
+# shelf -> TMDB list method, first page
+MOVIE_LISTS = {
+    'popular': 'get_popular_movies',
+    'top_rated': 'get_top_rated_movies',
+    'now_playing': 'get_now_playing_movies',
+    'upcoming': 'get_upcoming_movies',
+}
+TV_LISTS = {
+    'tv_popular': 'get_popular_tv_shows',
+    'tv_top_rated': 'get_top_rated_tv_shows',
+    'tv_airing_today': 'get_airing_today_tv_shows',
+    'tv_on_the_air': 'get_on_the_air_tv_shows',
+}
+SHELVES = (*MOVIE_LISTS, 'recently_added', *TV_LISTS, 'ai_recommendations')
+
+# The defaults of /api/movies/ai_recommendations/
+AI_PREFERENCES = {
+    'genres': ['action', 'comedy', 'drama'],
+    'mood': 'entertaining',
+    'year_range': '2015-2024',
+}
+
+
+class Dashboard:
+    """
+    The shelves in ``shelves`` for ``user``, streamed by ``stream()``.
+
+    Upstream fetches start as soon as the dashboard is built.
+    """
+
+    def __init__(self, user, shelves=SHELVES):
+        self.user = user
+        self.shelves = list(shelves)
+        self.executor = ThreadPoolExecutor(max_workers=len(self.shelves) + 3, thread_name_prefix='dashboard')
+
+        # Database reads, once for every shelf and on the request thread
+        self.negative_feedback = set()
+        media_server = server_type = None
+        if user.is_authenticated:
+            self.negative_feedback = set(
+                UserNegativeFeedback.objects.filter(user=user, content_type='movie').values_list('tmdb_id', flat=True)
+            )
+            user_services = get_user_services(user)
+            media_server = user_services.media_server()
+            server_type = user_services.settings.server_type if media_server else None
+
+        movie_lists = any(name in MOVIE_LISTS for name in self.shelves)
+        library_shelves = {'recently_added', 'ai_recommendations'} & set(self.shelves)
+
+        # Upstream inputs shared by several shelves, each fetched once
+        self.radarr_catalog = None
+        if movie_lists or 'recently_added' in self.shelves:
+            self.radarr_catalog = self._submit(get_radarr_service(user).get_catalog)
+        self.library_index = None
+        if media_server and movie_lists:
+            self.library_index = self._submit(media_server.get_library_index)
+        self.library_movies = None
+        if media_server and library_shelves:
+            # The Gemini context listing also holds the recently added shelf, newest first
+            self.library_movies = self._submit(
+                cached_library_movies, media_server, server_type, limit=LIBRARY_CONTEXT_LIMIT
+            )
+
+    def _submit(self, fn, *args, **kwargs):
+        return self.executor.submit(timing.propagate(fn), *args, **kwargs)
+
+    @staticmethod
+    def _result(future, default=None):
+        """A shared input's value, or ``default`` when it wasn't fetched or failed"""
+        if future is None:
+            return default
+        try:
+            result = future.result()
+        except Exception as e:
+            logger.warning(f"Dashboard input failed: {e}")
+            return default
+        return default if result is None else result
+
+    def _fetch(self, name):
+        """Start the upstream part of shelf ``name``"""
+        if name in MOVIE_LISTS:
+            return self._submit(lambda: getattr(TMDBService(), MOVIE_LISTS[name])(1))
+        if name in TV_LISTS:
+            return self._submit(lambda: getattr(TMDBTVService(), TV_LISTS[name])(1))
+        if name == 'ai_recommendations':
+            if not settings.GOOGLE_GEMINI_API_KEY:
+                return self._submit(lambda: None)
+            # Only Gemini's answer races the deadline; its picks are enriched in _finish
+            self.gemini_service = GeminiService(timeout=settings.GEMINI_HEDGE_SECONDS)
+            return self._submit(lambda: self.gemini_service.personalized_picks(
+                AI_PREFERENCES, self._result(self.library_movies, []), list(self.negative_feedback)
+            ))
+        # recently_added only needs the shared library listing
+        return self._submit(lambda: self._result(self.library_movies, []))
+
+    def _finish(self, name, future):
+        """The NDJSON message of shelf ``name`` once ``future`` is done, or timed out for AI"""
+        if name in MOVIE_LISTS:
+            movies = future.result()
+            if movies and 'results' in movies:
+                movies['results'] = add_local_status(
+                    exclude_tmdb_ids(movies['results'], self.negative_feedback),
+                    self._result(self.radarr_catalog), self._result(self.library_index)
+                )
+            return {'data': movies}
+        if name in TV_LISTS:
+            return {'data': future.result()}
+        if name == 'recently_added':
+            movies = recently_added_cards(future.result()[:RECENTLY_ADDED_LIMIT])
+            movies = exclude_tmdb_ids(movies, self.negative_feedback)
+            return {'data': add_local_status(movies, self._result(self.radarr_catalog), in_library=True)}
+
+        picks = self._result(future) if future.done() else None
+        movies = self.gemini_service.enrich_picks(picks, 'AI recommended') if picks else None
+        source = 'gemini'
+        if not movies:
+            source = 'local'
+            movies = LocalRecommender().personalized(
+                self.user, AI_PREFERENCES, self._result(self.library_movies, []), list(self.negative_feedback)
+            )
+        return {'data': exclude_tmdb_ids(movies, self.negative_feedback), 'source': source}
+
+    def _line(self, name, future):
+        try:
+            message = dict({'shelf': name}, **self._finish(name, future))
+        except Exception as e:
+            logger.error(f"Dashboard shelf {name} failed: {e}")
+            message = {'shelf': name, 'error': 'Could not load this shelf'}
+        return json.dumps(message, cls=DjangoJSONEncoder) + '\n'
+
+    def stream(self):
+        """One NDJSON line per shelf, in the order the shelves finish"""
+        started = time.monotonic()
+        pending = {self._fetch(name): name for name in self.shelves}
+        try:
+            while pending:
+                # Gemini gets as long as on its own endpoint before local picks are served
+                timeout = None
+                if 'ai_recommendations' in pending.values():
+                    timeout = max(0, started + settings.GEMINI_HEDGE_SECONDS - time.monotonic())
+                done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                if not done:
+                    done = [future for future, name in pending.items() if name == 'ai_recommendations']
+                for future in done:
+                    yield self._line(pending.pop(future), future)
+        finally:
+            # A late Gemini call finishes in the background
+            self.executor.shutdown(wait=False)
@@ -1,17 +1,27 @@
 import requests
 import json
+import logging
 from django.conf import settings
 from typing import List, Dict, Optional
 from .tmdb_service import TMDBService
 from .tmdb_tv_service import TMDBTVService
+from .prompt_context import MOOD_GENRES, encode_library_context
+from core.metrics import InstrumentedSession, record_upstream_error
+
+logger = logging.getLogger(__name__)
+
+gemini_session = InstrumentedSession('gemini')
+
+REQUEST_TIMEOUT = 30  # seconds, unless a caller waits less (see local_recommender.hedged)
 
 
 class GeminiService:
     """Service for AI-powered movie recommendations using Google Gemini API"""
     
-    def __init__(self):
+    def __init__(self, timeout=REQUEST_TIMEOUT):
+        self.timeout = timeout
         self.api_key = settings.GOOGLE_GEMINI_API_KEY
-        self.base_url = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent"
+        self.base_url = settings.GEMINI_API_URL
         self.tmdb_service = TMDBService()
         self.tmdb_tv_service = TMDBTVService()
     
@@ -34,11 +44,11 @@ class GeminiService:
         }
         
         try:
-            response = requests.post(
+            response = gemini_session.post(
                 f"{self.base_url}?key={self.api_key}",
                 headers=headers,
                 json=data,
-                timeout=30  # Add timeout to prevent hanging
+                timeout=self.timeout  # Add timeout to prevent hanging
             )
             response.raise_for_status()
             
@@ -48,7 +58,7 @@ class GeminiService:
             return None
             
         except requests.exceptions.RequestException as e:
-            print(f"Gemini API error: {e}")
+            logger.error(f"Gemini API error: {e}")
             
             # Handle specific error types
             if hasattr(e, 'response') and e.response is not None:
@@ -66,6 +76,11 @@ class GeminiService:
     
     def get_personalized_recommendations(self, user_preferences: Dict = None, library_context: List[Dict] = None, negative_feedback_context: List[int] = None) -> List[Dict]:
         """Get personalized movie recommendations based on user preferences and library context"""
+        picks = self.personalized_picks(user_preferences, library_context, negative_feedback_context)
+        return self.enrich_picks(picks, 'AI recommended')
+    
+    def personalized_picks(self, user_preferences: Dict = None, library_context: List[Dict] = None, negative_feedback_context: List[int] = None) -> List[Dict]:
+        """Gemini's picks for ``get_personalized_recommendations``: title, year and reason, without TMDB details"""
         if user_preferences is None:
             user_preferences = {}
         
@@ -76,8 +91,8 @@ class GeminiService:
         # Build library context string
         library_context_str = ""
         if library_context and len(library_context) > 0:
-            library_titles = [f"'{movie['title']} ({movie.get('year', 'N/A')})'" for movie in library_context[:50]]  # Limit to avoid token limits
-            library_context_str = f"\n\nIMPORTANT: The user has access to these movies in their personal library: {', '.join(library_titles)}. Try to recommend movies that complement this collection or fill gaps in similar genres/themes, but avoid recommending movies they already have."
+            library_titles = encode_library_context(library_context, genres=genres)
+            library_context_str = f"\n\nIMPORTANT: The user has access to these movies in their personal library: {library_titles}. Try to recommend movies that complement this collection or fill gaps in similar genres/themes, but avoid recommending movies they already have."
         
         # Build negative feedback context string
         negative_feedback_str = ""
@@ -102,39 +117,15 @@ class GeminiService:
         Only return the JSON, no additional text.
         """
         
-        response = self._make_request(prompt)
-        if not response:
-            return []
-        
-        try:
-            # Clean the response - remove markdown code blocks if present
-            clean_response = response.strip()
-            if clean_response.startswith('```json'):
-                clean_response = clean_response[7:]  # Remove ```json
-            if clean_response.endswith('```'):
-                clean_response = clean_response[:-3]  # Remove ```
-            clean_response = clean_response.strip()
-            
-            # Parse the JSON response
-            data = json.loads(clean_response)
-            recommendations = data.get('recommendations', [])
-            
-            # Enhance recommendations with TMDB data
-            enhanced_recommendations = []
-            for rec in recommendations:
-                movie_data = self._search_movie_on_tmdb(rec['title'], rec.get('year'))
-                if movie_data:
-                    movie_data['ai_reason'] = rec.get('reason', 'AI recommended')
-                    enhanced_recommendations.append(movie_data)
-            
-            return enhanced_recommendations
-            
-        except json.JSONDecodeError:
-            print("Failed to parse Gemini API response as JSON")
-            return []
+        return self._parse_picks(self._make_request(prompt))
     
     def get_mood_based_recommendations(self, mood: str, library_context: List[Dict] = None, negative_feedback_context: List[int] = None) -> List[Dict]:
         """Get movie recommendations based on user's mood and library context"""
+        picks = self.mood_picks(mood, library_context, negative_feedback_context)
+        return self.enrich_picks(picks, f'Perfect for {mood} mood')
+    
+    def mood_picks(self, mood: str, library_context: List[Dict] = None, negative_feedback_context: List[int] = None) -> List[Dict]:
+        """Gemini's picks for ``get_mood_based_recommendations``: title, year and reason, without TMDB details"""
         mood_prompts = {
             'happy': 'uplifting, feel-good movies that will make me smile',
             'sad': 'emotionally healing movies that are comforting',
@@ -151,8 +142,8 @@ class GeminiService:
         # Build library context string
         library_context_str = ""
         if library_context and len(library_context) > 0:
-            library_titles = [f"'{movie['title']} ({movie.get('year', 'N/A')})'" for movie in library_context[:50]]
-            library_context_str = f"\n\nIMPORTANT: The user has access to these movies in their personal library: {', '.join(library_titles)}. Try to recommend movies that complement this collection but avoid duplicating movies they already have."
+            library_titles = encode_library_context(library_context, genres=MOOD_GENRES.get(mood.lower()))
+            library_context_str = f"\n\nIMPORTANT: The user has access to these movies in their personal library: {library_titles}. Try to recommend movies that complement this collection but avoid duplicating movies they already have."
         
         # Build negative feedback context string
         negative_feedback_str = ""
@@ -176,42 +167,20 @@ class GeminiService:
         Only return the JSON, no additional text.
         """
         
-        response = self._make_request(prompt)
-        if not response:
-            return []
-        
-        try:
-            # Clean the response - remove markdown code blocks if present
-            clean_response = response.strip()
-            if clean_response.startswith('```json'):
-                clean_response = clean_response[7:]  # Remove ```json
-            if clean_response.endswith('```'):
-                clean_response = clean_response[:-3]  # Remove ```
-            clean_response = clean_response.strip()
-            
-            data = json.loads(clean_response)
-            recommendations = data.get('recommendations', [])
-            
-            enhanced_recommendations = []
-            for rec in recommendations:
-                movie_data = self._search_movie_on_tmdb(rec['title'], rec.get('year'))
-                if movie_data:
-                    movie_data['ai_reason'] = rec.get('reason', f'Perfect for {mood} mood')
-                    enhanced_recommendations.append(movie_data)
-            
-            return enhanced_recommendations
-            
-        except json.JSONDecodeError:
-            print("Failed to parse Gemini API response as JSON")
-            return []
+        return self._parse_picks(self._make_request(prompt))
     
     def get_similar_movies(self, movie_title: str, library_context: List[Dict] = None, negative_feedback_context: List[int] = None) -> List[Dict]:
         """Get movies similar to a given movie, considering library context"""
+        picks = self.similar_picks(movie_title, library_context, negative_feedback_context)
+        return self.enrich_picks(picks, f'Similar to {movie_title}')
+    
+    def similar_picks(self, movie_title: str, library_context: List[Dict] = None, negative_feedback_context: List[int] = None) -> List[Dict]:
+        """Gemini's picks for ``get_similar_movies``: title, year and reason, without TMDB details"""
         # Build library context string
         library_context_str = ""
         if library_context and len(library_context) > 0:
-            library_titles = [f"'{movie['title']} ({movie.get('year', 'N/A')})'" for movie in library_context[:50]]
-            library_context_str = f"\n\nNote: The user has these movies in their library: {', '.join(library_titles)}. Avoid recommending movies they already have, but consider their collection when suggesting similar films."
+            library_titles = encode_library_context(library_context)
+            library_context_str = f"\n\nNote: The user has these movies in their library: {library_titles}. Avoid recommending movies they already have, but consider their collection when suggesting similar films."
         
         # Build negative feedback context string
         negative_feedback_str = ""
@@ -236,7 +205,10 @@ class GeminiService:
         Only return the JSON, no additional text.
         """
         
-        response = self._make_request(prompt)
+        return self._parse_picks(self._make_request(prompt))
+    
+    def _parse_picks(self, response: Optional[str]) -> List[Dict]:
+        """The recommendations of a Gemini JSON answer, or [] if there is none"""
         if not response:
             return []
         
@@ -250,21 +222,24 @@ class GeminiService:
             clean_response = clean_response.strip()
             
             data = json.loads(clean_response)
-            recommendations = data.get('recommendations', [])
-            
-            enhanced_recommendations = []
-            for rec in recommendations:
-                movie_data = self._search_movie_on_tmdb(rec['title'], rec.get('year'))
-                if movie_data:
-                    movie_data['ai_reason'] = rec.get('reason', f'Similar to {movie_title}')
-                    enhanced_recommendations.append(movie_data)
-            
-            return enhanced_recommendations
+            return [rec for rec in data.get('recommendations', []) if rec.get('title')]
             
         except json.JSONDecodeError:
-            print("Failed to parse Gemini API response as JSON")
+            logger.error("Failed to parse Gemini API response as JSON")
+            record_upstream_error('gemini', 'invalid_json')
             return []
     
+    def enrich_picks(self, picks: List[Dict], default_reason: str) -> List[Dict]:
+        """TMDB details of each pick found on TMDB, with Gemini's reason as ``ai_reason``"""
+        enhanced_recommendations = []
+        for rec in picks:
+            movie_data = self._search_movie_on_tmdb(rec['title'], rec.get('year'))
+            if movie_data:
+                movie_data['ai_reason'] = rec.get('reason', default_reason)
+                enhanced_recommendations.append(movie_data)
+        
+        return enhanced_recommendations
+    
     def _search_movie_on_tmdb(self, title: str, year: int = None) -> Optional[Dict]:
         """Search for a movie on TMDB and return detailed information"""
         try:
@@ -292,7 +267,8 @@ class GeminiService:
             return detailed_movie or best_match
             
         except Exception as e:
-            print(f"Error searching movie on TMDB: {e}")
+            logger.warning(f"Error searching movie on TMDB: {e}")
+            record_upstream_error('tmdb', 'search_failed')
             return None
     
     def get_tv_mood_based_recommendations(self, mood: str) -> List[Dict]:
@@ -353,7 +329,8 @@ class GeminiService:
             return enhanced_recommendations
             
         except json.JSONDecodeError:
-            print("Failed to parse Gemini API response as JSON")
+            logger.error("Failed to parse Gemini API response as JSON")
+            record_upstream_error('gemini', 'invalid_json')
             return []
     
     def get_personalized_tv_recommendations(self, user_preferences: Dict = None) -> List[Dict]:
@@ -410,7 +387,8 @@ class GeminiService:
             return enhanced_recommendations
             
         except json.JSONDecodeError:
-            print("Failed to parse Gemini API response as JSON")
+            logger.error("Failed to parse Gemini API response as JSON")
+            record_upstream_error('gemini', 'invalid_json')
             return []
     
     def get_similar_tv_shows(self, tv_show_title: str) -> List[Dict]:
@@ -459,7 +437,8 @@ class GeminiService:
             return enhanced_recommendations
             
         except json.JSONDecodeError:
-            print("Failed to parse Gemini API response as JSON")
+            logger.error("Failed to parse Gemini API response as JSON")
+            record_upstream_error('gemini', 'invalid_json')
             return []
     
     def _search_tv_show_on_tmdb(self, title: str, year: int = None) -> Optional[Dict]:
@@ -488,5 +467,6 @@ class GeminiService:
             return detailed_tv_show or best_match
             
         except Exception as e:
-            print(f"Error searching TV show on TMDB: {e}")
+            logger.warning(f"Error searching TV show on TMDB: {e}")
+            record_upstream_error('tmdb', 'search_failed')
             return None
\ No newline at end of file
@@ -0,0 +1,204 @@
+"""
+Local movie recommendations for when Gemini is unavailable or slow
+
+Recommendations come from TMDB discover listings for the genres that fit the
+request, cached for a few hours, ranked by rating and by how many of the
+wanted genres they share, with the user's library, ratings and "not
+interested" titles excluded. ``hedged`` serves these whenever Gemini hasn't
+answered within a deadline.
+"""
+import logging
+import math
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core import timing
+from core.metrics import cache_get
+
+from .models import UserRating
+from .prompt_context import MOOD_GENRES
+from .tmdb_service import TMDBService
+
+logger = logging.getLogger(__name__)
+
+DISCOVER_CACHE_TIMEOUT = 6 * 60 * 60
+
+# TMDB's movie genre IDs, which are stable
+TMDB_MOVIE_GENRES = {
+    'action': 28,
+    'adventure': 12,
+    'animation': 16,
+    'comedy': 35,
+    'crime': 80,
+    'documentary': 99,
+    'drama': 18,
+    'family': 10751,
+    'fantasy': 14,
+    'history': 36,
+    'horror': 27,
+    'music': 10402,
+    'mystery': 9648,
+    'romance': 10749,
+    'science fiction': 878,
+    'sci-fi': 878,
+    'thriller': 53,
+    'war': 10752,
+    'western': 37,
+}
+
+# Release years that suit a mood better than the genre does
+MOOD_YEARS = {
+    'nostalgic': (1970, 1999),
+}
+
+
+def hedged(primary, fallback, deadline=None):
+    """
+    Return ``(results, source)`` from ``primary`` if it answers within ``deadline``.
+
+    Otherwise, or if it fails or returns nothing, ``fallback`` is served
+    instead and ``primary`` is left to finish in the background. ``primary``
+    should be the Gemini request alone, with the deadline as its timeout
+    (``GeminiService(timeout=...)``): work on its answer, like TMDB lookups,
+    belongs after the race so a late answer costs nothing more.
+    """
+    if deadline is None:
+        deadline = settings.GEMINI_HEDGE_SECONDS
+
+    executor = ThreadPoolExecutor(max_workers=1)
+    future = executor.submit(timing.propagate(primary))
+    try:
+        results = future.result(timeout=deadline)
+        if results:
+            return results, 'gemini'
+    except TimeoutError:
+        logger.info(f"Gemini did not answer within {deadline}s, serving local recommendations")
+    except Exception as e:
+        logger.warning(f"Gemini recommendations failed, serving local recommendations: {e}")
+    finally:
+        executor.shutdown(wait=False)
+
+    return fallback(), 'local'
+
+
+class LocalRecommender:
+    """Personalized, mood and similar-movie recommendations without Gemini"""
+
+    def __init__(self, tmdb_service=None):
+        self.tmdb_service = tmdb_service or TMDBService()
+
+    def _discover(self, genre_ids, years=None):
+        """Popular, well-rated movies with any of ``genre_ids``, cached"""
+        genre_key = '|'.join(str(genre_id) for genre_id in sorted(genre_ids))
+        cache_key = f"local-recs:discover:{genre_key}:{years}"
+        movies = cache_get('tmdb_discover', cache_key)
+        if movies is not None:
+            return movies
+
+        params = {
+            'sort_by': 'popularity.desc',
+            'vote_count.gte': 200,
+        }
+        if genre_ids:
+            params['with_genres'] = genre_key
+        if years:
+            params['primary_release_date.gte'] = f"{years[0]}-01-01"
+            params['primary_release_date.lte'] = f"{years[1]}-12-31"
+
+        movies = []
+        for page in (1, 2):
+            results = self.tmdb_service.discover_movies(params, page=page)['results']
+            if not results:
+                break
+            movies.extend(results)
+
+        if movies:
+            cache.set(cache_key, movies, DISCOVER_CACHE_TIMEOUT)
+        return movies
+
+    def _excluded_ids(self, user, library_context, negative_feedback):
+        excluded = set(negative_feedback or [])
+        excluded.update(item['tmdb_id'] for item in library_context or [] if item.get('tmdb_id'))
+        if user is not None and user.is_authenticated:
+            excluded.update(
+                UserRating.objects.filter(user=user).values_list('movie__tmdb_id', flat=True)
+            )
+        return excluded
+
+    def _favourite_genre_ids(self, user):
+        """Genres of the movies the user rated highly"""
+        if user is None or not user.is_authenticated:
+            return set()
+        return set(
+            UserRating.objects.filter(user=user, rating__gte=7, movie__genres__tmdb_id__isnull=False)
+            .values_list('movie__genres__tmdb_id', flat=True)
+        )
+
+    def _rank(self, candidates, genre_ids, excluded, limit, reason):
+        """Best candidates first: shared genres, then rating weighted by vote count"""
+        def score(movie):
+            overlap = len(genre_ids & set(movie.get('genre_ids') or []))
+            rating = float(movie.get('vote_average') or 0) * math.log10((movie.get('vote_count') or 0) + 10)
+            return overlap * 10 + rating
+
+        seen = set()
+        recommendations = []
+        for movie in sorted(candidates, key=score, reverse=True):
+            tmdb_id = movie.get('id')
+            if not tmdb_id or tmdb_id in excluded or tmdb_id in seen:
+                continue
+            seen.add(tmdb_id)
+            recommendations.append(dict(movie, ai_reason=reason))
+            if len(recommendations) >= limit:
+                break
+        return recommendations
+
+    def personalized(self, user, preferences=None, library_context=None, negative_feedback=None, limit=10):
+        preferences = preferences or {}
+        genre_ids = {
+            TMDB_MOVIE_GENRES[genre.strip().lower()]
+            for genre in preferences.get('genres', [])
+            if genre.strip().lower() in TMDB_MOVIE_GENRES
+        }
+        genre_ids |= self._favourite_genre_ids(user)
+
+        years = None
+        year_range = preferences.get('year_range', '')
+        try:
+            start, end = (int(year) for year in year_range.split('-'))
+            years = (start, end)
+        except ValueError:
+            pass
+
+        candidates = self._discover(genre_ids, years)
+        excluded = self._excluded_ids(user, library_context, negative_feedback)
+        return self._rank(candidates, genre_ids, excluded, limit, 'Popular with viewers who like these genres')
+
+    def mood(self, mood, user=None, library_context=None, negative_feedback=None, limit=8):
+        mood = mood.lower()
+        genre_ids = {TMDB_MOVIE_GENRES[genre] for genre in MOOD_GENRES.get(mood, [])}
+        candidates = self._discover(genre_ids, MOOD_YEARS.get(mood))
+        excluded = self._excluded_ids(user, library_context, negative_feedback)
+        return self._rank(candidates, genre_ids, excluded, limit, f'Popular pick for a {mood} mood')
+
+    def similar(self, movie_title, user=None, library_context=None, negative_feedback=None, limit=6):
+        search_results = self.tmdb_service.search_movies(movie_title).get('results', [])
+        if not search_results:
+            return []
+        seed = search_results[0]
+
+        cache_key = f"local-recs:similar:{seed['id']}"
+        candidates = cache_get('tmdb_similar', cache_key)
+        if candidates is None:
+            candidates = self.tmdb_service.get_movie_recommendations(seed['id'])['results']
+            if not candidates:
+                candidates = self._discover(set(seed.get('genre_ids') or []))
+            if candidates:
+                cache.set(cache_key, candidates, DISCOVER_CACHE_TIMEOUT)
+
+        excluded = self._excluded_ids(user, library_context, negative_feedback)
+        excluded.add(seed['id'])
+        genre_ids = set(seed.get('genre_ids') or [])
+        return self._rank(candidates, genre_ids, excluded, limit, f'Similar to {seed.get("title", movie_title)}')
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.7 on 2026-10-19 03:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0008_movie_mpaa_rating'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['-popularity', '-vote_average'], name='movie_popularity_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movierecommendation',
+            index=models.Index(fields=['user', '-score', '-created_at'], name='movierec_user_score_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userrating',
+            index=models.Index(fields=['user', '-created_at'], name='userrating_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userrating',
+            index=models.Index(fields=['user', 'rating', 'movie'], name='userrating_user_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userwatchlist',
+            index=models.Index(fields=['user', '-added_at', 'movie'], name='watchlist_user_added_idx'),
+        ),
+        # Genre -> titles lookups on the auto-created M2M table; the default
+        # single-column genre_id index still has to visit the heap for movie_id
+        migrations.RunSQL(
+            sql='CREATE INDEX movie_genres_genre_movie_idx ON movies_movie_genres (genre_id, movie_id)',
+            reverse_sql='DROP INDEX movie_genres_genre_movie_idx',
+        ),
+    ]
@@ -41,6 +41,9 @@ class Movie(models.Model):
     
     class Meta:
         ordering = ['-popularity', '-vote_average']
+        indexes = [
+            models.Index(fields=['-popularity', '-vote_average'], name='movie_popularity_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} ({self.release_date.year if self.release_date else 'Unknown'})"
@@ -54,6 +57,11 @@ class UserRating(models.Model):
     
     class Meta:
         unique_together = ['user', 'movie']
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='userrating_user_created_idx'),
+            # Covers "movies this user rated highly" without touching the table
+            models.Index(fields=['user', 'rating', 'movie'], name='userrating_user_rating_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.movie.title}: {self.rating}/10"
@@ -66,6 +74,9 @@ class UserWatchlist(models.Model):
     
     class Meta:
         unique_together = ['user', 'movie']
+        indexes = [
+            models.Index(fields=['user', '-added_at', 'movie'], name='watchlist_user_added_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.movie.title}"
@@ -81,6 +92,9 @@ class MovieRecommendation(models.Model):
     class Meta:
         unique_together = ['user', 'movie']
         ordering = ['-score', '-created_at']
+        indexes = [
+            models.Index(fields=['user', '-score', '-created_at'], name='movierec_user_score_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.movie.title}: {self.score}"
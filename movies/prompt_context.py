@@ -0,0 +1,109 @@
+"""
+Library context for Gemini prompts
+
+Rather than inlining the first 50 library titles, the library is ranked by
+relevance to the request (genre overlap, how recently it was added, rating)
+and encoded compactly until a token budget is spent. Encoded blocks are
+cached by the library's content and the request genres, so repeated prompts
+for an unchanged library skip the ranking.
+"""
+import hashlib
+import math
+
+from django.core.cache import cache
+
+from core.metrics import cache_get
+
+LIBRARY_CONTEXT_TOKEN_BUDGET = 300
+CONTEXT_CACHE_TIMEOUT = 60 * 60
+
+# Genres that suit each mood offered by the mood recommendations
+MOOD_GENRES = {
+    'happy': ['comedy', 'family', 'animation'],
+    'sad': ['drama'],
+    'excited': ['action', 'thriller'],
+    'relaxed': ['comedy', 'family', 'documentary'],
+    'romantic': ['romance'],
+    'adventurous': ['adventure', 'fantasy', 'science fiction'],
+    'thoughtful': ['drama', 'mystery', 'documentary'],
+    'nostalgic': [],
+}
+
+
+def estimate_tokens(text):
+    """Rough token count; Gemini averages about four characters per token for English"""
+    return math.ceil(len(text) / 4)
+
+
+def _genre_set(genres):
+    return {genre.lower() for genre in genres or [] if genre}
+
+
+def rank_library_items(items, genres=None):
+    """
+    Order library items by relevance to a request for ``genres``.
+
+    Genre overlap counts double, then recency and rating break ties. Library
+    listings arrive newest first, so position stands in for recency.
+    """
+    wanted = _genre_set(genres)
+    count = len(items)
+
+    def score(position_item):
+        position, item = position_item
+        overlap = 0.0
+        if wanted:
+            overlap = len(wanted & _genre_set(item.get('genres'))) / len(wanted)
+        recency = 1 - position / count
+        rating = float(item.get('rating') or item.get('vote_average') or 0) / 10
+        return 2 * overlap + recency + rating
+
+    ranked = sorted(enumerate(items), key=score, reverse=True)
+    return [item for _, item in ranked]
+
+
+def _encode_item(item):
+    title = (item.get('title') or '').strip()
+    year = item.get('year')
+    return f"{title} ({year})" if year else title
+
+
+def encode_library_context(items, genres=None, budget=LIBRARY_CONTEXT_TOKEN_BUDGET):
+    """
+    Compact ``Title (Year); ...`` listing of the most relevant items within ``budget`` tokens.
+
+    Titles that don't fit are summarized as a count, so the model still knows
+    the library is larger than what it sees.
+    """
+    if not items:
+        return ''
+
+    digest = hashlib.sha256()
+    for item in items:
+        digest.update(f"{item.get('tmdb_id')}|{item.get('title')}|{item.get('year')}\n".encode('utf-8'))
+    digest.update(f"{sorted(_genre_set(genres))}|{budget}".encode('utf-8'))
+    cache_key = f"prompt-library:{digest.hexdigest()}"
+
+    encoded = cache_get('prompt_library', cache_key)
+    if encoded is not None:
+        return encoded
+
+    entries = []
+    used = 0
+    for item in rank_library_items(items, genres):
+        entry = _encode_item(item)
+        if not entry:
+            continue
+        cost = estimate_tokens(entry) + 1  # separator
+        if used + cost > budget:
+            break
+        entries.append(entry)
+        used += cost
+
+    encoded = '; '.join(entries)
+    remaining = len(items) - len(entries)
+    if remaining > 0:
+        encoded += f"; and {remaining} more"
+
+    cache.set(cache_key, encoded, CONTEXT_CACHE_TIMEOUT)
+    return encoded
@@ -20,7 +20,7 @@ class MovieSerializer(serializers.ModelSerializer):
             'id', 'title', 'original_title', 'overview', 'release_date',
             'runtime', 'budget', 'revenue', 'tmdb_id', 'imdb_id',
             'poster_path', 'backdrop_path', 'vote_average', 'vote_count',
-            'popularity', 'genres', 'available_on_jellyfin', 'available_on_plex',
+            'popularity', 'genres',
             'requested_on_radarr', 'created_at', 'updated_at'
         ]
 
@@ -1,16 +1,19 @@
 import requests
 from django.conf import settings
 from django.contrib.auth.models import User
-from django.db.models import Q, Avg
+from django.db import transaction
+from django.db.models import Q, Avg, Count, F, FloatField, Window
+from django.db.models.functions import Cast, RowNumber
 from tmdbv3api import TMDb, Movie as TMDbMovie, Genre as TMDbGenre
 from .models import Movie, UserRating, MovieRecommendation
 from core.models import Genre
+from core.user_state import bump_user_version
 from integrations.services import JellyfinService, PlexService, RadarrService, SonarrService
 from .gemini_service import GeminiService
 
 
 class MovieService:
-    def __init__(self):
+    def __init__(self, radarr_service=None):
         self.tmdb = TMDb()
         self.tmdb.api_key = settings.TMDB_API_KEY
         self.tmdb_movie = TMDbMovie()
@@ -18,7 +21,7 @@ class MovieService:
         
         self.jellyfin_service = JellyfinService()
         self.plex_service = PlexService()
-        self.radarr_service = RadarrService()
+        self.radarr_service = radarr_service or RadarrService()
     
     def sync_genres_from_tmdb(self):
         try:
@@ -175,8 +178,8 @@ class MovieService:
 
 
 class TVShowService:
-    def __init__(self):
-        self.sonarr_service = SonarrService()
+    def __init__(self, sonarr_service=None):
+        self.sonarr_service = sonarr_service or SonarrService()
     
     def request_tv_show_on_sonarr(self, tv_show_data, quality_profile_id=None, selected_seasons=None):
         """Request a TV show on Sonarr using TMDB data"""
@@ -197,6 +200,9 @@ class TVShowService:
 
 
 class RecommendationService:
+    # Upper bound on stored recommendations per user; regeneration replaces the whole set
+    MAX_RECOMMENDATIONS_PER_USER = 50
+    
     def __init__(self):
         self.movie_service = MovieService()
         self.gemini_service = GeminiService()
@@ -239,7 +245,7 @@ class RecommendationService:
             collaborative_recommendations.extend(ai_recommendations)
         
         # Remove duplicates and movies user has already rated
-        rated_movie_ids = user_ratings.values_list('movie_id', flat=True)
+        rated_movie_ids = set(user_ratings.values_list('movie_id', flat=True))
         recommendations = []
         seen_ids = set()
         
@@ -254,12 +260,14 @@ class RecommendationService:
                                           [r[1] for r in recommendations])
     
     def _get_preferred_genres(self, high_rated_movies):
-        genre_counts = {}
-        for rating in high_rated_movies:
-            for genre in rating.movie.genres.all():
-                genre_counts[genre] = genre_counts.get(genre, 0) + 1
+        # Count the high ratings per genre in the database instead of walking each movie's genres
+        genres = Genre.objects.filter(
+            movie__userrating__in=high_rated_movies
+        ).annotate(
+            rating_count=Count('movie__userrating')
+        ).order_by('-rating_count', 'id')[:3]
         
-        return sorted(genre_counts.items(), key=lambda x: x[1], reverse=True)[:3]
+        return [(genre, genre.rating_count) for genre in genres]
     
     def _get_collaborative_recommendations(self, user, preferred_genres):
         recommendations = []
@@ -268,13 +276,16 @@ class RecommendationService:
         user_ratings = UserRating.objects.filter(user=user)
         user_movie_ratings = {r.movie_id: r.rating for r in user_ratings}
         
-        similar_users = []
-        all_users = User.objects.exclude(id=user.id)
+        # Similarity only looks at commonly rated movies, so fetch just those ratings for all users at once
+        other_ratings_by_user = {}
+        common_ratings = UserRating.objects.filter(
+            movie_id__in=user_movie_ratings.keys()
+        ).exclude(user=user).values_list('user_id', 'movie_id', 'rating')
+        for other_user_id, movie_id, rating in common_ratings:
+            other_ratings_by_user.setdefault(other_user_id, {})[movie_id] = rating
         
-        for other_user in all_users:
-            other_ratings = UserRating.objects.filter(user=other_user)
-            other_movie_ratings = {r.movie_id: r.rating for r in other_ratings}
-            
+        similar_users = []
+        for other_user_id, other_movie_ratings in other_ratings_by_user.items():
             # Calculate similarity (simplified Pearson correlation)
             common_movies = set(user_movie_ratings.keys()) & set(other_movie_ratings.keys())
             if len(common_movies) >= 3:
@@ -282,25 +293,45 @@ class RecommendationService:
                     user_movie_ratings, other_movie_ratings, common_movies
                 )
                 if similarity > 0.5:
-                    similar_users.append((other_user, similarity))
+                    similar_users.append((other_user_id, similarity))
         
         # Get recommendations from similar users
         similar_users.sort(key=lambda x: x[1], reverse=True)
-        for similar_user, similarity in similar_users[:5]:
-            high_rated_by_similar = UserRating.objects.filter(
-                user=similar_user, rating__gte=8
-            ).exclude(movie_id__in=user_movie_ratings.keys())
-            
-            for rating in high_rated_by_similar:
+        similar_users = similar_users[:5]
+        high_rated_by_similar = UserRating.objects.filter(
+            user_id__in=[user_id for user_id, _ in similar_users], rating__gte=8
+        ).exclude(movie_id__in=user_movie_ratings.keys()).select_related('movie')
+        
+        ratings_by_similar_user = {}
+        for rating in high_rated_by_similar:
+            ratings_by_similar_user.setdefault(rating.user_id, []).append(rating)
+        
+        for similar_user_id, similarity in similar_users:
+            for rating in ratings_by_similar_user.get(similar_user_id, []):
                 recommendations.append((
                     rating.movie,
                     f"Recommended by similar user (similarity: {similarity:.2f})"
                 ))
         
-        # Add movies from preferred genres
+        # Add movies from preferred genres: top 5 per genre in a single query
+        genre_names = {genre.id: genre.name for genre, count in preferred_genres}
+        genre_movies = Movie.genres.through.objects.filter(
+            genre_id__in=genre_names.keys()
+        ).annotate(
+            rank=Window(
+                expression=RowNumber(),
+                partition_by=F('genre_id'),
+                # Ordering on a float cast: Django wraps decimal window orderings in an invalid CAST on SQLite
+                order_by=Cast('movie__vote_average', FloatField()).desc(),
+            )
+        ).filter(rank__lte=5).select_related('movie').order_by('genre_id', 'rank')
+        
+        movies_by_genre = {}
+        for genre_movie in genre_movies:
+            movies_by_genre.setdefault(genre_movie.genre_id, []).append(genre_movie.movie)
+        
         for genre, count in preferred_genres:
-            genre_movies = Movie.objects.filter(genres=genre).order_by('-vote_average')[:5]
-            for movie in genre_movies:
+            for movie in movies_by_genre.get(genre.id, []):
                 if movie.id not in user_movie_ratings:
                     recommendations.append((movie, f"Based on your interest in {genre.name}"))
         
@@ -348,10 +379,22 @@ class RecommendationService:
             )
             
             # Convert Gemini recommendations to the format expected by collaborative filtering
+            titles = [rec['title'] for rec in gemini_recommendations if rec.get('title')]
+            if not titles:
+                return []
+            
+            # Look up every suggested title in one query, then match them up in default ordering
+            title_filter = Q()
+            for title in titles:
+                title_filter |= Q(title__icontains=title)
+            candidates = list(Movie.objects.filter(title_filter))
+            
             recommendations = []
             for rec in gemini_recommendations:
-                # Try to find the movie in our database
-                movie = Movie.objects.filter(title__icontains=rec['title']).first()
+                if not rec.get('title'):
+                    continue
+                needle = rec['title'].lower()
+                movie = next((m for m in candidates if needle in m.title.lower()), None)
                 if movie:
                     reason = rec.get('ai_reason', 'AI recommended based on your preferences')
                     recommendations.append((movie, reason))
@@ -362,20 +405,43 @@ class RecommendationService:
             return []
     
     def _create_recommendations(self, user, movies, reasons=None):
+        """
+        Replace the user's stored recommendations with this list.
+
+        Runs a constant number of queries: one upsert, one delete of rows that
+        are no longer recommended and one read back for serialization.
+        """
         if reasons is None:
             reasons = ["Recommended for you"] * len(movies)
         
-        recommendations = []
+        movies = list(movies)[:self.MAX_RECOMMENDATIONS_PER_USER]
+        new_recommendations = []
         for i, movie in enumerate(movies):
-            reason = reasons[i] if i < len(reasons) else "Recommended for you"
-            recommendation, created = MovieRecommendation.objects.get_or_create(
+            new_recommendations.append(MovieRecommendation(
                 user=user,
                 movie=movie,
-                defaults={
-                    'score': 85.0,  # Default score
-                    'reason': reason
-                }
+                score=85.0,  # Default score
+                reason=reasons[i] if i < len(reasons) else "Recommended for you",
+            ))
+        
+        movie_ids = [movie.id for movie in movies]
+        with transaction.atomic():
+            # Existing rows keep their created_at; score and reason are refreshed
+            MovieRecommendation.objects.bulk_create(
+                new_recommendations,
+                update_conflicts=True,
+                unique_fields=['user', 'movie'],
+                update_fields=['score', 'reason'],
             )
-            recommendations.append(recommendation)
+            MovieRecommendation.objects.filter(user=user).exclude(movie_id__in=movie_ids).delete()
+        # Bulk writes send no signals
+        bump_user_version(user.pk, 'recommendations')
         
-        return recommendations
\ No newline at end of file
+        # Upserts don't return primary keys on every backend, so read the rows back in input order
+        stored = {
+            recommendation.movie_id: recommendation
+            for recommendation in MovieRecommendation.objects.filter(
+                user=user, movie_id__in=movie_ids
+            ).select_related('movie').prefetch_related('movie__genres')
+        }
+        return [stored[movie_id] for movie_id in movie_ids if movie_id in stored]
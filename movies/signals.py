@@ -0,0 +1,12 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.user_state import bump_user_version
+from .models import UserRating
+
+
+@receiver(post_save, sender=UserRating)
+@receiver(post_delete, sender=UserRating)
+def bump_ratings_version(sender, instance, **kwargs):
+    """Recommendations are built from the user's ratings"""
+    bump_user_version(instance.user_id, 'ratings')
@@ -1,4 +1,5 @@
-from django.test import TestCase, Client
+from django.test import TestCase, Client, override_settings
+from django.db import connection
 from django.contrib.auth.models import User
 from django.urls import reverse
 from rest_framework.test import APITestCase
@@ -10,6 +11,12 @@ from datetime import date
 from .models import Movie, Genre, UserRating, UserWatchlist, MovieRecommendation
 from .services import MovieService, RecommendationService
 from .gemini_service import GeminiService
+from .local_recommender import LocalRecommender, hedged
+from .prompt_context import encode_library_context, estimate_tokens, rank_library_items
+from tv_shows.models import TVShow, TVShowRating, TVShowRecommendation, TVShowWatchlist
+from recommendations.models import UserNegativeFeedback
+from core.testing import StubUpstreamTestCase
+from integrations.services import invalidate_library
 
 
 class MovieModelTest(TestCase):
@@ -342,6 +349,99 @@ class RecommendationServiceTest(TestCase):
         self.assertGreater(len(preferred_genres), 0)
         self.assertEqual(preferred_genres[0][0], self.genre)
 
+    def _rate_many_movies(self, count):
+        genres = [self.genre] + [
+            Genre.objects.create(name=f'Genre {i}', tmdb_id=100 + i) for i in range(3)
+        ]
+        movies = Movie.objects.bulk_create([
+            Movie(title=f'Bulk Movie {i}', tmdb_id=1000 + i, vote_average=7.0)
+            for i in range(count)
+        ])
+        Movie.genres.through.objects.bulk_create([
+            Movie.genres.through(movie_id=movie.id, genre_id=genres[i % len(genres)].id)
+            for i, movie in enumerate(movies)
+        ])
+        UserRating.objects.bulk_create([
+            UserRating(user=self.user, movie=movie, rating=9) for movie in movies
+        ])
+        return movies
+
+    def test_preferred_genres_is_a_single_query(self):
+        self._rate_many_movies(50)
+        high_rated = UserRating.objects.filter(user=self.user, rating__gte=8)
+        
+        with self.assertNumQueries(1):
+            preferred_genres = self.recommendation_service._get_preferred_genres(high_rated)
+        
+        self.assertEqual(len(preferred_genres), 3)
+        self.assertEqual(preferred_genres[0][1], 13)
+
+    def test_collaborative_queries_do_not_grow_with_users(self):
+        movies = self._rate_many_movies(10)
+        for i, movie in enumerate(movies):
+            UserRating.objects.filter(user=self.user, movie=movie).update(rating=5 + i % 5)
+        for i in range(5):
+            other_user = User.objects.create_user(username=f'other{i}', password='testpass123')
+            UserRating.objects.bulk_create([
+                UserRating(user=other_user, movie=movie, rating=5 + j % 5) for j, movie in enumerate(movies)
+            ] + [UserRating(user=other_user, movie=self.movie2, rating=9)])
+        preferred_genres = [(self.genre, 3)]
+        
+        with self.assertNumQueries(4):
+            recommendations = self.recommendation_service._get_collaborative_recommendations(
+                self.user, preferred_genres
+            )
+        
+        recommended_ids = {movie.id for movie, reason in recommendations}
+        self.assertIn(self.movie2.id, recommended_ids)
+
+    def test_gemini_titles_are_matched_in_one_query(self):
+        self.recommendation_service.gemini_service = MagicMock()
+        self.recommendation_service.gemini_service.get_personalized_recommendations.return_value = [
+            {'title': 'movie 1', 'ai_reason': 'Because'},
+            {'title': 'Movie 2'},
+            {'title': 'Missing Movie'},
+        ]
+        
+        with self.assertNumQueries(1):
+            recommendations = self.recommendation_service._get_gemini_recommendations(
+                self.user, ['Movie 1']
+            )
+        
+        self.assertEqual([movie for movie, reason in recommendations], [self.movie1, self.movie2])
+        self.assertEqual(recommendations[0][1], 'Because')
+
+    def test_create_recommendations_replaces_previous_set(self):
+        first = self.recommendation_service._create_recommendations(
+            self.user, [self.movie1, self.movie2], ['First', 'Second']
+        )
+        created_at = first[0].created_at
+        
+        recommendations = self.recommendation_service._create_recommendations(
+            self.user, [self.movie1], ['Updated']
+        )
+        
+        self.assertEqual(len(recommendations), 1)
+        self.assertEqual(recommendations[0].reason, 'Updated')
+        self.assertEqual(recommendations[0].created_at, created_at)
+        self.assertFalse(MovieRecommendation.objects.filter(user=self.user, movie=self.movie2).exists())
+
+    def test_create_recommendations_query_count_is_constant(self):
+        movies = Movie.objects.bulk_create([
+            Movie(title=f'Bulk Movie {i}', tmdb_id=1000 + i) for i in range(30)
+        ])
+        self.recommendation_service._create_recommendations(self.user, movies[:5])
+        
+        with self.assertNumQueries(6):
+            recommendations = self.recommendation_service._create_recommendations(self.user, movies)
+        
+        self.assertEqual([r.movie_id for r in recommendations], [m.id for m in movies])
+
+    def test_create_recommendations_is_capped_per_user(self):
+        self.recommendation_service.MAX_RECOMMENDATIONS_PER_USER = 1
+        self.recommendation_service._create_recommendations(self.user, [self.movie1, self.movie2])
+        self.assertEqual(MovieRecommendation.objects.filter(user=self.user).count(), 1)
+
     def test_calculate_similarity(self):
         user1_ratings = {1: 8, 2: 7, 3: 9}
         user2_ratings = {1: 9, 2: 6, 3: 8}
@@ -441,3 +541,364 @@ class GeminiServiceTVTest(TestCase):
         self.assertEqual(len(result), 1)
         self.assertEqual(result[0]['title'], 'Similar Show')
         self.assertEqual(result[0]['ai_reason'], 'Similar themes')
+
+    @patch('movies.gemini_service.record_upstream_error')
+    @patch.object(GeminiService, '_make_request', return_value='Not JSON')
+    def test_unparseable_response_is_logged_and_counted(self, mock_make_request, mock_record_error):
+        with self.assertLogs('movies.gemini_service', level='ERROR'):
+            result = self.gemini_service.get_similar_tv_shows('Some Show')
+        self.assertEqual(result, [])
+        mock_record_error.assert_called_once_with('gemini', 'invalid_json')
+
+
+class QueryPlanTest(TestCase):
+    """
+    Hot catalog queries must be answered from an index, not a table scan
+    followed by a sort.
+
+    SQLite plans tables without statistics as if they held about a million
+    rows, which is the scale these checks are about. PostgreSQL would pick a
+    sequential scan for an empty test table regardless of indexes, so scans
+    and sorts are priced out instead and any that remain mean no usable
+    index exists.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.genre = Genre.objects.create(name='Action', tmdb_id=28)
+        self.hot_queries = {
+            'movie list': Movie.objects.all()[:20],
+            'tv list': TVShow.objects.all()[:20],
+            'movie recommendations': MovieRecommendation.objects.filter(user=self.user)[:20],
+            'tv recommendations': TVShowRecommendation.objects.filter(user=self.user)[:20],
+            'movie ratings': UserRating.objects.filter(user=self.user).order_by('-created_at')[:20],
+            'tv ratings': TVShowRating.objects.filter(user=self.user).order_by('-created_at')[:20],
+            'movie watchlist': UserWatchlist.objects.filter(user=self.user).order_by('-added_at')[:20],
+            'tv watchlist': TVShowWatchlist.objects.filter(user=self.user).order_by('-added_at')[:20],
+        }
+        # Lookups answered from the index alone, without visiting the table
+        self.covering_queries = {
+            'highly rated movies': UserRating.objects.filter(
+                user=self.user, rating__gte=8
+            ).values_list('movie_id', flat=True),
+            'highly rated tv': TVShowRating.objects.filter(
+                user=self.user, rating__gte=8
+            ).values_list('tv_show_id', flat=True),
+            'movies by genre': Movie.genres.through.objects.filter(
+                genre=self.genre
+            ).values_list('movie_id', flat=True),
+            'tv by genre': TVShow.genres.through.objects.filter(
+                genre=self.genre
+            ).values_list('tvshow_id', flat=True),
+        }
+
+    def _plan(self, queryset):
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+                cursor.execute('SET LOCAL enable_sort = off')
+        return queryset.explain()
+
+    def _plan_problems(self, plan):
+        problems = []
+        for line in plan.splitlines():
+            if connection.vendor == 'postgresql':
+                if 'Seq Scan' in line:
+                    problems.append(line.strip())
+                elif line.strip().startswith(('Sort', '->  Sort')):
+                    problems.append(line.strip())
+            elif connection.vendor == 'sqlite':
+                if 'SCAN' in line and 'USING' not in line:
+                    problems.append(line.strip())
+                elif 'USE TEMP B-TREE' in line:
+                    problems.append(line.strip())
+        return problems
+
+    def test_hot_queries_use_indexes(self):
+        for name, queryset in self.hot_queries.items():
+            with self.subTest(query=name):
+                plan = self._plan(queryset)
+                self.assertEqual(self._plan_problems(plan), [], f"{name}:\n{plan}")
+
+    def test_per_user_and_genre_lookups_use_covering_indexes(self):
+        marker = 'Index Only Scan' if connection.vendor == 'postgresql' else 'COVERING INDEX'
+        for name, queryset in self.covering_queries.items():
+            with self.subTest(query=name):
+                plan = self._plan(queryset)
+                self.assertIn(marker, plan, f"{name}:\n{plan}")
+                self.assertEqual(self._plan_problems(plan), [], f"{name}:\n{plan}")
+
+
+class PromptContextTest(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.library = [
+            {'title': 'Recent Drama', 'year': 2023, 'genres': ['Drama'], 'rating': 7.0},
+            {'title': 'Old Comedy', 'year': 1999, 'genres': ['Comedy'], 'rating': 6.0},
+        ] + [
+            {'title': f'Filler {i}', 'year': 2000 + i % 20, 'genres': ['Horror'], 'rating': 5.0}
+            for i in range(200)
+        ]
+
+    def test_genre_overlap_ranks_first(self):
+        ranked = rank_library_items(self.library, genres=['comedy'])
+        self.assertEqual(ranked[0]['title'], 'Old Comedy')
+        self.assertEqual(rank_library_items(self.library)[0]['title'], 'Recent Drama')
+
+    def test_encoding_stays_within_budget(self):
+        encoded = encode_library_context(self.library, genres=['Comedy'], budget=50)
+        self.assertTrue(encoded.startswith('Old Comedy (1999); Recent Drama (2023)'))
+        self.assertTrue(encoded.endswith('more'))
+        self.assertLessEqual(estimate_tokens(encoded), 60)
+
+    @patch('movies.prompt_context.rank_library_items')
+    def test_encoded_block_is_cached(self, rank):
+        rank.side_effect = lambda items, genres: items
+        encode_library_context(self.library, genres=['Drama'])
+        encode_library_context(self.library, genres=['Drama'])
+        self.assertEqual(rank.call_count, 1)
+
+
+class LocalRecommenderTest(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.tmdb_service = MagicMock()
+        self.tmdb_service.discover_movies.return_value = {'results': [
+            {'id': 1, 'title': 'Owned Comedy', 'genre_ids': [35], 'vote_average': 8, 'vote_count': 1000},
+            {'id': 2, 'title': 'Disliked Comedy', 'genre_ids': [35], 'vote_average': 8, 'vote_count': 1000},
+            {'id': 3, 'title': 'Family Comedy', 'genre_ids': [35, 10751], 'vote_average': 6, 'vote_count': 500},
+            {'id': 4, 'title': 'Comedy', 'genre_ids': [35], 'vote_average': 7, 'vote_count': 500},
+        ]}
+        self.recommender = LocalRecommender(tmdb_service=self.tmdb_service)
+
+    def test_mood_recommendations_exclude_library_and_feedback(self):
+        movies = self.recommender.mood('happy', self.user, [{'tmdb_id': 1}], [2])
+        self.assertEqual([movie['title'] for movie in movies], ['Family Comedy', 'Comedy'])
+        self.assertTrue(all(movie['ai_reason'] for movie in movies))
+
+    def test_discover_results_are_cached(self):
+        self.recommender.mood('happy')
+        calls = self.tmdb_service.discover_movies.call_count
+        self.recommender.mood('happy')
+        self.assertEqual(self.tmdb_service.discover_movies.call_count, calls)
+
+    def test_hedge_serves_local_results_when_gemini_is_slow(self):
+        def slow_gemini():
+            import time
+            time.sleep(0.5)
+            return [{'title': 'From Gemini'}]
+
+        results, source = hedged(slow_gemini, lambda: [{'title': 'Local'}], deadline=0.05)
+        self.assertEqual((results, source), ([{'title': 'Local'}], 'local'))
+
+        results, source = hedged(lambda: [{'title': 'From Gemini'}], lambda: [], deadline=1)
+        self.assertEqual(source, 'gemini')
+
+    def test_similar_recommendations_come_from_the_seed_movie(self):
+        self.tmdb_service.search_movies.return_value = {'results': [{'id': 9, 'title': 'Seed', 'genre_ids': [35]}]}
+        self.tmdb_service.get_movie_recommendations.return_value = {'results': [
+            {'id': 4, 'title': 'Comedy', 'genre_ids': [35], 'vote_average': 7, 'vote_count': 500},
+        ]}
+        movies = self.recommender.similar('Seed')
+        self.tmdb_service.get_movie_recommendations.assert_called_once_with(9)
+        self.assertEqual([movie['title'] for movie in movies], ['Comedy'])
+
+    @override_settings(GOOGLE_GEMINI_API_KEY='test-key', GEMINI_HEDGE_SECONDS=0.5)
+    def test_gemini_answer_just_before_the_deadline_is_used(self):
+        import time
+        from .views import hedged_recommendations
+
+        def gemini():
+            time.sleep(0.35)
+            return [{'title': 'Late Pick'}]
+
+        def enrich(picks):
+            # TMDB lookups run after the race, so they may end past the deadline
+            time.sleep(0.3)
+            return [dict(pick, id=1) for pick in picks]
+
+        movies, source = hedged_recommendations(gemini, lambda: [{'title': 'Local'}], enrich)
+        self.assertEqual(source, 'gemini')
+        self.assertEqual(movies, [{'title': 'Late Pick', 'id': 1}])
+
+    @override_settings(GOOGLE_GEMINI_API_KEY='test-key', GEMINI_HEDGE_SECONDS=2)
+    @patch('movies.views.LocalRecommender')
+    @patch('movies.gemini_service.gemini_session.post')
+    def test_gemini_requests_time_out_at_the_hedge_deadline(self, post, recommender):
+        post.return_value.json.return_value = {'candidates': []}
+        recommender.return_value.mood.return_value = []
+        self.client.get('/api/movies/mood_recommendations/', {'mood': 'happy'})
+        self.assertEqual(post.call_args.kwargs['timeout'], 2)
+
+    @override_settings(GOOGLE_GEMINI_API_KEY=None)
+    @patch('movies.views.LocalRecommender')
+    def test_mood_endpoint_falls_back_without_gemini(self, recommender):
+        recommender.return_value.mood.return_value = [{'id': 4, 'title': 'Comedy'}]
+        response = self.client.get('/api/movies/mood_recommendations/', {'mood': 'happy'})
+        self.assertEqual(response.json(), [{'id': 4, 'title': 'Comedy'}])
+        self.assertEqual(response['X-Recommendation-Source'], 'local')
+
+
+class HotEndpointBudgetTest(StubUpstreamTestCase):
+    """Query and upstream-call budgets; a page of 20 movies must not cost 20 of anything"""
+
+    def test_movie_list(self):
+        with self.assertBudget(queries=6, upstream={'tmdb': 1, 'radarr': 1, 'jellyfin': 1}):
+            response = self.client.get('/api/movies/')
+
+        self.assertEqual(len(response.json()['results']), 20)
+        # Radarr holds the even-numbered stub movies; they are recorded locally in one upsert
+        self.assertEqual(Movie.objects.filter(requested_on_radarr=True).count(), 10)
+
+    def test_recently_added(self):
+        # The listing is the library, so availability needs no index pass over it
+        with self.assertBudget(queries=6, upstream={'jellyfin': 1, 'radarr': 1}):
+            response = self.client.get('/api/movies/recently_added/')
+
+        movies = response.json()
+        self.assertEqual(len(movies), self.library_size)
+        self.assertTrue(all(movie['available_in_library'] for movie in movies))
+
+    def test_generate_recommendations(self):
+        genre = Genre.objects.create(name='Drama', tmdb_id=18)
+        for i in range(10):
+            movie = Movie.objects.create(title=f'Stub Movie {i}', tmdb_id=1000 + i)
+            movie.genres.add(genre)
+            if i < 5:
+                UserRating.objects.create(user=self.user, movie=movie, rating=9)
+
+        # Each Gemini pick is enriched with a TMDB search and a details call
+        with self.assertBudget(queries=17, upstream={'gemini': 1, 'tmdb': 20, 'jellyfin': 1}):
+            response = self.client.post('/api/recommendations/generate/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 5)
+
+
+class DashboardTest(StubUpstreamTestCase):
+    def _shelves(self, response):
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        return {message['shelf']: message for message in map(json.loads, lines)}
+
+    def test_streams_every_shelf_sharing_user_state(self):
+        UserNegativeFeedback.objects.create(user=self.user, tmdb_id=1001, content_type='movie')
+
+        # Settings, feedback, the Radarr catalog and the library are loaded once for all shelves;
+        # TMDB serves the eight lists plus a search and details call per Gemini pick
+        with self.assertBudget(queries=11, upstream={'tmdb': 28, 'gemini': 1, 'radarr': 1, 'jellyfin': 2}):
+            shelves = self._shelves(self.client.get('/api/dashboard/'))
+
+        self.assertEqual(set(shelves), {
+            'popular', 'top_rated', 'now_playing', 'upcoming', 'recently_added',
+            'tv_popular', 'tv_top_rated', 'tv_airing_today', 'tv_on_the_air', 'ai_recommendations',
+        })
+        popular = shelves['popular']['data']['results']
+        self.assertNotIn(1001, [movie['id'] for movie in popular])
+        self.assertTrue(popular[0]['requested_on_radarr'])
+        self.assertIn('available_in_library', popular[0])
+        self.assertEqual(len(shelves['recently_added']['data']), self.library_size - 1)
+        self.assertEqual(shelves['ai_recommendations']['source'], 'gemini')
+
+    def test_shelves_match_their_endpoints(self):
+        shelves = self._shelves(self.client.get('/api/dashboard/', {'shelves': 'top_rated,recently_added'}))
+
+        self.assertEqual(set(shelves), {'top_rated', 'recently_added'})
+        self.assertEqual(shelves['top_rated']['data'], self.client.get('/api/movies/top_rated/').json())
+        self.assertEqual(shelves['recently_added']['data'], self.client.get('/api/movies/recently_added/').json())
+
+    @override_settings(GOOGLE_GEMINI_API_KEY='')
+    def test_ai_shelf_falls_back_to_local_recommendations(self):
+        shelves = self._shelves(self.client.get('/api/dashboard/', {'shelves': 'ai_recommendations'}))
+
+        self.assertEqual(shelves['ai_recommendations']['source'], 'local')
+
+    def test_unknown_shelf(self):
+        response = self.client.get('/api/dashboard/', {'shelves': 'popular,trending'})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('trending', response.json()['error'])
+
+
+
+class ConditionalGetTest(StubUpstreamTestCase):
+    def test_unchanged_list_is_not_modified(self):
+        response = self.client.get('/api/movies/popular/')
+        self.assertIn('ETag', response)
+        self.assertIn('Last-Modified', response)
+
+        with self.assertBudget(queries=2, upstream={}):
+            response = self.client.get('/api/movies/popular/', HTTP_IF_NONE_MATCH=response['ETag'])
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_feedback_changes_the_etag(self):
+        etag = self.client.get('/api/movies/popular/')['ETag']
+        UserNegativeFeedback.objects.create(user=self.user, tmdb_id=1001, content_type='movie')
+
+        response = self.client.get('/api/movies/popular/', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertNotIn(1001, [movie['id'] for movie in response.json()['results']])
+
+    def test_etag_is_per_page_and_user(self):
+        etag = self.client.get('/api/movies/popular/')['ETag']
+
+        self.assertNotEqual(self.client.get('/api/movies/popular/', {'page': 2})['ETag'], etag)
+        self.client.logout()
+        response = self.client.get('/api/movies/popular/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_recently_added_is_not_modified(self):
+        etag = self.client.get('/api/movies/recently_added/')['ETag']
+
+        response = self.client.get('/api/movies/recently_added/', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+
+
+class PersonalizedResponseCacheTest(StubUpstreamTestCase):
+    def test_ai_recommendations_are_reused_until_ratings_change(self):
+        first = self.client.get('/api/movies/ai_recommendations/')
+
+        with self.assertBudget(upstream={}):
+            second = self.client.get('/api/movies/ai_recommendations/')
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(second['X-Recommendation-Source'], 'gemini')
+
+        UserRating.objects.create(user=self.user, movie=Movie.objects.create(title='Rated', tmdb_id=5000), rating=8)
+        with self.assertBudget(upstream={'gemini': 1, 'tmdb': 20}):
+            self.client.get('/api/movies/ai_recommendations/')
+
+    def test_recently_added_follows_library_sync(self):
+        self.client.get('/api/movies/recently_added/')
+
+        with self.assertBudget(upstream={}):
+            self.client.get('/api/movies/recently_added/')
+
+        invalidate_library(self.stubs.url('jellyfin'))
+        with self.assertBudget(upstream={'jellyfin': 1}):
+            self.client.get('/api/movies/recently_added/')
+
+    def test_recommendation_list_follows_generate(self):
+        self.assertEqual(self.client.get('/api/recommendations/').json()['results'], [])
+        MovieRecommendation.objects.create(
+            user=self.user, movie=Movie.objects.create(title='Stale', tmdb_id=5001), score=50
+        )
+        # Written behind the cache's back: still the cached response
+        self.assertEqual(self.client.get('/api/recommendations/').json()['results'], [])
+
+        genre = Genre.objects.create(name='Drama', tmdb_id=18)
+        for i in range(3):
+            movie = Movie.objects.create(title=f'Stub Movie {i}', tmdb_id=1000 + i)
+            movie.genres.add(genre)
+            UserRating.objects.create(user=self.user, movie=movie, rating=9)
+        generated = self.client.post('/api/recommendations/generate/').json()
+
+        listed = self.client.get('/api/recommendations/').json()['results']
+        self.assertEqual({item['id'] for item in listed}, {item['id'] for item in generated})
@@ -1,6 +1,34 @@
+import logging
 import requests
+from urllib.parse import urlencode
 from django.conf import settings
+from django.core.cache import cache
 from typing import Dict, List, Optional
+from core.image_cache import tmdb_image_url
+from core.metrics import InstrumentedSession, cache_get
+from core.versions import get_stamp, set_stamped
+
+logger = logging.getLogger(__name__)
+
+# Shared by every TMDB client so connections to the API are reused
+tmdb_session = InstrumentedSession('tmdb')
+
+# Movie lists: name -> (endpoint, fixed parameters). Their pages are cached
+# with a stamp, so responses built from them can be revalidated (see core.conditional)
+MOVIE_LISTS = {
+    'popular': ('movie/popular', {}),
+    'top_rated': ('movie/top_rated', {}),
+    'now_playing': ('movie/now_playing', {}),
+    'upcoming': ('movie/upcoming', {}),
+    'by_genre': ('discover/movie', {'sort_by': 'popularity.desc'}),
+}
+LIST_CACHE_TIMEOUT = 600  # seconds; TMDB updates its lists a few times a day
+GENRE_CACHE_TIMEOUT = 24 * 60 * 60
+
+
+def _list_cache_key(name, page, params):
+    endpoint, fixed = MOVIE_LISTS[name]
+    return f"tmdb:{endpoint}:{urlencode(sorted(dict(fixed, page=page, **params).items()))}"
 
 
 class TMDBService:
@@ -11,7 +39,7 @@ class TMDBService:
         self.api_key = settings.TMDB_API_KEY
         if not self.api_key:
             raise ValueError("TMDB_API_KEY environment variable is required")
-        self.base_url = "https://api.themoviedb.org/3"
+        self.base_url = settings.TMDB_API_URL
         self.image_base_url = "https://image.tmdb.org/t/p/w500"
     
     def _make_request(self, endpoint: str, params: dict = None) -> Optional[dict]:
@@ -25,72 +53,43 @@ class TMDBService:
         params['api_key'] = self.api_key
         
         try:
-            response = requests.get(f"{self.base_url}/{endpoint}", params=params)
+            response = tmdb_session.get(f"{self.base_url}/{endpoint}", params=params)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
-            print(f"TMDB API error: {e}")
+            logger.error(f"TMDB API error: {e}")
             return None
     
     def get_popular_movies(self, page: int = 1) -> dict:
         """Get popular movies from TMDB"""
-        data = self._make_request("movie/popular", {"page": page})
-        if data:
-            return {
-                'page': data.get('page', page),
-                'results': self._format_movies(data.get('results', [])),
-                'total_pages': data.get('total_pages', 1),
-                'total_results': data.get('total_results', 0)
-            }
-        return {'page': page, 'results': [], 'total_pages': 1, 'total_results': 0}
+        return self.get_movie_list('popular', page)
     
     def get_top_rated_movies(self, page: int = 1) -> dict:
         """Get top rated movies from TMDB"""
-        data = self._make_request("movie/top_rated", {"page": page})
-        if data:
-            return {
-                'page': data.get('page', page),
-                'results': self._format_movies(data.get('results', [])),
-                'total_pages': data.get('total_pages', 1),
-                'total_results': data.get('total_results', 0)
-            }
-        return {'page': page, 'results': [], 'total_pages': 1, 'total_results': 0}
+        return self.get_movie_list('top_rated', page)
     
     def get_now_playing_movies(self, page: int = 1) -> dict:
         """Get now playing movies from TMDB"""
-        data = self._make_request("movie/now_playing", {"page": page})
-        if data:
-            return {
-                'page': data.get('page', page),
-                'results': self._format_movies(data.get('results', [])),
-                'total_pages': data.get('total_pages', 1),
-                'total_results': data.get('total_results', 0)
-            }
-        return {'page': page, 'results': [], 'total_pages': 1, 'total_results': 0}
+        return self.get_movie_list('now_playing', page)
     
     def get_upcoming_movies(self, page: int = 1) -> dict:
         """Get upcoming movies from TMDB"""
-        data = self._make_request("movie/upcoming", {"page": page})
-        if data:
-            return {
-                'page': data.get('page', page),
-                'results': self._format_movies(data.get('results', [])),
-                'total_pages': data.get('total_pages', 1),
-                'total_results': data.get('total_results', 0)
-            }
-        return {'page': page, 'results': [], 'total_pages': 1, 'total_results': 0}
+        return self.get_movie_list('upcoming', page)
     
     def search_movies(self, query: str, page: int = 1) -> dict:
         """Search movies by query"""
         data = self._make_request("search/movie", {"query": query, "page": page})
-        if data:
-            return {
-                'page': data.get('page', page),
-                'results': self._format_movies(data.get('results', [])),
-                'total_pages': data.get('total_pages', 1),
-                'total_results': data.get('total_results', 0)
-            }
-        return {'page': page, 'results': [], 'total_pages': 1, 'total_results': 0}
+        return self._format_page(data, page)
+    
+    def discover_movies(self, params: dict, page: int = 1) -> dict:
+        """A page of TMDB's discover listing filtered by ``params`` (e.g. ``with_genres``), uncached"""
+        data = self._make_request("discover/movie", dict(params, page=page))
+        return self._format_page(data, page)
+    
+    def get_movie_recommendations(self, movie_id: int, page: int = 1) -> dict:
+        """A page of TMDB's recommendations for a movie, uncached"""
+        data = self._make_request(f"movie/{movie_id}/recommendations", {"page": page})
+        return self._format_page(data, page)
     
     def get_movie_details(self, movie_id: int) -> Optional[dict]:
         """Get detailed information about a specific movie"""
@@ -99,11 +98,36 @@ class TMDBService:
     
     def get_movies_by_genre(self, genre_id: int, page: int = 1) -> dict:
         """Get movies by genre ID"""
-        data = self._make_request("discover/movie", {
-            "with_genres": genre_id,
-            "page": page,
-            "sort_by": "popularity.desc"
-        })
+        return self.get_movie_list('by_genre', page, with_genres=genre_id)
+    
+    def get_movie_list(self, name: str, page: int = 1, refresh: bool = False, **params) -> dict:
+        """A page of one of ``MOVIE_LISTS``, cached for LIST_CACHE_TIMEOUT; ``refresh`` skips the cache"""
+        cache_key = _list_cache_key(name, page, params)
+        data = None if refresh else cache_get('tmdb_list', cache_key)
+        if data is None:
+            endpoint, fixed = MOVIE_LISTS[name]
+            data = self._make_request(endpoint, dict(fixed, page=page, **params))
+            if data:
+                set_stamped(cache_key, data, LIST_CACHE_TIMEOUT)
+        
+        return self._format_page(data, page)
+    
+    def movie_list_stamp(self, name: str, page: int = 1, **params) -> Optional[float]:
+        """When the page ``get_movie_list`` returns was fetched, or None if it isn't cached"""
+        return get_stamp(_list_cache_key(name, page, params))
+    
+    def get_genres(self, refresh: bool = False) -> List[dict]:
+        """Get all available movie genres, cached for GENRE_CACHE_TIMEOUT"""
+        genres = None if refresh else cache_get('tmdb_genres', 'tmdb:genre/movie/list')
+        if genres is None:
+            data = self._make_request("genre/movie/list")
+            genres = data.get('genres', []) if data else []
+            if genres:
+                cache.set('tmdb:genre/movie/list', genres, GENRE_CACHE_TIMEOUT)
+        return genres
+    
+    def _format_page(self, data: Optional[dict], page: int) -> dict:
+        """A paged listing response, or an empty page if the request failed"""
         if data:
             return {
                 'page': data.get('page', page),
@@ -113,11 +137,6 @@ class TMDBService:
             }
         return {'page': page, 'results': [], 'total_pages': 1, 'total_results': 0}
     
-    def get_genres(self) -> List[dict]:
-        """Get all available movie genres"""
-        data = self._make_request("genre/movie/list")
-        return data.get('genres', []) if data else []
-    
     def _format_movies(self, movies: List[dict]) -> List[dict]:
         """Format movie data for consistent API response"""
         return [self._format_movie(movie) for movie in movies]
@@ -135,8 +154,8 @@ class TMDBService:
             'revenue': movie.get('revenue'),
             'tmdb_id': movie.get('id'),
             'imdb_id': movie.get('imdb_id'),
-            'poster_path': f"{self.image_base_url}{movie.get('poster_path')}" if movie.get('poster_path') else None,
-            'backdrop_path': f"{self.image_base_url}{movie.get('backdrop_path')}" if movie.get('backdrop_path') else None,
+            'poster_path': tmdb_image_url(movie.get('poster_path'), 'w500'),
+            'backdrop_path': tmdb_image_url(movie.get('backdrop_path'), 'w500'),
             'vote_average': movie.get('vote_average'),
             'vote_count': movie.get('vote_count'),
             'popularity': movie.get('popularity'),
@@ -1,6 +1,11 @@
+import logging
 import requests
 from django.conf import settings
 from typing import Dict, List, Optional
+from core.image_cache import tmdb_image_url
+from .tmdb_service import tmdb_session
+
+logger = logging.getLogger(__name__)
 
 
 class TMDBTVService:
@@ -11,7 +16,7 @@ class TMDBTVService:
         self.api_key = settings.TMDB_API_KEY
         if not self.api_key:
             raise ValueError("TMDB_API_KEY environment variable is required")
-        self.base_url = "https://api.themoviedb.org/3"
+        self.base_url = settings.TMDB_API_URL
         self.image_base_url = "https://image.tmdb.org/t/p/w500"
     
     def _make_request(self, endpoint: str, params: dict = None) -> Optional[dict]:
@@ -25,11 +30,11 @@ class TMDBTVService:
         params['api_key'] = self.api_key
         
         try:
-            response = requests.get(f"{self.base_url}/{endpoint}", params=params)
+            response = tmdb_session.get(f"{self.base_url}/{endpoint}", params=params)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
-            print(f"TMDB TV API error: {e}")
+            logger.error(f"TMDB TV API error: {e}")
             return None
     
     def get_popular_tv_shows(self, page: int = 1) -> List[dict]:
@@ -95,8 +100,8 @@ class TMDBTVService:
             'status': tv_show.get('status', ''),
             'tmdb_id': tv_show.get('id'),
             'imdb_id': tv_show.get('external_ids', {}).get('imdb_id') if 'external_ids' in tv_show else None,
-            'poster_path': f"{self.image_base_url}{tv_show.get('poster_path')}" if tv_show.get('poster_path') else None,
-            'backdrop_path': f"{self.image_base_url}{tv_show.get('backdrop_path')}" if tv_show.get('backdrop_path') else None,
+            'poster_path': tmdb_image_url(tv_show.get('poster_path'), 'w500'),
+            'backdrop_path': tmdb_image_url(tv_show.get('backdrop_path'), 'w500'),
             'vote_average': tv_show.get('vote_average'),
             'vote_count': tv_show.get('vote_count'),
             'popularity': tv_show.get('popularity'),
@@ -1,3 +1,5 @@
+from django.conf import settings
+from django.http import StreamingHttpResponse
 from django.shortcuts import render
 from rest_framework import viewsets, status
 from rest_framework.decorators import action, api_view, permission_classes
@@ -9,12 +11,13 @@ from django.db.models import Q, Avg
 from django.shortcuts import get_object_or_404
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
+from django.utils.dateparse import parse_date
 import logging
+from datetime import date
 from .models import (
     Movie, UserRating, UserWatchlist, MovieRecommendation
 )
 from core.models import Genre
-from accounts.models import UserSettings
 from recommendations.models import UserNegativeFeedback
 from .serializers import (
     MovieSerializer, GenreSerializer, UserRatingSerializer,
@@ -24,39 +27,45 @@ from .services import MovieService, RecommendationService, TVShowService
 from .tmdb_service import TMDBService
 from .tmdb_tv_service import TMDBTVService
 from .gemini_service import GeminiService
-from integrations.services import JellyfinService, PlexService, RadarrService
+from .local_recommender import LocalRecommender, hedged
+from core.conditional import conditional_get
+from core.user_state import cached_response, user_version
+from integrations.registry import get_radarr_service, get_user_services
+from integrations.services import cached_library_movies, library_index_stamp, library_movies_stamp
 
 logger = logging.getLogger(__name__)
 
+# Library movies given to Gemini as context, and shown on the recently added shelf
+LIBRARY_CONTEXT_LIMIT = 100
+RECENTLY_ADDED_LIMIT = 50
 
-def get_user_library_context(user, limit=100):
+
+def get_user_library_context(user, limit=LIBRARY_CONTEXT_LIMIT):
     """Get user's media library context from their configured Plex/Jellyfin servers"""
-    try:
-        user_settings = UserSettings.objects.get(user=user)
-    except UserSettings.DoesNotExist:
+    user_services = get_user_services(user)
+    media_server = user_services.media_server()
+    if not media_server:
         return []
     
-    library_movies = []
-    
-    # Check if user has a media server configured
-    if not user_settings.server_url or not user_settings.server_api_key:
-        return []
-    
-    # Get library based on server type
-    if user_settings.server_type == 'jellyfin':
-        jellyfin_service = JellyfinService()
-        # Configure with user's settings
-        jellyfin_service.configure(user_settings.server_url, user_settings.server_api_key)
-        library_movies = jellyfin_service.get_library_movies(limit=limit)
-    
-    elif user_settings.server_type == 'plex':
-        plex_service = PlexService()
-        # Temporarily override settings for the service
-        plex_service.base_url = user_settings.server_url
-        plex_service.token = user_settings.server_api_key
-        library_movies = plex_service.get_library_movies(limit=limit)
+    return cached_library_movies(media_server, user_services.settings.server_type, limit=limit)
+
+
+def hedged_recommendations(gemini_call, local_call, enrich):
+    """
+    Gemini's recommendations if its picks arrive in time, local ones otherwise.
     
-    return library_movies
+    Only ``gemini_call`` races the deadline; the winning picks are then
+    ``enrich``ed with TMDB details, so that work is never paid for a late answer.
+    """
+    if not settings.GOOGLE_GEMINI_API_KEY:
+        return local_call(), 'local'
+    picks, source = hedged(gemini_call, local_call)
+    if source != 'gemini':
+        return picks, source
+    movies = enrich(picks)
+    if not movies:
+        return local_call(), 'local'
+    return movies, source
 
 
 def get_user_negative_feedback(user, content_type=None):
@@ -67,12 +76,28 @@ def get_user_negative_feedback(user, content_type=None):
     return list(queryset.values_list('tmdb_id', flat=True))
 
 
+def _release_date(value):
+    """A date for the Movie model from TMDB or media server data: a full date, a bare year or None"""
+    if isinstance(value, int) or (isinstance(value, str) and len(value) == 4 and value.isdigit()):
+        return date(int(value), 1, 1)
+    if not value or not isinstance(value, str):
+        return None
+    try:
+        return parse_date(value)
+    except ValueError:
+        return None
+
+
 def filter_negative_feedback(items, user, content_type):
     """Filter out items that user marked as 'not interested'"""
     if not user.is_authenticated:
         return items
     
-    negative_tmdb_ids = get_user_negative_feedback(user, content_type)
+    return exclude_tmdb_ids(items, get_user_negative_feedback(user, content_type))
+
+
+def exclude_tmdb_ids(items, negative_tmdb_ids):
+    """``items`` without those whose TMDB ID is in ``negative_tmdb_ids``"""
     if not negative_tmdb_ids:
         return items
     
@@ -86,6 +111,169 @@ def filter_negative_feedback(items, user, content_type):
     return filtered_items
 
 
+def recently_added_cards(library_movies):
+    """Library movies in movie card format, skipping those without a TMDB ID"""
+    movies = []
+    for movie in library_movies:
+        # Create a movie object that matches expected format
+        movie_data = {
+            'id': movie.get('tmdb_id'),
+            'tmdb_id': movie.get('tmdb_id'),
+            'title': movie.get('title'),
+            'overview': movie.get('overview', ''),
+            'poster_path': movie.get('poster_path'),
+            'backdrop_path': movie.get('backdrop_path', ''),
+            'release_date': movie.get('release_date') or str(movie.get('year', '')),
+            'vote_average': movie.get('vote_average', 0),
+            'vote_count': movie.get('vote_count', 0),
+            'genres': movie.get('genres', []),
+            'date_added': movie.get('date_added'),
+            'recently_added': True
+        }
+        
+        # Only add movies that have a TMDB ID (needed for proper display)
+        if movie_data['tmdb_id']:
+            movies.append(movie_data)
+    return movies
+
+
+def add_local_status(movies_list, radarr_catalog, library_index=None, in_library=False):
+    """
+    Mark each movie ``requested_on_radarr`` and, given a library index,
+    ``available_in_library``.
+    
+    ``radarr_catalog`` is the user's Radarr catalog, or None if it can't be
+    read. Movies found in it are recorded locally as requested.
+    """
+    if not movies_list:
+        return movies_list
+    
+    # Get TMDB IDs from the movie list (handle both 'id' and 'tmdb_id' fields)
+    tmdb_ids = []
+    for movie in movies_list:
+        tmdb_id = movie.get('id') or movie.get('tmdb_id')
+        if tmdb_id:
+            tmdb_ids.append(tmdb_id)
+    
+    # Fetch local movie records
+    local_movies = {}
+    if tmdb_ids:
+        movie_queryset = Movie.objects.filter(tmdb_id__in=tmdb_ids)
+        local_movies = {movie.tmdb_id: movie for movie in movie_queryset}
+    
+    radarr_movies = radarr_catalog or {}
+    
+    # Add local status to each movie
+    newly_requested = {}
+    for movie in movies_list:
+        tmdb_id = movie.get('id') or movie.get('tmdb_id')
+        
+        # The local flag is shared by every household, so it only decides when
+        # the user's own Radarr can't be read
+        requested_on_radarr = False
+        if radarr_catalog is None and tmdb_id and tmdb_id in local_movies:
+            local_movie = local_movies[tmdb_id]
+            requested_on_radarr = local_movie.requested_on_radarr
+        
+        # Exists in Radarr: record it locally if the local flag doesn't know yet
+        if tmdb_id in radarr_movies:
+            requested_on_radarr = True
+            local_movie = local_movies.get(tmdb_id)
+            if local_movie is None or not local_movie.requested_on_radarr:
+                newly_requested[tmdb_id] = movie
+        
+        movie['requested_on_radarr'] = requested_on_radarr
+        if in_library:
+            movie['available_in_library'] = True
+        elif library_index is not None:
+            movie['available_in_library'] = library_index.contains(movie)
+    
+    if newly_requested:
+        _record_radarr_requests(newly_requested)
+    
+    return movies_list
+
+
+def _record_radarr_requests(movies_by_tmdb_id):
+    """Flag movies found in Radarr as requested in one upsert, creating the ones not stored yet"""
+    movies = [
+        Movie(
+            tmdb_id=tmdb_id,
+            title=movie.get('title', ''),
+            overview=movie.get('overview', ''),
+            release_date=_release_date(movie.get('release_date')),
+            poster_path=movie.get('poster_path', ''),
+            vote_average=movie.get('vote_average', 0),
+            vote_count=movie.get('vote_count', 0),
+            requested_on_radarr=True,
+        )
+        for tmdb_id, movie in movies_by_tmdb_id.items()
+    ]
+    try:
+        # Stored movies keep their details; only the flag changes
+        Movie.objects.bulk_create(
+            movies,
+            update_conflicts=True,
+            unique_fields=['tmdb_id'],
+            update_fields=['requested_on_radarr', 'updated_at'],
+        )
+    except Exception as e:
+        logger.error(f"Error updating movie status from Radarr: {e}")
+
+
+def _local_status_stamps(user, library_movies_limit=None):
+    """
+    Versions and stamps behind ``filter_negative_feedback`` and
+    ``add_local_status`` for ``user``, or None if one of them isn't cached.
+    
+    With ``library_movies_limit``, the user's library listing of that size
+    stands in for the library index.
+    """
+    stamps = [get_radarr_service(user).catalog_stamp()]
+    if user.is_authenticated:
+        stamps.append(user_version(user.pk, 'feedback'))
+        media_server = get_user_services(user).media_server()
+        if not media_server:
+            stamps.append(0)
+        elif library_movies_limit is not None:
+            stamps.append(library_movies_stamp(media_server, limit=library_movies_limit))
+        else:
+            stamps.append(library_index_stamp(media_server))
+    return None if None in stamps else stamps
+
+
+def movie_list_stamps(name, **query_params):
+    """
+    ``conditional_get`` stamps of a ``MovieViewSet`` action showing a page of
+    the TMDB list ``name``; ``query_params`` maps list parameters to the
+    query parameters they are read from.
+    """
+    def stamps(view, request):
+        try:
+            page = int(request.query_params.get('page', 1))
+            params = {param: int(request.query_params[query]) for param, query in query_params.items()}
+        except (KeyError, ValueError):
+            return None
+        
+        list_stamp = view.tmdb_service.movie_list_stamp(name, page, **params)
+        local_stamps = _local_status_stamps(request.user)
+        if list_stamp is None or local_stamps is None:
+            return None
+        return [list_stamp, *local_stamps]
+    return stamps
+
+
+def _movie_list_default_stamps(view, request):
+    """``MovieViewSet.list`` shows popular movies unless searching, which isn't cached"""
+    if request.query_params.get('search'):
+        return None
+    return movie_list_stamps('popular')(view, request)
+
+
+def _recently_added_stamps(view, request):
+    return _local_status_stamps(request.user, library_movies_limit=RECENTLY_ADDED_LIMIT)
+
+
 class GenreViewSet(viewsets.ViewSet):
     
     def __init__(self, *args, **kwargs):
@@ -104,6 +292,7 @@ class MovieViewSet(viewsets.ViewSet):
         super().__init__(*args, **kwargs)
         self.tmdb_service = TMDBService()
     
+    @conditional_get(_movie_list_default_stamps)
     def list(self, request):
         """Get all movies (popular by default)"""
         page = int(request.query_params.get('page', 1))
@@ -139,6 +328,7 @@ class MovieViewSet(viewsets.ViewSet):
             return Response({'error': f'Server error: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
     @action(detail=False, methods=['get'])
+    @conditional_get(movie_list_stamps('popular'))
     def popular(self, request):
         page = int(request.query_params.get('page', 1))
         movies = self.tmdb_service.get_popular_movies(page)
@@ -151,6 +341,7 @@ class MovieViewSet(viewsets.ViewSet):
         return Response(movies)
     
     @action(detail=False, methods=['get'])
+    @conditional_get(movie_list_stamps('top_rated'))
     def top_rated(self, request):
         page = int(request.query_params.get('page', 1))
         movies = self.tmdb_service.get_top_rated_movies(page)
@@ -163,6 +354,7 @@ class MovieViewSet(viewsets.ViewSet):
         return Response(movies)
     
     @action(detail=False, methods=['get'])
+    @conditional_get(movie_list_stamps('by_genre', with_genres='genre_id'))
     def by_genre(self, request):
         genre_id = request.query_params.get('genre_id')
         if not genre_id:
@@ -184,6 +376,7 @@ class MovieViewSet(viewsets.ViewSet):
             return Response({'error': 'Invalid genre ID'}, status=status.HTTP_400_BAD_REQUEST)
     
     @action(detail=False, methods=['get'])
+    @conditional_get(movie_list_stamps('now_playing'))
     def now_playing(self, request):
         page = int(request.query_params.get('page', 1))
         movies = self.tmdb_service.get_now_playing_movies(page)
@@ -196,6 +389,7 @@ class MovieViewSet(viewsets.ViewSet):
         return Response(movies)
     
     @action(detail=False, methods=['get'])
+    @conditional_get(movie_list_stamps('upcoming'))
     def upcoming(self, request):
         page = int(request.query_params.get('page', 1))
         movies = self.tmdb_service.get_upcoming_movies(page)
@@ -239,7 +433,7 @@ class MovieViewSet(viewsets.ViewSet):
                 except ValueError:
                     return Response({'error': 'Invalid quality profile ID'}, status=status.HTTP_400_BAD_REQUEST)
             
-            movie_service = MovieService()
+            movie_service = MovieService(radarr_service=get_radarr_service(request.user))
             success = movie_service.request_movie_on_radarr(movie, quality_profile_id)
             
             if success:
@@ -251,9 +445,14 @@ class MovieViewSet(viewsets.ViewSet):
             return Response({'error': 'Invalid movie ID'}, status=status.HTTP_400_BAD_REQUEST)
     
     @action(detail=False, methods=['get'])
+    @cached_response(
+        headers=['X-Recommendation-Source'],
+        # Local picks served while Gemini was slow aren't kept, so the next request asks Gemini again
+        cacheable=lambda response: response.get('X-Recommendation-Source') == 'gemini'
+    )
     def ai_recommendations(self, request):
         """Get AI-powered movie recommendations with library context"""
-        gemini_service = GeminiService()
+        gemini_service = GeminiService(timeout=settings.GEMINI_HEDGE_SECONDS)
         
         # Get user preferences from query parameters
         preferences = {
@@ -269,19 +468,25 @@ class MovieViewSet(viewsets.ViewSet):
             library_context = get_user_library_context(request.user)
             negative_feedback_context = get_user_negative_feedback(request.user, 'movie')
         
-        movies = gemini_service.get_personalized_recommendations(
-            preferences, library_context, negative_feedback_context
+        movies, source = hedged_recommendations(
+            lambda: gemini_service.personalized_picks(
+                preferences, library_context, negative_feedback_context
+            ),
+            lambda: LocalRecommender().personalized(
+                request.user, preferences, library_context, negative_feedback_context
+            ),
+            lambda picks: gemini_service.enrich_picks(picks, 'AI recommended')
         )
         
         # Additional client-side filtering in case AI doesn't fully exclude them
         movies = filter_negative_feedback(movies, request.user, 'movie')
-        return Response(movies)
+        return Response(movies, headers={'X-Recommendation-Source': source})
     
     @action(detail=False, methods=['get'])
     def mood_recommendations(self, request):
         """Get mood-based movie recommendations with library context"""
         mood = request.query_params.get('mood', 'happy')
-        gemini_service = GeminiService()
+        gemini_service = GeminiService(timeout=settings.GEMINI_HEDGE_SECONDS)
         
         # Get library context and negative feedback if user is authenticated
         library_context = []
@@ -290,11 +495,15 @@ class MovieViewSet(viewsets.ViewSet):
             library_context = get_user_library_context(request.user)
             negative_feedback_context = get_user_negative_feedback(request.user, 'movie')
         
-        movies = gemini_service.get_mood_based_recommendations(mood, library_context, negative_feedback_context)
+        movies, source = hedged_recommendations(
+            lambda: gemini_service.mood_picks(mood, library_context, negative_feedback_context),
+            lambda: LocalRecommender().mood(mood, request.user, library_context, negative_feedback_context),
+            lambda picks: gemini_service.enrich_picks(picks, f'Perfect for {mood} mood')
+        )
         
         # Filter out negative feedback items
         movies = filter_negative_feedback(movies, request.user, 'movie')
-        return Response(movies)
+        return Response(movies, headers={'X-Recommendation-Source': source})
     
     @action(detail=False, methods=['get'])
     def similar_movies(self, request):
@@ -303,7 +512,7 @@ class MovieViewSet(viewsets.ViewSet):
         if not movie_title:
             return Response({'error': 'Movie title is required'}, status=status.HTTP_400_BAD_REQUEST)
         
-        gemini_service = GeminiService()
+        gemini_service = GeminiService(timeout=settings.GEMINI_HEDGE_SECONDS)
         
         # Get library context and negative feedback if user is authenticated
         library_context = []
@@ -312,122 +521,63 @@ class MovieViewSet(viewsets.ViewSet):
             library_context = get_user_library_context(request.user)
             negative_feedback_context = get_user_negative_feedback(request.user, 'movie')
         
-        movies = gemini_service.get_similar_movies(movie_title, library_context, negative_feedback_context)
+        movies, source = hedged_recommendations(
+            lambda: gemini_service.similar_picks(movie_title, library_context, negative_feedback_context),
+            lambda: LocalRecommender().similar(movie_title, request.user, library_context, negative_feedback_context),
+            lambda picks: gemini_service.enrich_picks(picks, f'Similar to {movie_title}')
+        )
         
         # Filter out negative feedback items
         movies = filter_negative_feedback(movies, request.user, 'movie')
-        return Response(movies)
+        return Response(movies, headers={'X-Recommendation-Source': source})
     
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
+    @conditional_get(_recently_added_stamps)
+    @cached_response()
     def recently_added(self, request):
         """Get recently added movies from user's media server"""
         # Get recently added movies from user's library
-        recently_added = get_user_library_context(request.user, limit=50)
+        recently_added = get_user_library_context(request.user, limit=RECENTLY_ADDED_LIMIT)
         
         if not recently_added:
             return Response([])
         
-        # Convert library context format to movie card format
-        movies = []
-        for movie in recently_added:
-            # Create a movie object that matches expected format
-            movie_data = {
-                'id': movie.get('tmdb_id'),
-                'tmdb_id': movie.get('tmdb_id'),
-                'title': movie.get('title'),
-                'overview': movie.get('overview', ''),
-                'poster_path': movie.get('poster_path'),
-                'backdrop_path': movie.get('backdrop_path', ''),
-                'release_date': movie.get('release_date') or str(movie.get('year', '')),
-                'vote_average': movie.get('vote_average', 0),
-                'vote_count': movie.get('vote_count', 0),
-                'genres': movie.get('genres', []),
-                'date_added': movie.get('date_added'),
-                'recently_added': True
-            }
-            
-            # Only add movies that have a TMDB ID (needed for proper display)
-            if movie_data['tmdb_id']:
-                movies.append(movie_data)
+        movies = recently_added_cards(recently_added)
         
         # Filter out negative feedback items and add local status
         movies = filter_negative_feedback(movies, request.user, 'movie')
-        movies = self._add_local_status(movies)
+        movies = self._add_local_status(movies, in_library=True)
         return Response(movies)
     
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
     def quality_profiles(self, request):
         """Get available quality profiles from Radarr"""
-        radarr_service = RadarrService()
+        radarr_service = get_radarr_service(request.user)
         profiles = radarr_service.get_quality_profiles()
         return Response(profiles)
     
-    def _add_local_status(self, movies_list):
-        """Add local database status (requested/available) to movie objects"""
+    def _add_local_status(self, movies_list, in_library=False):
+        """
+        Add local database status (requested/available) to movie objects.
+        
+        ``in_library`` marks movies that were read from the user's library,
+        which skips the library index lookup.
+        """
         if not movies_list:
             return movies_list
         
-        # Get TMDB IDs from the movie list (handle both 'id' and 'tmdb_id' fields)
-        tmdb_ids = []
-        for movie in movies_list:
-            tmdb_id = movie.get('id') or movie.get('tmdb_id')
-            if tmdb_id:
-                tmdb_ids.append(tmdb_id)
-        
-        # Fetch local movie records
-        local_movies = {}
-        if tmdb_ids:
-            movie_queryset = Movie.objects.filter(tmdb_id__in=tmdb_ids)
-            local_movies = {movie.tmdb_id: movie for movie in movie_queryset}
-        
-        # Check Radarr for existing movies (batch check for efficiency)
-        radarr_service = RadarrService()
-        radarr_movies = radarr_service.get_radarr_movies_by_tmdb_ids(tmdb_ids)
-        
-        # Add local status to each movie
-        for movie in movies_list:
-            tmdb_id = movie.get('id') or movie.get('tmdb_id')
-            
-            # Check if movie is in Radarr (either from local DB or direct Radarr check)
-            requested_on_radarr = False
-            if tmdb_id and tmdb_id in local_movies:
-                local_movie = local_movies[tmdb_id]
-                requested_on_radarr = local_movie.requested_on_radarr
-            
-            # If not in local DB but exists in Radarr, update local DB
-            if not requested_on_radarr and tmdb_id in radarr_movies:
-                requested_on_radarr = True
-                # Update local database
-                try:
-                    # Handle release_date properly - convert year to date or set to None
-                    release_date = movie.get('release_date')
-                    if release_date and len(str(release_date)) == 4:  # Just a year
-                        try:
-                            release_date = f"{release_date}-01-01"  # Convert year to YYYY-01-01
-                        except:
-                            release_date = None
-                    elif release_date and not isinstance(release_date, str):
-                        release_date = None
-                    
-                    movie_obj, created = Movie.objects.get_or_create(
-                        tmdb_id=tmdb_id,
-                        defaults={
-                            'title': movie.get('title', ''),
-                            'overview': movie.get('overview', ''),
-                            'release_date': release_date,
-                            'poster_path': movie.get('poster_path', ''),
-                            'vote_average': movie.get('vote_average', 0),
-                            'vote_count': movie.get('vote_count', 0)
-                        }
-                    )
-                    movie_obj.requested_on_radarr = True
-                    movie_obj.save()
-                except Exception as e:
-                    logger.error(f"Error updating movie status from Radarr: {e}")
-            
-            movie['requested_on_radarr'] = requested_on_radarr
+        # Check the requesting user's Radarr for existing movies (cached per instance)
+        radarr_catalog = get_radarr_service(self.request.user).get_catalog()
         
-        return movies_list
+        # Library availability for the whole page comes from the cached index of
+        # the user's media server, without a lookup per movie
+        library_index = None
+        if self.request.user.is_authenticated and not in_library:
+            media_server = get_user_services(self.request.user).media_server()
+            if media_server:
+                library_index = media_server.get_library_index()
+        
+        return add_local_status(movies_list, radarr_catalog, library_index, in_library)
 
 
 class UserRatingViewSet(viewsets.ModelViewSet):
@@ -435,7 +585,7 @@ class UserRatingViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        return UserRating.objects.filter(user=self.request.user)
+        return UserRating.objects.filter(user=self.request.user).order_by('-created_at')
     
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -446,7 +596,7 @@ class UserWatchlistViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        return UserWatchlist.objects.filter(user=self.request.user)
+        return UserWatchlist.objects.filter(user=self.request.user).order_by('-added_at')
     
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -459,7 +609,13 @@ class RecommendationViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        return MovieRecommendation.objects.filter(user=self.request.user)
+        return MovieRecommendation.objects.filter(
+            user=self.request.user
+        ).select_related('movie').prefetch_related('movie__genres')
+    
+    @cached_response()
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
     
     @action(detail=False, methods=['post'])
     def generate(self, request):
@@ -476,6 +632,26 @@ class RecommendationViewSet(viewsets.ReadOnlyModelViewSet):
         return Response(serializer.data)
 
 
+@api_view(['GET'])
+def dashboard(request):
+    """
+    Dashboard shelves as NDJSON, one ``{"shelf": ..., "data": ...}`` line per
+    shelf in the order they finish. ``?shelves=popular,recently_added``
+    picks shelves; all by default.
+    """
+    from .dashboard import SHELVES, Dashboard
+    
+    shelves = [name for name in request.query_params.get('shelves', '').split(',') if name] or SHELVES
+    unknown = sorted(set(shelves) - set(SHELVES))
+    if unknown:
+        return Response({'error': f"Unknown shelves: {', '.join(unknown)}"}, status=status.HTTP_400_BAD_REQUEST)
+    
+    response = StreamingHttpResponse(
+        Dashboard(request.user, dict.fromkeys(shelves)).stream(), content_type='application/x-ndjson'
+    )
+    # Let nginx pass each shelf on as it arrives
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
 
 
@@ -1,10 +1,16 @@
 from typing import List, Dict, Optional
 import re
 from movies.gemini_service import GeminiService
+from movies.prompt_context import encode_library_context
 from movies.tmdb_service import TMDBService
 from movies.tmdb_tv_service import TMDBTVService
 from .models import ChatConversation, ChatMessage, UserProfile
 
+# Chat prompts already carry the conversation history, so the library gets less room
+CHAT_LIBRARY_TOKEN_BUDGET = 200
+# Messages of history sent with each prompt
+CONTEXT_MESSAGES = 10
+
 
 class ChatService:
     """Service for handling conversational movie recommendations"""
@@ -17,8 +23,8 @@ class ChatService:
     def generate_response(self, user_message: str, conversation: ChatConversation) -> str:
         """Generate AI response for user message using conversation context"""
         
-        # Get conversation history
-        messages = conversation.messages.order_by('timestamp')
+        # Fetch only the recent history the prompt uses, oldest first
+        messages = list(conversation.messages.order_by('-timestamp')[:CONTEXT_MESSAGES])[::-1]
         
         # Build context from conversation history
         context = self._build_conversation_context(messages)
@@ -52,9 +58,7 @@ class ChatService:
     def _build_conversation_context(self, messages) -> str:
         """Build conversation context from message history"""
         context = ""
-        # Get last 10 messages for context
-        recent_messages = list(messages)[-10:]
-        for message in recent_messages:
+        for message in messages:
             role = "Human" if message.role == "user" else "Assistant"
             context += f"{role}: {message.content}\n"
         return context
@@ -101,9 +105,9 @@ class ChatService:
         # Build library context string
         library_context_str = ""
         if library_context:
-            library_titles = [f"'{movie.get('title', 'Unknown')} ({movie.get('year', 'N/A')})'" 
-                            for movie in library_context]
-            library_context_str = f"\n\nUSER'S LIBRARY: The user has access to these movies: {', '.join(library_titles[:30])}. Consider this when making recommendations - you should avoid mentioning movies they already and instead suggest complementary titles."
+            genres = personality_profile.get('genre_preferences', '').split(', ') if personality_profile else None
+            library_titles = encode_library_context(library_context, genres=genres, budget=CHAT_LIBRARY_TOKEN_BUDGET)
+            library_context_str = f"\n\nUSER'S LIBRARY: The user has access to these movies: {library_titles}. Consider this when making recommendations - you should avoid mentioning movies they already and instead suggest complementary titles."
         
         # Build negative feedback context
         negative_feedback_str = ""
@@ -141,7 +145,7 @@ Respond naturally as if you're having a conversation with a movie-loving friend.
     
     def get_or_create_conversation(self, user) -> ChatConversation:
         """Get the user's current conversation or create a new one"""
-        conversation = ChatConversation.objects.filter(user=user).first()
+        conversation = ChatConversation.objects.filter(user=user).select_related('user').first()
         
         if not conversation:
             conversation = ChatConversation.objects.create(
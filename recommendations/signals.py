@@ -0,0 +1,18 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.user_state import bump_user_version
+from .models import UserNegativeFeedback, UserProfile
+
+
+@receiver(post_save, sender=UserNegativeFeedback)
+@receiver(post_delete, sender=UserNegativeFeedback)
+def bump_feedback_version(sender, instance, **kwargs):
+    """Responses filtered by the user's feedback change with it"""
+    bump_user_version(instance.user_id, 'feedback')
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def bump_profile_version(sender, instance, **kwargs):
+    bump_user_version(instance.user_id, 'profile')
@@ -1,3 +1,47 @@
-from django.test import TestCase
+import json
 
-# Create your tests here.
+from core.testing import StubUpstreamTestCase
+
+from .models import ChatMessage, PersonalityQuiz, UserProfile
+
+
+class QuizBudgetTest(StubUpstreamTestCase):
+    def test_submit_quiz_loads_questions_in_one_query(self):
+        questions = [
+            PersonalityQuiz.objects.create(
+                question_text=f'Question {i}', question_type='multiple_choice', category=category,
+                trait_mapping={'adventurous': {'action': 2, 'drama': 1}},
+            )
+            for i, category in enumerate(['genres', 'decades', 'content_preferences', 'general'] * 3)
+        ]
+        answers = {str(question.id): ['action'] for question in questions}
+
+        with self.assertBudget(queries=8, upstream={}):
+            response = self.client.post(
+                '/recommendations/api/quiz/submit/', json.dumps({'answers': answers}),
+                content_type='application/json'
+            )
+
+        self.assertEqual(response.status_code, 200)
+        profile = UserProfile.objects.get(user=self.user)
+        self.assertEqual(profile.personality_traits, {'adventurous': 24})
+        self.assertEqual(profile.preferred_genres, ['action'])
+
+
+class ChatBudgetTest(StubUpstreamTestCase):
+    def _send(self, message):
+        return self.client.post(
+            '/recommendations/api/chat/message/', json.dumps({'message': message}),
+            content_type='application/json'
+        )
+
+    def test_chat_message(self):
+        for i in range(15):
+            self._send(f'Message number {i}')
+
+        # Every quoted title in the reply is looked up once as a movie and once as a show
+        with self.assertBudget(queries=8, upstream={'gemini': 1, 'tmdb': 10}):
+            response = self._send('Something like a heist movie?')
+
+        self.assertEqual(len(response.json()['movie_recommendations']), 5)
+        self.assertEqual(ChatMessage.objects.filter(conversation__user=self.user).count(), 32)
@@ -286,33 +286,36 @@ def submit_quiz(request):
         preferred_decades = []
         content_preferences = {}
         
+        # Load every answered question at once; answers to unknown or inactive questions are skipped
+        question_ids = [int(question_id) for question_id in answers]
+        questions = PersonalityQuiz.objects.filter(is_active=True).in_bulk(question_ids)
+        
         for question_id, answer in answers.items():
-            try:
-                question = PersonalityQuiz.objects.get(id=int(question_id), is_active=True)
-                
-                # Map answers to personality traits based on question's trait_mapping
-                if question.trait_mapping:
-                    for trait, mapping in question.trait_mapping.items():
-                        if isinstance(answer, list):
-                            # Multiple choice - combine values
-                            for ans in answer:
-                                if ans in mapping:
-                                    personality_traits[trait] = personality_traits.get(trait, 0) + mapping[ans]
-                        else:
-                            # Single choice or scale
-                            if str(answer) in mapping:
-                                personality_traits[trait] = personality_traits.get(trait, 0) + mapping[str(answer)]
-                
-                # Extract genre preferences
-                if question.category == 'genres' and isinstance(answer, list):
-                    preferred_genres.extend(answer)
-                elif question.category == 'decades' and isinstance(answer, list):
-                    preferred_decades.extend(answer)
-                elif question.category == 'content_preferences':
-                    content_preferences[question_id] = answer
-                    
-            except PersonalityQuiz.DoesNotExist:
+            question = questions.get(int(question_id))
+            if question is None:
                 continue
+            
+            # Map answers to personality traits based on question's trait_mapping
+            if question.trait_mapping:
+                for trait, mapping in question.trait_mapping.items():
+                    if isinstance(answer, list):
+                        # Multiple choice - combine values
+                        for ans in answer:
+                            if ans in mapping:
+                                personality_traits[trait] = personality_traits.get(trait, 0) + mapping[ans]
+                    else:
+                        # Single choice or scale
+                        if str(answer) in mapping:
+                            personality_traits[trait] = personality_traits.get(trait, 0) + mapping[str(answer)]
+            
+            # Extract genre preferences
+            if question.category == 'genres' and isinstance(answer, list):
+                preferred_genres.extend(answer)
+            elif question.category == 'decades' and isinstance(answer, list):
+                preferred_decades.extend(answer)
+            elif question.category == 'content_preferences':
+                content_preferences[question_id] = answer
+                
         
         # Update user profile
         profile.personality_traits = personality_traits
@@ -40,13 +40,7 @@ class MovieModule {
         try {
             const response = await fetch(`${this.app.apiBase}/movies/recently_added/`);
             const movies = await response.json();
-            
-            if (movies && movies.length > 0) {
-                this.renderMovies(movies, 'recentlyAddedMovies');
-            } else {
-                container.innerHTML = '<div class="no-content"><p>No recently added movies found. Configure your media server in Settings.</p></div>';
-            }
-            
+            this.renderRecentlyAddedMovies(movies);
             setTimeout(() => this.app.setupHorizontalInfiniteScroll(), 100);
         } catch (error) {
             console.error('Error loading recently added movies:', error);
@@ -54,6 +48,17 @@ class MovieModule {
         }
     }
 
+    renderRecentlyAddedMovies(movies) {
+        const container = document.getElementById('recentlyAddedMovies');
+        if (!container) return;
+        
+        if (movies && movies.length > 0) {
+            this.renderMovies(movies, 'recentlyAddedMovies');
+        } else {
+            container.innerHTML = '<div class="no-content"><p>No recently added movies found. Configure your media server in Settings.</p></div>';
+        }
+    }
+
     // Page-specific loading functions for movies templates
     async loadMoviesPopular() {
         const container = document.getElementById('moviesPopular');
@@ -248,7 +253,7 @@ class MovieModule {
 
     createMovieCard(movie) {
         const posterUrl = movie.poster_path ? 
-            (movie.poster_path.startsWith('https://') ? movie.poster_path : `https://image.tmdb.org/t/p/w300${movie.poster_path}`) : 
+            (/^(https?:\/\/|\/images\/)/.test(movie.poster_path) ? movie.poster_path : `https://image.tmdb.org/t/p/w300${movie.poster_path}`) : 
             'https://via.placeholder.com/300x450?text=No+Poster';
 
         const year = movie.release_date ? new Date(movie.release_date).getFullYear() : 'Unknown';
@@ -267,7 +272,11 @@ class MovieModule {
                     <p class="movie-overview">${movie.overview || 'No overview available.'}</p>
                 </div>
                 <div class="movie-actions">
-                    ${movie.requested_on_radarr ? `
+                    ${movie.available_in_library ? `
+                        <button class="action-btn secondary">
+                            <i class="fas fa-check"></i> In Library
+                        </button>
+                    ` : movie.requested_on_radarr ? `
                         <button class="action-btn secondary">
                             <i class="fas fa-clock"></i> Requested
                         </button>
@@ -375,7 +384,7 @@ class MovieModule {
             document.getElementById('requestMovieOverview').textContent = movie.overview || 'No overview available';
             
             const posterUrl = movie.poster_path ? 
-                (movie.poster_path.startsWith('https://') ? movie.poster_path : `https://image.tmdb.org/t/p/w300${movie.poster_path}`) : 
+                (/^(https?:\/\/|\/images\/)/.test(movie.poster_path) ? movie.poster_path : `https://image.tmdb.org/t/p/w300${movie.poster_path}`) : 
                 'https://via.placeholder.com/300x450?text=No+Poster';
             document.getElementById('requestMoviePoster').src = posterUrl;
             
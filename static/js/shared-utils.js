@@ -34,7 +34,8 @@ class SuggesterrUtils {
         const year = movie.release_date ? new Date(movie.release_date).getFullYear() : '';
         const rating = movie.vote_average ? movie.vote_average.toFixed(1) : 'N/A';
         
-        // Check if movie is already requested
+        // Check if movie is already in the library or requested
+        const inLibrary = movie.available_in_library || false;
         const isRequested = movie.requested_on_radarr || false;
         
         card.innerHTML = `
@@ -43,7 +44,9 @@ class SuggesterrUtils {
                      onerror="this.src='/static/img/no-poster.jpg'">
                 <div class="movie-overlay">
                     <div class="movie-actions">
-                        ${isAuthenticated ? (isRequested 
+                        ${isAuthenticated ? (inLibrary
+                            ? '<button class="btn btn-success btn-sm" disabled><i class="fas fa-check"></i> In Library</button>'
+                            : isRequested 
                             ? '<button class="btn btn-success btn-sm" disabled><i class="fas fa-check"></i> Requested</button>'
                             : '<button class="btn btn-primary btn-sm request-btn" data-movie-id="' + movie.id + '"><i class="fas fa-download"></i> Request</button>'
                         ) : ''}
@@ -132,73 +132,17 @@ class SuggesterrApp {
     async loadInitialData() {
         const loadTasks = [];
         
-        // Load content based on what containers exist on the page
-        if (document.getElementById('popularMovies')) {
-            loadTasks.push(this.movies.loadPopularMovies());
-        }
-        
-        if (document.getElementById('topRatedMovies')) {
-            loadTasks.push(this.movies.loadTopRatedMovies());
-        }
-        
-        if (document.getElementById('popularTVShows')) {
-            loadTasks.push(this.tvShows.loadPopularTVShows());
-        }
-        
-        if (document.getElementById('topRatedTVShows')) {
-            loadTasks.push(this.tvShows.loadTopRatedTVShows());
-        }
-        
-        if (document.getElementById('recentlyAddedMovies')) {
-            loadTasks.push(this.movies.loadRecentlyAddedMovies());
+        // Shelves on this page come from one streamed /api/dashboard/ request
+        const shelfTargets = this.dashboardShelfTargets()
+            .filter(target => document.getElementById(target.container));
+        if (shelfTargets.length > 0) {
+            loadTasks.push(this.loadDashboardShelves(shelfTargets));
         }
         
         if (document.getElementById('genre-sections')) {
             loadTasks.push(this.recommendations.loadGenreSections());
         }
         
-        // Load page-specific containers
-        if (document.getElementById('moviesPopular')) {
-            loadTasks.push(this.movies.loadMoviesPopular());
-        }
-        
-        if (document.getElementById('moviesTopRated')) {
-            loadTasks.push(this.movies.loadMoviesTopRated());
-        }
-        
-        if (document.getElementById('moviesNowPlaying')) {
-            loadTasks.push(this.movies.loadMoviesNowPlaying());
-        }
-        
-        if (document.getElementById('moviesUpcoming')) {
-            loadTasks.push(this.movies.loadMoviesUpcoming());
-        }
-        
-        if (document.getElementById('tvShowsPopular')) {
-            loadTasks.push(this.tvShows.loadTVShowsPopular());
-        }
-        
-        if (document.getElementById('tvShowsTopRated')) {
-            loadTasks.push(this.tvShows.loadTVShowsTopRated());
-        }
-        
-        if (document.getElementById('tvShowsAiringToday')) {
-            loadTasks.push(this.tvShows.loadTVShowsAiringToday());
-        }
-        
-        if (document.getElementById('tvShowsOnTheAir')) {
-            loadTasks.push(this.tvShows.loadTVShowsOnTheAir());
-        }
-        
-        // AI Recommendations
-        if (document.getElementById('aiRecommendations')) {
-            loadTasks.push(this.recommendations.loadAIRecommendations());
-        }
-        
-        if (document.getElementById('personalizedRecommendations')) {
-            loadTasks.push(this.recommendations.loadPersonalizedRecommendations());
-        }
-        
         if (document.getElementById('aiTVRecommendations')) {
             loadTasks.push(this.recommendations.loadAITVRecommendations());
         }
@@ -218,6 +162,73 @@ class SuggesterrApp {
         }
     }
 
+    // Containers filled from dashboard shelves, with the per-shelf loader used if the stream fails
+    dashboardShelfTargets() {
+        const movies = (container) => (data) => this.movies.renderMovies(data, container);
+        const tvShows = (container) => (data) => this.tvShows.renderTVShows(data, container);
+        const aiMovies = (container) => (data) => this.movies.renderMoviesWithAI(data, container);
+        return [
+            { container: 'popularMovies', shelf: 'popular', render: movies('popularMovies'), fallback: () => this.movies.loadPopularMovies() },
+            { container: 'topRatedMovies', shelf: 'top_rated', render: movies('topRatedMovies'), fallback: () => this.movies.loadTopRatedMovies() },
+            { container: 'popularTVShows', shelf: 'tv_popular', render: tvShows('popularTVShows'), fallback: () => this.tvShows.loadPopularTVShows() },
+            { container: 'topRatedTVShows', shelf: 'tv_top_rated', render: tvShows('topRatedTVShows'), fallback: () => this.tvShows.loadTopRatedTVShows() },
+            { container: 'recentlyAddedMovies', shelf: 'recently_added', render: (data) => this.movies.renderRecentlyAddedMovies(data), fallback: () => this.movies.loadRecentlyAddedMovies() },
+            { container: 'moviesPopular', shelf: 'popular', render: movies('moviesPopular'), fallback: () => this.movies.loadMoviesPopular() },
+            { container: 'moviesTopRated', shelf: 'top_rated', render: movies('moviesTopRated'), fallback: () => this.movies.loadMoviesTopRated() },
+            { container: 'moviesNowPlaying', shelf: 'now_playing', render: movies('moviesNowPlaying'), fallback: () => this.movies.loadMoviesNowPlaying() },
+            { container: 'moviesUpcoming', shelf: 'upcoming', render: movies('moviesUpcoming'), fallback: () => this.movies.loadMoviesUpcoming() },
+            { container: 'tvShowsPopular', shelf: 'tv_popular', render: tvShows('tvShowsPopular'), fallback: () => this.tvShows.loadTVShowsPopular() },
+            { container: 'tvShowsTopRated', shelf: 'tv_top_rated', render: tvShows('tvShowsTopRated'), fallback: () => this.tvShows.loadTVShowsTopRated() },
+            { container: 'tvShowsAiringToday', shelf: 'tv_airing_today', render: tvShows('tvShowsAiringToday'), fallback: () => this.tvShows.loadTVShowsAiringToday() },
+            { container: 'tvShowsOnTheAir', shelf: 'tv_on_the_air', render: tvShows('tvShowsOnTheAir'), fallback: () => this.tvShows.loadTVShowsOnTheAir() },
+            { container: 'aiRecommendations', shelf: 'ai_recommendations', render: aiMovies('aiRecommendations'), fallback: () => this.recommendations.loadAIRecommendations() },
+            { container: 'personalizedRecommendations', shelf: 'ai_recommendations', render: aiMovies('personalizedRecommendations'), fallback: () => this.recommendations.loadPersonalizedRecommendations() },
+        ];
+    }
+
+    async loadDashboardShelves(targets) {
+        const shelves = [...new Set(targets.map(target => target.shelf))];
+        const pending = new Set(targets);
+        
+        const handleLine = (line) => {
+            if (!line.trim()) return;
+            const message = JSON.parse(line);
+            targets.filter(target => target.shelf === message.shelf).forEach(target => {
+                pending.delete(target);
+                if (message.error) {
+                    target.fallback();
+                } else {
+                    target.render(message.data);
+                }
+            });
+            setTimeout(() => this.setupHorizontalInfiniteScroll(), 100);
+        };
+        
+        try {
+            const response = await fetch(`${this.apiBase}/dashboard/?shelves=${shelves.join(',')}`);
+            if (!response.ok) throw new Error(`Dashboard request failed with ${response.status}`);
+            
+            // Render each shelf as its line arrives
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffered = '';
+            while (true) {
+                const { done, value } = await reader.read();
+                if (done) break;
+                buffered += decoder.decode(value, { stream: true });
+                const lines = buffered.split('\n');
+                buffered = lines.pop();
+                lines.forEach(handleLine);
+            }
+            handleLine(buffered);
+        } catch (error) {
+            console.error('Error loading dashboard shelves:', error);
+        }
+        
+        // Anything the stream didn't deliver is loaded on its own
+        await Promise.all([...pending].map(target => target.fallback()));
+    }
+
     setupHorizontalInfiniteScroll() {
         const movieRows = document.querySelectorAll('.movie-row');
         
@@ -477,59 +488,48 @@ class SuggesterrApp {
                 button.innerHTML = '<i class="fas fa-spinner fa-spin"></i> Testing connections...';
             }
             
-            // Make API call to test connections
+            // Show a row per service straight away, then fill each in as its check finishes
+            let resultsHtml = '<div class="connection-test-results">';
+            [['radarr', 'Radarr'], ['sonarr', 'Sonarr'], ['media_server', 'Media Server']].forEach(([service, label]) => {
+                resultsHtml += `
+                    <div class="test-result pending" data-service="${service}">
+                        <strong>${label}:</strong> 
+                        <span class="status-icon">${this.getStatusIcon('pending')}</span>
+                        Checking...
+                    </div>
+                `;
+            });
+            resultsHtml += '</div>';
+            
+            // Make API call to test connections, asking for results one line per service
             const response = await fetch('/accounts/test_connections/', {
                 method: 'POST',
                 headers: {
                     'X-CSRFToken': this.getCookie('csrftoken'),
+                    'Accept': 'application/x-ndjson'
                 }
             });
             
-            const data = await response.json();
-            
             if (!response.ok) {
+                const data = await response.json();
                 throw new Error(data.error || 'Failed to test connections');
             }
             
-            // Display results
-            let resultsHtml = '<div class="connection-test-results">';
-            
-            // Radarr status
-            const radarrResult = data.results.radarr;
-            resultsHtml += `
-                <div class="test-result ${radarrResult.status}">
-                    <strong>Radarr:</strong> 
-                    <span class="status-icon">${this.getStatusIcon(radarrResult.status)}</span>
-                    ${radarrResult.message}
-                </div>
-            `;
-            
-            // Sonarr status
-            const sonarrResult = data.results.sonarr;
-            resultsHtml += `
-                <div class="test-result ${sonarrResult.status}">
-                    <strong>Sonarr:</strong> 
-                    <span class="status-icon">${this.getStatusIcon(sonarrResult.status)}</span>
-                    ${sonarrResult.message}
-                </div>
-            `;
-            
-            // Media server status
-            const mediaResult = data.results.media_server;
-            const serverName = mediaResult.type ? mediaResult.type.charAt(0).toUpperCase() + mediaResult.type.slice(1) : 'Media Server';
-            resultsHtml += `
-                <div class="test-result ${mediaResult.status}">
-                    <strong>${serverName}:</strong> 
-                    <span class="status-icon">${this.getStatusIcon(mediaResult.status)}</span>
-                    ${mediaResult.message}
-                </div>
-            `;
-            
-            resultsHtml += '</div>';
-            
-            // Show results in a modal or alert
             this.showTestResultsModal('Connection Test Results', resultsHtml);
             
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            while (true) {
+                const { done, value } = await reader.read();
+                if (done) break;
+                
+                buffer += decoder.decode(value, { stream: true });
+                const lines = buffer.split('\n');
+                buffer = lines.pop();
+                lines.filter(line => line.trim()).forEach(line => this.showConnectionResult(JSON.parse(line)));
+            }
+            
         } catch (error) {
             console.error('Error testing connections:', error);
             alert(`Error testing connections: ${error.message}`);
@@ -543,8 +543,29 @@ class SuggesterrApp {
         }
     }
     
+    showConnectionResult(result) {
+        if (!result.service) return;
+        
+        const row = document.querySelector(`#testResultsModal [data-service="${result.service}"]`);
+        if (!row) return;
+        
+        let label = { radarr: 'Radarr', sonarr: 'Sonarr' }[result.service];
+        if (result.service === 'media_server') {
+            label = result.type ? result.type.charAt(0).toUpperCase() + result.type.slice(1) : 'Media Server';
+        }
+        
+        row.className = `test-result ${result.status}`;
+        row.innerHTML = `
+            <strong>${label}:</strong> 
+            <span class="status-icon">${this.getStatusIcon(result.status)}</span>
+            ${result.message}
+        `;
+    }
+    
     getStatusIcon(status) {
         switch(status) {
+            case 'pending':
+                return '<i class="fas fa-spinner fa-spin text-muted"></i>';
             case 'success':
                 return '<i class="fas fa-check-circle text-success"></i>';
             case 'error':
@@ -655,18 +676,30 @@ class SuggesterrApp {
         const searchSuggestions = document.getElementById('searchSuggestions');
         if (!searchSuggestions) return;
 
+        // Latest query wins: abort the previous request and tag this one with a sequence number
+        if (this.searchAbortController) {
+            this.searchAbortController.abort();
+        }
+        this.searchAbortController = new AbortController();
+        this.searchSeq = (this.searchSeq || 0) + 1;
+        const seq = this.searchSeq;
+
         try {
-            const response = await fetch(`/api/tmdb-search/?q=${encodeURIComponent(query)}`, {
+            const response = await fetch(`/api/tmdb-search/?q=${encodeURIComponent(query)}&seq=${seq}`, {
                 headers: {
                     'X-CSRFToken': this.getCookie('csrftoken')
-                }
+                },
+                signal: this.searchAbortController.signal
             });
             
             if (!response.ok) throw new Error('Search failed');
             
             const data = await response.json();
+            // Ignore answers for queries the user has already typed past
+            if (data.stale || seq !== this.searchSeq) return;
             this.displaySearchSuggestions(data, searchSuggestions);
         } catch (error) {
+            if (error.name === 'AbortError') return;
             console.error('Search suggestions error:', error);
             searchSuggestions.style.display = 'none';
         }
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -62,6 +63,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.ServerTimingMiddleware',
+    'core.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'csp.middleware.CSPMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -70,11 +73,12 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.ProfilingMiddleware',
 ]
 
 # Add CSRF middleware only for non-container environments
 if not os.path.exists('/usr/bin/psql'):  # Not in container
-    MIDDLEWARE.insert(5, 'django.middleware.csrf.CsrfViewMiddleware')
+    MIDDLEWARE.insert(7, 'django.middleware.csrf.CsrfViewMiddleware')
 
 ROOT_URLCONF = 'suggesterr.urls'
 
@@ -235,6 +239,25 @@ CORS_ALLOWED_ORIGINS = [
     "http://127.0.0.1:3000",
 ]
 
+# Cache
+# Shared Redis cache in container/production so all gunicorn workers see the
+# same entries, local memory cache for development
+if os.getenv('REDIS_URL') or os.path.exists('/usr/bin/psql'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL', 'redis://localhost:6379/0'),
+            'KEY_PREFIX': os.getenv('CACHE_KEY_PREFIX', 'suggesterr'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'suggesterr',
+        }
+    }
+
 # Celery (disabled for demo)
 # CELERY_BROKER_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
 # CELERY_RESULT_BACKEND = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
@@ -247,10 +270,12 @@ if os.path.exists('/config'):
     # Container environment
     STATIC_ROOT = '/config/static'
     MEDIA_ROOT = '/config/media'
+    IMAGE_CACHE_ROOT = '/config/cache/images'
 else:
     # Development environment
     STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
     MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+    IMAGE_CACHE_ROOT = os.path.join(BASE_DIR, 'cache', 'images')
 
 STATICFILES_DIRS = [
     os.path.join(BASE_DIR, 'static'),
@@ -259,9 +284,58 @@ STATICFILES_DIRS = [
 # Media files
 MEDIA_URL = '/media/'
 
+# Image proxy: posters/backdrops are cached as WebP variants under IMAGE_CACHE_ROOT.
+# It must stay outside MEDIA_ROOT: /media/ is served without a login check, and
+# Jellyfin artwork may only be reachable through the image proxy view
+IMAGE_PROXY_ENABLED = os.getenv('IMAGE_PROXY_ENABLED', 'True').lower() == 'true'
+IMAGE_CACHE_MAX_BYTES = int(os.getenv('IMAGE_CACHE_MAX_MB', '1024')) * 1024 * 1024
+
+# Metrics: each worker writes snapshots to METRICS_DIR, /metrics sums them.
+# Set METRICS_TOKEN to require "Authorization: Bearer <token>" on /metrics.
+METRICS_DIR = os.getenv('METRICS_DIR', os.path.join(tempfile.gettempdir(), 'suggesterr-metrics'))
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
+# Request timing: Server-Timing header on every response, plus a structured
+# log line for requests slower than REQUEST_TIMING_SLOW_MS and a random
+# REQUEST_TIMING_SAMPLE_RATE fraction of the rest
+SERVER_TIMING_HEADER = os.getenv('SERVER_TIMING_HEADER', 'True').lower() == 'true'
+REQUEST_TIMING_SLOW_MS = float(os.getenv('REQUEST_TIMING_SLOW_MS', '1000'))
+REQUEST_TIMING_SAMPLE_RATE = float(os.getenv('REQUEST_TIMING_SAMPLE_RATE', '0'))
+
+# Personalized responses are reused until the user's state changes, at most this long
+RESPONSE_CACHE_SECONDS = int(os.getenv('RESPONSE_CACHE_SECONDS', '900'))
+
+# Cache warming (`python manage.py warm_caches`): TMDB lists and pages to
+# prefetch, and how recently users must have logged in to get their library
+# and Radarr catalog warmed. /ready/ waits at most WARMUP_READY_TIMEOUT seconds
+# without progress for a startup warmup
+WARMUP_TMDB_LISTS = [name for name in os.getenv('WARMUP_TMDB_LISTS', 'popular,top_rated,now_playing,upcoming').split(',') if name]
+WARMUP_TMDB_PAGES = int(os.getenv('WARMUP_TMDB_PAGES', '2'))
+WARMUP_ACTIVE_DAYS = int(os.getenv('WARMUP_ACTIVE_DAYS', '14'))
+WARMUP_READY_TIMEOUT = int(os.getenv('WARMUP_READY_TIMEOUT', '300'))
+
+# JSON API responses smaller than this are sent uncompressed
+COMPRESSION_MIN_BYTES = int(os.getenv('COMPRESSION_MIN_BYTES', '1024'))
+
+# Sampling profiler: profile one request in PROFILE_SAMPLE_RATE (0 = only
+# requests with a valid X-Suggesterr-Profile token, see `profile_stacks --token`)
+PROFILE_SAMPLE_RATE = int(os.getenv('PROFILE_SAMPLE_RATE', '0'))
+PROFILE_INTERVAL_MS = float(os.getenv('PROFILE_INTERVAL_MS', '10'))
+PROFILE_RETENTION_HOURS = int(os.getenv('PROFILE_RETENTION_HOURS', '48'))
+PROFILE_TOKEN_MAX_AGE = int(os.getenv('PROFILE_TOKEN_MAX_AGE', '3600'))
+if os.path.exists('/config'):
+    PROFILE_DIR = os.getenv('PROFILE_DIR', '/config/logs/profiles')
+else:
+    PROFILE_DIR = os.getenv('PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'suggesterr-profiles'))
+
 # API Keys
 TMDB_API_KEY = os.getenv('TMDB_API_KEY')
 GOOGLE_GEMINI_API_KEY = os.getenv('GOOGLE_GEMINI_API_KEY')
+# API base URLs; only changed to point at stub servers (see the benchmark command)
+TMDB_API_URL = os.getenv('TMDB_API_URL', 'https://api.themoviedb.org/3')
+GEMINI_API_URL = os.getenv('GEMINI_API_URL', 'https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent')
+# Seconds to wait for Gemini before serving local recommendations instead
+GEMINI_HEDGE_SECONDS = float(os.getenv('GEMINI_HEDGE_SECONDS', '8'))
 
 # External Services
 JELLYFIN_URL = os.getenv('JELLYFIN_URL')
@@ -273,7 +347,7 @@ RADARR_API_KEY = os.getenv('RADARR_API_KEY')
 SONARR_URL = os.getenv('SONARR_URL')
 SONARR_API_KEY = os.getenv('SONARR_API_KEY')
 
-# Encryption key for sensitive fields
+# Encryption key for sensitive fields (comma-separated for rotation, newest first)
 ENCRYPTION_KEY = os.getenv('ENCRYPTION_KEY')
 
 # Content Security Policy (New format for django-csp 4.0+)
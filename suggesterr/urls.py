@@ -32,6 +32,7 @@ urlpatterns = [
     # API endpoints  
     path('api/', include('movies.api_urls')),
     path('api/auth/', include('rest_framework.urls')),
+    path('api/webhooks/', include('integrations.urls')),
     
     # Admin
     path('admin/', admin.site.urls),
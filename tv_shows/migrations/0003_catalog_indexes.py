@@ -0,0 +1,39 @@
+# Generated by Django 4.2.7 on 2026-10-19 03:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tv_shows', '0002_tvshow_tv_rating'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='tvshow',
+            index=models.Index(fields=['-popularity', '-vote_average'], name='tvshow_popularity_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tvshowrating',
+            index=models.Index(fields=['user', '-created_at'], name='tvrating_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tvshowrating',
+            index=models.Index(fields=['user', 'rating', 'tv_show'], name='tvrating_user_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tvshowrecommendation',
+            index=models.Index(fields=['user', '-score', '-created_at'], name='tvrec_user_score_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tvshowwatchlist',
+            index=models.Index(fields=['user', '-added_at', 'tv_show'], name='tvwatchlist_user_added_idx'),
+        ),
+        # Genre -> titles lookups on the auto-created M2M table; the default
+        # single-column genre_id index still has to visit the heap for tvshow_id
+        migrations.RunSQL(
+            sql='CREATE INDEX tvshow_genres_genre_show_idx ON tv_shows_tvshow_genres (genre_id, tvshow_id)',
+            reverse_sql='DROP INDEX tvshow_genres_genre_show_idx',
+        ),
+    ]
@@ -51,6 +51,9 @@ class TVShow(models.Model):
     
     class Meta:
         ordering = ['-popularity', '-vote_average']
+        indexes = [
+            models.Index(fields=['-popularity', '-vote_average'], name='tvshow_popularity_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} ({self.first_air_date.year if self.first_air_date else 'Unknown'})"
@@ -64,6 +67,10 @@ class TVShowRating(models.Model):
     
     class Meta:
         unique_together = ['user', 'tv_show']
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='tvrating_user_created_idx'),
+            models.Index(fields=['user', 'rating', 'tv_show'], name='tvrating_user_rating_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.tv_show.title}: {self.rating}/10"
@@ -76,6 +83,9 @@ class TVShowWatchlist(models.Model):
     
     class Meta:
         unique_together = ['user', 'tv_show']
+        indexes = [
+            models.Index(fields=['user', '-added_at', 'tv_show'], name='tvwatchlist_user_added_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.tv_show.title}"
@@ -91,6 +101,9 @@ class TVShowRecommendation(models.Model):
     class Meta:
         unique_together = ['user', 'tv_show']
         ordering = ['-score', '-created_at']
+        indexes = [
+            models.Index(fields=['user', '-score', '-created_at'], name='tvrec_user_score_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.tv_show.title}: {self.score}"
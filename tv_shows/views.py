@@ -10,7 +10,8 @@ from movies.tmdb_tv_service import TMDBTVService
 from movies.gemini_service import GeminiService
 from movies.services import TVShowService
 from movies.views import filter_negative_feedback
-from integrations.services import SonarrService
+from integrations.registry import get_sonarr_service
+from core.image_cache import tmdb_image_url
 import logging
 
 logger = logging.getLogger(__name__)
@@ -139,7 +140,7 @@ class TVShowViewSet(viewsets.ViewSet):
                         'overview': season_data.get('overview', ''),
                         'episode_count': len(season_data.get('episodes', [])),
                         'air_date': season_data.get('air_date'),
-                        'poster_path': f"{self.tmdb_tv_service.image_base_url}{season_data.get('poster_path')}" if season_data.get('poster_path') else None
+                        'poster_path': tmdb_image_url(season_data.get('poster_path'))
                     })
             
             return Response(seasons)
@@ -164,7 +165,7 @@ class TVShowViewSet(viewsets.ViewSet):
                 except ValueError:
                     return Response({'error': 'Invalid quality profile ID'}, status=status.HTTP_400_BAD_REQUEST)
             
-            tv_show_service = TVShowService()
+            tv_show_service = TVShowService(sonarr_service=get_sonarr_service(request.user))
             success = tv_show_service.request_tv_show_on_sonarr(
                 tv_show, 
                 quality_profile_id=quality_profile_id,
@@ -183,7 +184,7 @@ class TVShowViewSet(viewsets.ViewSet):
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
     def quality_profiles(self, request):
         """Get available quality profiles from Sonarr"""
-        sonarr_service = SonarrService()
+        sonarr_service = get_sonarr_service(request.user)
         profiles = sonarr_service.get_quality_profiles()
         return Response(profiles)
     
@@ -301,7 +302,7 @@ class TVShowRatingViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        return TVShowRating.objects.filter(user=self.request.user)
+        return TVShowRating.objects.filter(user=self.request.user).order_by('-created_at')
     
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -312,7 +313,7 @@ class TVShowWatchlistViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        return TVShowWatchlist.objects.filter(user=self.request.user)
+        return TVShowWatchlist.objects.filter(user=self.request.user).order_by('-added_at')
     
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)